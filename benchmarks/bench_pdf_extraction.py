@@ -0,0 +1,64 @@
+"""Benchmark PDF extraction strategies
+
+Runs the "combined" and "fast" PDFScraper strategies over every PDF in a
+directory (in this process, one file at a time) and reports time and
+extracted text size per file and in total.
+
+Usage:
+    python benchmarks/bench_pdf_extraction.py <pdf_dir> [--repeat N]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_scraper import EXTRACTION_STRATEGIES, pdf_scraper  # noqa: E402
+
+
+def time_strategy(content: bytes, filename: str, strategy: str, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = pdf_scraper.extract_text_from_pdf(content, filename, strategy)
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf_dir", help="Directory searched recursively for *.pdf")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per file and strategy (best time is kept)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    pdfs = sorted(Path(args.pdf_dir).rglob("*.pdf"))
+    if not pdfs:
+        sys.exit(f"No PDFs found under {args.pdf_dir}")
+
+    totals = {strategy: {"seconds": 0.0, "chars": 0} for strategy in EXTRACTION_STRATEGIES}
+    print(f"{'file':40} {'pages':>5} " + " ".join(f"{s + ' s':>12} {s + ' chars':>14}" for s in EXTRACTION_STRATEGIES))
+    for path in pdfs:
+        content = path.read_bytes()
+        row = []
+        pages = "?"
+        for strategy in EXTRACTION_STRATEGIES:
+            seconds, result = time_strategy(content, path.name, strategy, args.repeat)
+            pages = result["metadata"].get("page_count", pages)
+            totals[strategy]["seconds"] += seconds
+            totals[strategy]["chars"] += len(result["text"])
+            row.append(f"{seconds:12.3f} {len(result['text']):14d}")
+        print(f"{path.name[:40]:40} {pages:>5} " + " ".join(row))
+
+    print()
+    for strategy, total in totals.items():
+        print(f"{strategy:10} total {total['seconds']:.3f}s, {total['chars']} chars")
+    if totals["fast"]["seconds"] > 0:
+        print(f"speedup (combined / fast): {totals['combined']['seconds'] / totals['fast']['seconds']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
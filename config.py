@@ -1,10 +1,124 @@
 class Config:
     CHROMADB_PATH = "./chromadb_storage"
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    OLLAMA_EMBEDDING_MODEL = "nomic-embed-text:v1.5"
     LLM_MODEL = "microsoft/DialoGPT-medium"
     MAX_TOKENS = 2000  # Optimized for efficiency
     TEMPERATURE = 0.7
     MIN_RESPONSE_TOKENS = 50  # Reduced for faster responses
     MAX_RESPONSE_TOKENS = 1500  # Optimized for efficiency
 
+    # Prompt context
+    CONTEXT_TOKEN_BUDGET = 3000  # Estimated tokens of retrieved passages per prompt
+    CONTEXT_MIN_PASSAGE_TOKENS = 64  # A passage is not truncated to fewer tokens than this
+    OLLAMA_NUM_CTX_MIN = 2048
+    OLLAMA_NUM_CTX_MAX = 8192  # Keep within the generation model's context window
+    OLLAMA_NUM_CTX_STEP = 1024  # num_ctx is rounded up to a multiple, so similar prompts reuse the loaded model
+    OLLAMA_NUM_CTX_MARGIN = 128  # Tokens added for the chat template
+    OLLAMA_NUM_CTX_MARGIN_RATIO = 0.25  # Prompts are sized at least this much above the estimate; raised by observed prompt_eval_count
+
+    # Batched embedding
+    EMBEDDING_BATCH_SIZE = 32  # Texts per batch
+    EMBEDDING_MAX_CONCURRENCY = 4  # Batches in flight at once
+    EMBEDDING_BATCH_REQUESTS = True  # One /api/embed request per batch (Ollama 0.3+); False sends one request per text
+
+    # Async Ollama client
+    OLLAMA_HOST = "http://localhost:11434"
+    OLLAMA_MAX_CONNECTIONS = 20  # Shared keep-alive pool size
+    OLLAMA_EMBED_TIMEOUT = 30  # Seconds per embedding call
+    OLLAMA_GENERATE_TIMEOUT = 300  # Seconds per generation (idle time between chunks when streaming)
+    OLLAMA_MAX_RETRIES = 2  # Retries after the first attempt
+    OLLAMA_RETRY_BACKOFF = 0.5  # Base delay in seconds, doubled per retry plus jitter
+
+    # Persistent embedding cache
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_PATH = "./cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Stored vector bytes before LRU eviction
+
+    # In-memory query embedding cache
+    QUERY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    QUERY_CACHE_TTL_SECONDS = 3600
+
+    # Cross-encoder reranking of search results (needs sentence-transformers)
+    RERANK_ENABLED = False  # Default for Query.rerank
+    RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES = 50  # Results fetched and scored before cutting to top_k
+    RERANK_BATCH_SIZE = 64  # Pairs per forward pass; at least RERANK_CANDIDATES scores them in one batch
+    RERANK_MAX_LENGTH = 512  # Tokens of query plus passage seen by the model
+    RERANK_CACHE_ENTRIES = 100000  # Cached pair scores
+
+    # Diversity reranking of RAG context (maximal marginal relevance)
+    MMR_ENABLED = True
+    MMR_LAMBDA = 0.7  # 1.0 ranks by relevance only; lower values favour diversity
+    MMR_TOP_K = 8  # Passages picked for a prompt, within CONTEXT_TOKEN_BUDGET
+
+    # Lexical (BM25) and hybrid search
+    SEARCH_MODE = "vector"  # Default Query.mode: "vector", "hybrid" (BM25 + vector, RRF) or "lexical"
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    HYBRID_CANDIDATES = 50  # Results taken from each retriever before fusion
+    HYBRID_RRF_K = 60
+
+    # Batch search (POST /search/batch)
+    SEARCH_BATCH_MAX_QUERIES = 1000  # Larger batches are rejected with 400
+
+    # Metadata filters (Query.where / Query.where_document)
+    METADATA_INDEX_KEYS = ("document_type", "file_type", "filename", "parent_id")  # Fields with per-value chunk counts
+    FILTER_EXACT_SEARCH_MAX = 2000  # Filters matching at most this many chunks are scored exactly instead of via HNSW
+
+    # Document chunking
+    CHUNK_UNIT = "tokens"  # "tokens" (estimated) or "chars"
+    CHUNK_SIZE = 512
+    CHUNK_OVERLAP = 64
+
+    # Document listing (GET /documents)
+    DOCUMENTS_PAGE_SIZE = 100  # Documents per page when no limit is given
+    DOCUMENTS_MAX_PAGE_SIZE = 1000  # Larger limits are clamped
+    DOCUMENTS_SCAN_BATCH_SIZE = 2000  # Chunk metadata read per collection.get while paging
+
+    # Bulk ingestion
+    BULK_INGEST_BATCH_SIZE = 500  # Documents embedded and written per flush
+    BULK_MAX_LINE_BYTES = 16 * 1024 * 1024  # Longer NDJSON lines are rejected without being buffered
+    CHROMA_ADD_BATCH_SIZE = 5000  # Records per collection.add call
+
+    # Background upload ingestion
+    INGEST_WORKERS = 2  # Jobs processed concurrently
+    INGEST_QUEUE_SIZE = 100  # Jobs waiting before uploads are rejected with 503
+    INGEST_JOB_HISTORY = 1000  # Finished jobs kept for status polling
+
+    # Uploads
+    UPLOAD_MAX_BYTES = 200 * 1024 * 1024  # Larger uploads are rejected with 413
+    UPLOAD_TMP_DIR = None  # Where uploads wait for their ingestion job (None = system temp dir)
+    UPLOAD_READ_CHUNK_BYTES = 1024 * 1024  # Bytes copied per read
+
+    # Structured (JSON array / JSON Lines) uploads
+    RECORDS_UPLOAD_MAX_BYTES = 20 * 1024 * 1024 * 1024  # Limit for POST /upload/records
+    RECORDS_READ_CHUNK_BYTES = 1024 * 1024  # Bytes parsed per read of a JSON array
+    RECORDS_MAX_RECORD_BYTES = 64 * 1024 * 1024  # Longer array elements abort the upload; longer JSON Lines lines are skipped as errors
+
+    # PDF extraction
+    PDF_EXTRACTION_WORKERS = None  # Worker processes (None = CPU count)
+    PDF_PAGES_PER_TASK = 25  # Pages per parallel extraction task
+    PDF_EXTRACTION_STRATEGY = "combined"  # "combined" (all extractors) or "fast" (single PyMuPDF pass)
+    PDF_FAST_DETECT_TABLES = True  # Re-read pages with tables using pdfplumber in fast mode
+    PDF_STREAMING_MIN_PAGES = 200  # PDFs with at least this many pages are indexed page by page
+    PDF_STREAM_BUFFER_PAGES = 8  # Pages parsed ahead of indexing (rounded up to whole PDF_PAGES_PER_TASK ranges)
+    PDF_STREAM_PAGES_PER_BATCH = 10  # Pages chunked, embedded and written together
+
+    # Extraction result cache
+    EXTRACTION_CACHE_ENABLED = True
+    EXTRACTION_CACHE_PATH = "./cache/extractions.sqlite3"
+    EXTRACTION_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # Compressed result bytes before LRU eviction
+
+    # Deduplication of combined extractor output
+    DEDUP_SHINGLE_SIZE = 5  # Words per shingle
+    DEDUP_NEAR_DUPLICATE_THRESHOLD = 0.8  # Share of a paragraph's shingles already seen that marks it a duplicate
+    DEDUP_MAX_HASHES = 4000000  # Shingle (and line) hashes remembered per text, 8 bytes each; the oldest are forgotten beyond it
+
+    # Near-duplicate documents at ingest time
+    DUPLICATE_POLICY = "skip"  # "skip", "merge" (record on the existing document), "version" (replace it) or "off"
+    DUPLICATE_THRESHOLD = 0.9  # Estimated Jaccard similarity of word shingles
+    MINHASH_PERMUTATIONS = 64
+    MINHASH_LSH_BANDS = 16  # Must divide MINHASH_PERMUTATIONS
+
 config = Config()
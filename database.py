@@ -1,8 +1,16 @@
+import asyncio
 import logging
+import httpx
 import ollama
 import chromadb
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from config import config
+from utils.bm25 import bm25_index
+from utils.duplicate_index import duplicate_index, prefix_index
+from utils.embedding_cache import embedding_cache
+from utils.metadata_index import metadata_index
+from utils.ollama_client import ollama_client
 
 chroma_client = None
 collection = None
@@ -15,7 +23,7 @@ def get_collection():
     return collection
 
 
-def get_ollama_embedding(text: str, model: str = "nomic-embed-text:v1.5") -> list[float]:
+def _request_ollama_embedding(text: str, model: str) -> list[float]:
     """Get embeddings from Ollama model"""
     try:
         if not text.strip():
@@ -38,6 +46,186 @@ def get_ollama_embedding(text: str, model: str = "nomic-embed-text:v1.5") -> lis
         logging.error(f"❌ Ollama embedding failed: {e}")
         return []
 
+
+async def _request_ollama_embedding_async(text: str, model: str) -> list[float]:
+    """Get embeddings from Ollama without blocking the event loop"""
+    try:
+        if not text.strip():
+            logging.error("❌ Empty text provided for embedding")
+            return []
+
+        embedding = await ollama_client.embeddings(text, model)
+        if not embedding:
+            logging.error("❌ Ollama returned empty embedding")
+        return embedding
+    except Exception as e:
+        logging.error(f"❌ Ollama embedding failed: {e!r}")
+        return []
+
+
+def _request_ollama_embeddings(texts: list[str], model: str) -> list[list[float]]:
+    """Embed a batch in one /api/embed request, or text by text on servers without it"""
+    results = [[] for _ in texts]
+    indexes = [i for i, text in enumerate(texts) if text.strip()]
+    if len(indexes) < len(texts):
+        logging.error("❌ Empty text provided for embedding")
+    if not indexes:
+        return results
+    if config.EMBEDDING_BATCH_REQUESTS and ollama_client.embed_supported:
+        try:
+            response = httpx.post(
+                f"{config.OLLAMA_HOST}/api/embed",
+                json={"model": model, "input": [texts[i] for i in indexes]},
+                timeout=config.OLLAMA_EMBED_TIMEOUT * len(indexes)
+            )
+            if response.status_code == 404 and "model" not in response.text:
+                ollama_client.embed_supported = False
+            response.raise_for_status()
+            return _place_embeddings(results, indexes, response.json().get("embeddings", []))
+        except Exception as e:
+            if ollama_client.embed_supported:
+                logging.error(f"❌ Ollama batch embedding failed: {e}")
+                return results
+            logging.info("ℹ️ Ollama has no /api/embed endpoint, embedding one text per request")
+    for i in indexes:
+        results[i] = _request_ollama_embedding(texts[i], model)
+    return results
+
+
+async def _request_ollama_embeddings_async(texts: list[str], model: str) -> list[list[float]]:
+    """Async counterpart of ``_request_ollama_embeddings``"""
+    results = [[] for _ in texts]
+    indexes = [i for i, text in enumerate(texts) if text.strip()]
+    if len(indexes) < len(texts):
+        logging.error("❌ Empty text provided for embedding")
+    if not indexes:
+        return results
+    if config.EMBEDDING_BATCH_REQUESTS and ollama_client.embed_supported:
+        try:
+            embeddings = await ollama_client.embed([texts[i] for i in indexes], model)
+            return _place_embeddings(results, indexes, embeddings)
+        except Exception as e:
+            if ollama_client.embed_supported:
+                logging.error(f"❌ Ollama batch embedding failed: {e!r}")
+                return results
+            logging.info("ℹ️ Ollama has no /api/embed endpoint, embedding one text per request")
+    for i in indexes:
+        results[i] = await _request_ollama_embedding_async(texts[i], model)
+    return results
+
+
+def _place_embeddings(results: list, indexes: list[int], embeddings: list) -> list[list[float]]:
+    if len(embeddings) != len(indexes):
+        logging.error(f"❌ Ollama returned {len(embeddings)} embeddings for {len(indexes)} texts")
+        return results
+    for i, embedding in zip(indexes, embeddings):
+        results[i] = embedding
+    logging.info(f"✅ Generated {len(indexes)} embeddings in one request")
+    return results
+
+
+def _split_cached(texts: list[str], model: str, use_cache: bool) -> tuple[list, list[int]]:
+    """Look texts up in the embedding cache, returning results and the indexes still missing"""
+    if not use_cache:
+        return [None] * len(texts), list(range(len(texts)))
+    cached = embedding_cache.get_many(model, texts)
+    return cached, [i for i, embedding in enumerate(cached) if embedding is None]
+
+
+def get_ollama_embedding(text: str, model: str = "nomic-embed-text:v1.5", use_cache: bool = True) -> list[float]:
+    """Get embeddings from Ollama model, served from the embedding cache when possible"""
+    return get_ollama_embeddings([text], model, use_cache=use_cache)[0]
+
+
+def get_ollama_embeddings(
+    texts: list[str],
+    model: str = "nomic-embed-text:v1.5",
+    batch_size: int = None,
+    max_concurrency: int = None,
+    use_cache: bool = True,
+) -> list[list[float]]:
+    """Get embeddings for many texts at once.
+
+    Cached embeddings are reused. The remaining texts are split into batches
+    of ``batch_size``; each batch is one /api/embed request (with
+    EMBEDDING_BATCH_REQUESTS, on Ollama 0.3+; older servers get one request
+    per text) and up to ``max_concurrency`` batches are in flight at once.
+    The result is in input order; failed texts get an empty list, as with
+    ``get_ollama_embedding``.
+    """
+    if not texts:
+        return []
+
+    use_cache = use_cache and config.EMBEDDING_CACHE_ENABLED
+    embeddings, missing = _split_cached(texts, model, use_cache)
+    if not missing:
+        return embeddings
+
+    batch_size = max(1, batch_size or config.EMBEDDING_BATCH_SIZE)
+    max_concurrency = max(1, max_concurrency or config.EMBEDDING_MAX_CONCURRENCY)
+    pending = [texts[i] for i in missing]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def embed_batch(batch: list[str]) -> list[list[float]]:
+        return _request_ollama_embeddings(batch, model)
+
+    if len(batches) == 1:
+        results = [embed_batch(batches[0])]
+    else:
+        # pool.map yields batch results in submission order
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as pool:
+            results = list(pool.map(embed_batch, batches))
+        logging.info(f"✅ Generated {len(pending)} embeddings in {len(batches)} batches")
+
+    fresh = [embedding for batch in results for embedding in batch]
+    for i, embedding in zip(missing, fresh):
+        embeddings[i] = embedding
+    if use_cache:
+        embedding_cache.put_many(model, pending, fresh)
+    return embeddings
+
+
+async def get_ollama_embedding_async(text: str, model: str = "nomic-embed-text:v1.5", use_cache: bool = True) -> list[float]:
+    """Get embeddings from Ollama without blocking the event loop"""
+    return (await get_ollama_embeddings_async([text], model, use_cache=use_cache))[0]
+
+
+async def get_ollama_embeddings_async(
+    texts: list[str],
+    model: str = "nomic-embed-text:v1.5",
+    batch_size: int = None,
+    max_concurrency: int = None,
+    use_cache: bool = True,
+) -> list[list[float]]:
+    """Async counterpart of ``get_ollama_embeddings``; output order matches input"""
+    if not texts:
+        return []
+
+    use_cache = use_cache and config.EMBEDDING_CACHE_ENABLED
+    embeddings, missing = await asyncio.to_thread(_split_cached, texts, model, use_cache)
+    if not missing:
+        return embeddings
+
+    batch_size = max(1, batch_size or config.EMBEDDING_BATCH_SIZE)
+    max_concurrency = max(1, max_concurrency or config.EMBEDDING_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def embed_batch(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            return await _request_ollama_embeddings_async(batch, model)
+
+    pending = [texts[i] for i in missing]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+
+    fresh = [embedding for batch in results for embedding in batch]
+    for i, embedding in zip(missing, fresh):
+        embeddings[i] = embedding
+    if use_cache:
+        await asyncio.to_thread(embedding_cache.put_many, model, pending, fresh)
+    return embeddings
+
+
 async def startup_event():
     """Initialize ChromaDB on app startup"""
     global chroma_client, collection
@@ -58,6 +246,19 @@ async def startup_event():
 
         if collection:
             logging.info(f"📂 Collection '{collection.name}' is ready")
+            try:
+                duplicate_index.rebuild(collection)
+                prefix_index.rebuild(collection)
+            except Exception as e:
+                logging.warning(f"⚠️ Could not load duplicate index: {e}")
+            try:
+                bm25_index.rebuild(collection)
+            except Exception as e:
+                logging.warning(f"⚠️ Could not load BM25 index: {e}")
+            try:
+                metadata_index.rebuild(collection)
+            except Exception as e:
+                logging.warning(f"⚠️ Could not load metadata index: {e}")
         else:
             logging.error("❌ Collection initialization returned None!")
 
@@ -0,0 +1,294 @@
+"""Ingest a directory tree into the RAG collection
+
+Walks the directory for supported files, extracts PDFs in the extraction
+process pool, embeds and stores documents in batches and writes them to
+the same CHROMADB_PATH collection the API server uses. Every finished file
+is appended to a checkpoint file, so an interrupted run resumes where it
+stopped: files already recorded with the same size and modification time
+are skipped. Run it while the API server is stopped, since both would
+write to the same Chroma storage.
+
+Usage:
+    python -m ingest <dir> [--checkpoint FILE] [--strategy combined|fast]
+                           [--workers N] [--concurrency N] [--batch-size N]
+                           [--retry-failed] [--verbose]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import database
+from config import config
+from models import Document
+from pdf_scraper import EXTRACTION_STRATEGIES, pdf_scraper, shutdown_extraction_pool
+from routes.documents import store_documents
+from utils.jobs import IngestionJob
+from utils.ollama_client import ollama_client
+
+logger = logging.getLogger("Ingest-CLI")
+
+SUPPORTED_SUFFIXES = {".txt", ".md", ".json", ".pdf"}
+CHECKPOINT_NAME = ".ingest_checkpoint.jsonl"
+
+
+class Checkpoint:
+    """Append-only JSON Lines record of finished files
+
+    Each line is ``{"path", "size", "mtime", "id"}`` for a stored file or
+    ``{"path", "size", "mtime", "error"}`` for a failed one; the last line
+    for a path wins. A line cut short by a crash is ignored on load.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[entry["path"]] = entry
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, rel_path: str, stat: os.stat_result, retry_failed: bool) -> bool:
+        entry = self.entries.get(rel_path)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            return False
+        return "error" not in entry or not retry_failed
+
+    def record(self, entries: List[Dict[str, Any]]):
+        """Append entries and flush them to disk"""
+        for entry in entries:
+            self.entries[entry["path"]] = entry
+            self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def find_files(root: Path, exclude: Path) -> List[Path]:
+    """Supported files under root in a stable order"""
+    return sorted(
+        path for path in root.rglob("*")
+        if path.suffix.lower() in SUPPORTED_SUFFIXES and path.is_file() and path != exclude
+    )
+
+
+async def load_document(path: Path, rel_path: str, strategy: Optional[str]) -> Document:
+    """Extract one file into a Document, as POST /upload/ would"""
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        result = await pdf_scraper.extract_text_from_pdf_async(path, path.name, strategy)
+        if not result["success"]:
+            raise ValueError(f"PDF extraction failed: {result.get('error', 'Unknown error')}")
+        text, metadata = result["text"], result["metadata"]
+        title = metadata.get("pdf_title", path.stem)
+    else:
+        content = await asyncio.to_thread(path.read_bytes)
+        try:
+            text = content.decode("utf-8")
+        except UnicodeDecodeError:
+            text = content.decode("latin-1")
+        metadata = {"filename": path.name, "file_type": suffix}
+        title = path.stem
+    if not text.strip():
+        raise ValueError("File contains no readable text")
+    metadata.update({"upload_method": "cli_ingest", "source_path": rel_path})
+    return Document(title=title, content=text, metadata=metadata)
+
+
+def format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class Progress:
+    """Throughput and ETA over the files of this run"""
+
+    def __init__(self, total_files: int, total_bytes: int):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.stored = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.start_time = time.time()
+
+    def report(self):
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        byte_rate = self.bytes / elapsed
+        eta = (self.total_bytes - self.bytes) / byte_rate if byte_rate else 0
+        logger.info(
+            f"📊 {self.files}/{self.total_files} files ({self.bytes / self.total_bytes:.1%} of bytes), "
+            f"{self.files / elapsed:.2f} files/s, {byte_rate / 1e6:.2f} MB/s, "
+            f"elapsed {format_seconds(elapsed)}, ETA {format_seconds(eta)}"
+        )
+
+
+async def ingest(root: Path, checkpoint: Checkpoint, strategy: Optional[str], concurrency: int,
+                 batch_size: int, retry_failed: bool) -> Dict[str, Any]:
+    files = []
+    skipped = 0
+    for path in find_files(root, checkpoint.path):
+        stat = path.stat()
+        rel_path = path.relative_to(root).as_posix()
+        if checkpoint.is_done(rel_path, stat, retry_failed):
+            skipped += 1
+        else:
+            files.append((path, rel_path, stat))
+    logger.info(f"📂 {len(files)} files to ingest under {root} ({skipped} already in the checkpoint)")
+
+    progress = Progress(len(files), max(1, sum(stat.st_size for _, _, stat in files)))
+    # Shared by every batch, so its stage timings add up over the run
+    timings = IngestionJob(id="cli", filename=str(root))
+    extract_seconds = 0.0
+    pending: "asyncio.Queue[Tuple[Path, str, os.stat_result]]" = asyncio.Queue()
+    for item in files:
+        pending.put_nowait(item)
+    # Bounded, so extraction cannot run far ahead of embedding
+    extracted: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 2)
+
+    async def extract_worker():
+        nonlocal extract_seconds
+        while True:
+            try:
+                path, rel_path, stat = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            entry = {"path": rel_path, "size": stat.st_size, "mtime": stat.st_mtime}
+            start_time = time.time()
+            try:
+                document = await load_document(path, rel_path, strategy)
+            except Exception as e:
+                document = None
+                entry["error"] = str(e)
+                logger.warning(f"⚠️ Skipping {rel_path}: {e}")
+            extract_seconds += time.time() - start_time
+            await extracted.put((entry, document))
+
+    async def flush(batch: List[Tuple[Dict[str, Any], Document]]):
+        entries = [entry for entry, _ in batch]
+        documents = [document for _, document in batch]
+        duplicates = {}
+        try:
+            ids = await store_documents(documents, document_type="cli_ingest", job=timings, duplicates=duplicates)
+            for entry, doc_id in zip(entries, ids):
+                entry["id"] = doc_id
+            progress.stored += len(documents)
+            progress.duplicates += len(duplicates)
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            logger.error(f"❌ Failed to store a batch of {len(documents)} documents: {error}")
+            for entry in entries:
+                entry["error"] = error
+            progress.failed += len(documents)
+        checkpoint.record(entries)
+
+    workers = [asyncio.create_task(extract_worker()) for _ in range(concurrency)]
+    done_workers = asyncio.gather(*workers)
+    batch: List[Tuple[Dict[str, Any], Document]] = []
+    failed_entries: List[Dict[str, Any]] = []
+    for _ in range(len(files)):
+        entry, document = await extracted.get()
+        progress.files += 1
+        progress.bytes += entry["size"]
+        if document is None:
+            progress.failed += 1
+            failed_entries.append(entry)
+            continue
+        batch.append((entry, document))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            checkpoint.record(failed_entries)
+            batch, failed_entries = [], []
+            progress.report()
+    if batch:
+        await flush(batch)
+        progress.report()
+    checkpoint.record(failed_entries)
+    await done_workers
+
+    wall_seconds = time.time() - progress.start_time
+    return {
+        "files": len(files),
+        "skipped": skipped,
+        "stored": progress.stored,
+        "duplicates": progress.duplicates,
+        "failed": progress.failed,
+        "bytes": progress.bytes,
+        "wall_seconds": round(wall_seconds, 2),
+        "stage_seconds": {"extract": round(extract_seconds, 2), **timings.stage_timings},
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    wall = max(summary["wall_seconds"], 1e-6)
+    print(f"\nFiles: {summary['files']} processed, {summary['stored']} stored "
+          f"({summary['duplicates']} near-duplicates), {summary['failed']} failed, {summary['skipped']} skipped")
+    print(f"Throughput: {summary['files'] / wall:.2f} files/s, {summary['bytes'] / wall / 1e6:.2f} MB/s "
+          f"over {format_seconds(wall)}")
+    print("Stage timings (extract is summed over concurrent files):")
+    for stage, seconds in summary["stage_seconds"].items():
+        print(f"  {stage:10} {seconds:10.2f}s")
+
+
+async def run(args: argparse.Namespace) -> int:
+    root = Path(args.directory).resolve()
+    if not root.is_dir():
+        print(f"Not a directory: {root}", file=sys.stderr)
+        return 2
+
+    await database.startup_event()
+    if database.collection is None:
+        print(f"Could not open the ChromaDB collection at {config.CHROMADB_PATH}", file=sys.stderr)
+        return 1
+
+    checkpoint = Checkpoint(Path(args.checkpoint) if args.checkpoint else root / CHECKPOINT_NAME)
+    try:
+        summary = await ingest(root, checkpoint, args.strategy, args.concurrency, args.batch_size, args.retry_failed)
+    finally:
+        checkpoint.close()
+        shutdown_extraction_pool()
+        await ollama_client.aclose()
+    print_summary(summary)
+    return 1 if summary["failed"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Directory searched recursively for .pdf, .txt, .md and .json files")
+    parser.add_argument("--checkpoint", help=f"Checkpoint file (default: <directory>/{CHECKPOINT_NAME})")
+    parser.add_argument("--strategy", choices=EXTRACTION_STRATEGIES, help="PDF extraction strategy (default: PDF_EXTRACTION_STRATEGY)")
+    parser.add_argument("--workers", type=int, help="Extraction worker processes (default: PDF_EXTRACTION_WORKERS)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Files extracted at once")
+    parser.add_argument("--batch-size", type=int, default=32, help="Documents embedded and stored together")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry files that failed in an earlier run")
+    parser.add_argument("--verbose", action="store_true", help="Show the application's own log messages")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    logger.setLevel(logging.INFO)
+    if args.workers:
+        config.PDF_EXTRACTION_WORKERS = args.workers
+    args.concurrency = max(1, args.concurrency)
+    args.batch_size = max(1, args.batch_size)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,12 @@
 import os
 import logging
 import time
-import requests
 from config import config
 from rag import generate_answer_extractive
 import logging
-import ollama
+from utils.chunker import estimate_tokens
+from utils.context_packer import num_ctx_for, pack_context, prompt_estimate_limit, prompt_tokens
+from utils.ollama_client import ollama_client
 from utils.ollama_monitor import record_ollama_request
 
 # # Try to import OpenAI
@@ -35,20 +36,8 @@ from utils.ollama_monitor import record_ollama_request
 
 
 
-def generate_answer(query: str, context_docs: list[str], model: str = "gemma3:1b") -> tuple[str, str]:
-    """Generate an answer using Ollama, fallback to extractive"""
-    start_time = time.time()
-    max_retries = 2  # Prevent infinite loops
-    
-    for attempt in range(max_retries):
-        try:
-            # Check if model is available
-            if not _is_model_available(model):
-                logging.warning(f"Model {model} not available, trying to pull...")
-                _pull_model_if_needed(model)
-            
-            context = "\n\n".join(context_docs[:3])  # Use up to 3 documents for better context
-            prompt = f"""Context:
+def build_prompt(query: str, context: str) -> str:
+    return f"""Context:
 {context}
 
 Question: {query}
@@ -62,16 +51,54 @@ Instructions: Please provide a comprehensive and detailed answer based on the co
 
 Answer:"""
 
-            response = ollama.generate(
+def prepare_prompt(query: str, context_docs: list[str]) -> tuple[str, list[str]]:
+    """Build the prompt from as many of the passages (most similar first) as the token budget allows
+
+    Returns the prompt and the passages it uses.
+    """
+    room = prompt_estimate_limit(config.MAX_RESPONSE_TOKENS)
+    budget = max(0, min(config.CONTEXT_TOKEN_BUDGET, room - estimate_tokens(build_prompt(query, ""))))
+    packed = pack_context(context_docs, budget)
+    prompt = build_prompt(query, packed.text)
+    logging.info(
+        f"🧮 Packed {len(packed.passages)}/{packed.available} passages (~{packed.tokens} tokens"
+        f"{', last one truncated' if packed.truncated else ''}) into the prompt"
+    )
+    return prompt, packed.passages
+
+def generation_options(prompt: str) -> dict:
+    """Ollama options with num_ctx sized to the prompt and response"""
+    return {
+        "temperature": config.TEMPERATURE,
+        "num_predict": config.MAX_RESPONSE_TOKENS,
+        "num_ctx": num_ctx_for(prompt, config.MAX_RESPONSE_TOKENS),
+        "stop": ["Question:", "Context:", "Human:", "Assistant:"]
+    }
+
+async def generate_answer(query: str, context_docs: list[str], model: str = "gemma3:1b") -> tuple[str, str]:
+    """Generate an answer using Ollama, fallback to extractive
+
+    ``context_docs`` should be ordered most similar first; they are packed
+    into the prompt up to CONTEXT_TOKEN_BUDGET estimated tokens.
+    """
+    start_time = time.time()
+    max_retries = 2  # Prevent infinite loops
+    prompt, context_docs = prepare_prompt(query, context_docs)
+    
+    for attempt in range(max_retries):
+        try:
+            # Check if model is available
+            if not await _is_model_available(model):
+                logging.warning(f"Model {model} not available, trying to pull...")
+                await _pull_model_if_needed(model)
+            
+            response = await ollama_client.generate(
                 model=model,
                 prompt=prompt,
-                options={
-                    "temperature": config.TEMPERATURE, 
-                    "num_predict": config.MAX_RESPONSE_TOKENS,
-                    "stop": ["Question:", "Context:", "Human:", "Assistant:"]
-                }
+                options=generation_options(prompt)
             )
 
+            prompt_tokens.observe(prompt, response.get("prompt_eval_count"))
             answer = response["response"].strip()
             
             # Check minimum response length (but don't recurse infinitely)
@@ -107,36 +134,17 @@ Answer:"""
 async def generate_answer_streaming(query: str, context_docs: list[str], model: str = "gemma3:1b"):
     """Generate an answer using Ollama streaming with optimized performance"""
     start_time = time.time()
+    prompt, packed_docs = prepare_prompt(query, context_docs)
     try:
         # Check if model is available
-        if not _is_model_available(model):
+        if not await _is_model_available(model):
             logging.warning(f"Model {model} not available, trying to pull...")
-            _pull_model_if_needed(model)
+            await _pull_model_if_needed(model)
         
-        context = "\n\n".join(context_docs[:3])  # Use up to 3 documents for better context
-        prompt = f"""Context:
-{context}
-
-Question: {query}
-
-Instructions: Please provide a comprehensive and detailed answer based on the context provided. Your response should:
-1. Be thorough and well-explained
-2. Include relevant details and examples from the context
-3. Be at least 100 words long
-4. Address all aspects of the question
-5. Use clear and professional language
-
-Answer:"""
-
-        stream = ollama.generate(
+        stream = ollama_client.generate_stream(
             model=model,
             prompt=prompt,
-            options={
-                "temperature": config.TEMPERATURE, 
-                "num_predict": config.MAX_RESPONSE_TOKENS,
-                "stop": ["Question:", "Context:", "Human:", "Assistant:"]
-            },
-            stream=True
+            options=generation_options(prompt)
         )
 
         accumulated_text = ""
@@ -144,7 +152,9 @@ Answer:"""
         chunk_count = 0
         max_chunks = config.MAX_RESPONSE_TOKENS // 10  # Approximate chunk limit
         
-        for chunk in stream:
+        async for chunk in stream:
+            if chunk.get("prompt_eval_count"):
+                prompt_tokens.observe(prompt, chunk["prompt_eval_count"])
             if chunk.get("response"):
                 buffer += chunk["response"]
                 chunk_count += 1
@@ -222,7 +232,7 @@ Answer:"""
         
         logging.warning(f"⚠️ Ollama streaming generation failed: {e}")
         # Fallback to non-streaming with simulated streaming
-        answer, _ = generate_answer(query, context_docs, model)
+        answer, _ = await generate_answer(query, packed_docs, model)
         
         # Simulate streaming by breaking the answer into chunks
         words = answer.split()
@@ -260,28 +270,20 @@ def ensure_proper_ending(text: str) -> str:
     
     return text
 
-def _is_model_available(model: str) -> bool:
+async def _is_model_available(model: str) -> bool:
     """Check if a model is available in Ollama"""
     try:
-        response = requests.get(f"http://localhost:11434/api/tags", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            available_models = [m['name'] for m in data.get('models', [])]
-            return model in available_models
+        return model in await ollama_client.list_models()
     except Exception as e:
         logging.debug(f"Error checking model availability: {e}")
     return False
 
-def _pull_model_if_needed(model: str):
+async def _pull_model_if_needed(model: str):
     """Pull a model if it's not available"""
     try:
         logging.info(f"Pulling model {model}...")
-        response = requests.post(f"http://localhost:11434/api/pull", 
-                               json={"name": model}, timeout=300)
-        if response.status_code == 200:
-            logging.info(f"Successfully pulled model {model}")
-        else:
-            logging.error(f"Failed to pull model {model}: {response.status_code}")
+        await ollama_client.pull(model)
+        logging.info(f"Successfully pulled model {model}")
     except Exception as e:
         logging.error(f"Error pulling model {model}: {e}")
 
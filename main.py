@@ -4,6 +4,8 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from routes import documents, search, rag_routes, upload, health, monitoring
 from database import startup_event
+from config import config
+from pdf_scraper import shutdown_extraction_pool
 from contextlib import asynccontextmanager
 import logging
 from logging.handlers import RotatingFileHandler
@@ -11,8 +13,10 @@ import sys
 
 # Import monitoring system
 from utils.monitoring import monitor
-from utils.middleware import MonitoringMiddleware, SecurityMiddleware, RateLimitingMiddleware
+from utils.middleware import MonitoringMiddleware, SecurityMiddleware, RateLimitingMiddleware, UploadSizeLimitMiddleware
 from utils.ollama_monitor import start_ollama_monitoring
+from utils.ollama_client import ollama_client
+from utils.jobs import ingestion_queue
 
 # Configure logging
 log_formatter = logging.Formatter(
@@ -43,6 +47,9 @@ async def lifespan(app: FastAPI):
     # Startup
     await startup_event()
     
+    # Start background ingestion workers
+    await ingestion_queue.start()
+    
     # Start monitoring system
     monitor.start_monitoring()
     
@@ -53,6 +60,9 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    await ingestion_queue.stop()
+    shutdown_extraction_pool()
+    await ollama_client.aclose()
     monitor.stop_monitoring()
     logging.info("Application shutdown complete")
 
@@ -69,6 +79,11 @@ app = FastAPI(
 app.add_middleware(MonitoringMiddleware)
 app.add_middleware(SecurityMiddleware)
 app.add_middleware(RateLimitingMiddleware, requests_per_minute=200)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=config.UPLOAD_MAX_BYTES,
+    path_limits={"/upload/records": config.RECORDS_UPLOAD_MAX_BYTES}
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -5,6 +5,11 @@ class Document(BaseModel):
     title: str
     content: str
     metadata: Optional[Dict[str, Any]] = {}
+    source_key: Optional[str] = None  # Stable source identity; re-sending it updates the document in place
+
+class BulkDocument(Document):
+    id: Optional[str] = None
+    embedding: Optional[List[float]] = None
 
 class DocumentResponse(BaseModel):
     id: str
@@ -13,11 +18,23 @@ class DocumentResponse(BaseModel):
     metadata: Dict[str, Any]
     created_at: str
 
+class DocumentListItem(BaseModel):
+    # An entry of GET /documents; fields left out with ``fields=`` are absent
+    id: str
+    title: Optional[str] = None
+    content: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    created_at: Optional[str] = None
+
 class Query(BaseModel):
     question: str
     top_k: Optional[int] = 3
     threshold: Optional[float] = 0.3
     use_llm: Optional[bool] = True
+    mode: Optional[str] = None  # "vector", "hybrid" or "lexical" (default: SEARCH_MODE)
+    rerank: Optional[bool] = None  # Cross-encoder reranking (default: RERANK_ENABLED)
+    where: Optional[Dict[str, Any]] = None  # Chroma metadata filter; created_at also takes ISO date ranges
+    where_document: Optional[Dict[str, Any]] = None  # Chroma document filter, e.g. {"$contains": "invoice"}
 
 class SearchResult(BaseModel):
     id: str
@@ -25,6 +42,8 @@ class SearchResult(BaseModel):
     content: str
     similarity: float
     metadata: Dict[str, Any]
+    score: Optional[float] = None  # Ranking score in hybrid (RRF) and lexical (BM25) modes
+    rerank_score: Optional[float] = None  # Cross-encoder relevance in [0, 1], when reranked
 
 class RAGResponse(BaseModel):
     query: str
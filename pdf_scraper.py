@@ -1,12 +1,119 @@
+import asyncio
 import logging
+import multiprocessing
 import PyPDF2
 import pdfplumber
 import fitz  # PyMuPDF
 import re
 import io
-from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+import hashlib
 import json
+import mmap
+import os
+from pathlib import Path
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Iterator, AsyncIterator, Union
+from config import config
+from utils.dedup import deduplicate_text
+from utils.extraction_cache import extraction_cache
+
+EXTRACTION_STRATEGIES = ("combined", "fast")
+
+# Bump whenever a change alters extraction output, so cached results are not reused
+EXTRACTOR_VERSION = 1
+
+# A PDF is passed around either as its content or as the path of the file.
+# Paths are opened in place (PyPDF2 through a read-only memory map that is
+# closed after use), so large uploads are not copied into every extractor
+# and pool worker.
+PDFSource = Union[bytes, str, Path]
+
+
+def open_fitz(source: PDFSource):
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def open_pdfplumber(source: PDFSource):
+    return pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+@contextmanager
+def open_pypdf2(source: PDFSource) -> Iterator[PyPDF2.PdfReader]:
+    """PyPDF2 reader for the block; a file's memory map is closed on exit"""
+    if isinstance(source, bytes):
+        yield PyPDF2.PdfReader(io.BytesIO(source))
+        return
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield PyPDF2.PdfReader(mapped)
+
+
+def pdf_size(source: PDFSource) -> int:
+    return len(source) if isinstance(source, bytes) else os.path.getsize(source)
+
+
+def pdf_digest(source: PDFSource) -> str:
+    """SHA-256 of the PDF content (files are hashed in blocks)"""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extraction_cache_key(source: PDFSource, strategy: str, pages: bool = False) -> str:
+    """Cache key from the PDF digest, extractor version, strategy and output-affecting options
+
+    ``pages`` keys the per-page results of ``PDFScraper.aiter_pages``, which
+    are cleaned page by page and so differ from whole-document results.
+    """
+    options = {
+        "digest": pdf_digest(source),
+        "version": EXTRACTOR_VERSION,
+        "strategy": strategy,
+        "detect_tables": config.PDF_FAST_DETECT_TABLES,
+        "shingle_size": config.DEDUP_SHINGLE_SIZE,
+        "near_duplicate_threshold": config.DEDUP_NEAR_DUPLICATE_THRESHOLD,
+    }
+    if pages:
+        options["pages"] = True
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# Spans copied verbatim by the text cleaner: LaTeX inline/display math,
+# single-line equations and binary operations between identifiers (an
+# identifier only starts a span at a word boundary)
+MATH_SPAN_PATTERN = (
+    r"\$[^$\n]+\$"
+    r"|\\\([^)\n]+\\\)"
+    r"|\\\[[^\]\n]+\\\]"
+    r"|(?<![a-zA-Z0-9_])[a-zA-Z_][a-zA-Z0-9_]*[ \t]*=[ \t]*[\t\x20-\x3c\x3e-\x7e]+"
+    r"|(?<![a-zA-Z0-9_])[a-zA-Z_][a-zA-Z0-9_]*[ \t]*[+\-*/][ \t]*[a-zA-Z_][a-zA-Z0-9_]*"
+)
+
+# Blank runs stop where a "$...$", "\(" or "\[" math span begins
+MATH_SPAN_START = r"\$[^$\n]+\$|\\[(\[]"
+
+# Anything but ASCII word characters, whitespace and common punctuation
+UNSUPPORTED_CHAR = r"[^\w\s\-.,;:!?()\[\]{}\"']"
+
+# Everything the text cleaner rewrites, matched in one left-to-right pass
+# (a lone space is left alone)
+TEXT_TOKEN_RE = re.compile(
+    rf"(?P<math>{MATH_SPAN_PATTERN})"
+    r"|(?P<page>--- Page (?P<page_number>\d+) ---)"
+    r"|(?P<breaks>\n\s*\n\s*\n+)"
+    rf"|(?P<blank>(?:[ \t]|(?!{MATH_SPAN_START}){UNSUPPORTED_CHAR}){{2,}}|\t|{UNSUPPORTED_CHAR})",
+    re.ASCII,
+)
+
+HEADER_RE = re.compile(r"^[A-Z][A-Z\s]{3,}$")
+NUMBERED_HEADER_RE = re.compile(r"^\d+\.\s+[A-Z]")
 
 class PDFScraper:
     """State-of-the-art PDF text extraction utility with advanced features"""
@@ -14,85 +121,439 @@ class PDFScraper:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
     
-    def extract_text_from_pdf(self, pdf_content: bytes, filename: str) -> Dict[str, Any]:
+    def extract_text_from_pdf(self, pdf_content: PDFSource, filename: str, strategy: Optional[str] = None) -> Dict[str, Any]:
         """
         Extract text from PDF content using multiple advanced methods
         
         Args:
-            pdf_content: PDF file content as bytes
+            pdf_content: PDF file content as bytes, or the path of the PDF file
             filename: Original filename for logging
+            strategy: "combined" (all extractors, deduplicated) or "fast"
+                (single PyMuPDF pass); defaults to PDF_EXTRACTION_STRATEGY
             
         Returns:
             Dictionary containing extracted text and metadata
+        
+        Successful results are cached by the PDF's digest, so the same file
+        is only extracted once per strategy and extractor version.
         """
         try:
-            self.logger.info(f"🚀 Starting advanced PDF extraction for {filename}")
-            
-            # Extract with multiple methods
-            results = {
-                "pdfplumber": self._extract_with_pdfplumber(pdf_content),
-                "pymupdf": self._extract_with_pymupdf(pdf_content),
-                "pypdf2": self._extract_with_pypdf2(pdf_content)
-            }
+            strategy = self._resolve_strategy(strategy)
+            cache_key = self._cache_key(pdf_content, strategy)
+            cached = self._cache_lookup(cache_key, filename)
+        except Exception as e:
+            self.logger.error(f"❌ Advanced PDF extraction failed for {filename}: {e}")
+            return self._failed_result(filename, e)
+        if cached is not None:
+            return cached
+        return self._cache_store(cache_key, self._extract_uncached(pdf_content, filename, strategy))
+    
+    def _extract_uncached(self, pdf_content: PDFSource, filename: str, strategy: str) -> Dict[str, Any]:
+        """Extract a whole document in this process without consulting the cache"""
+        try:
+            self.logger.info(f"🚀 Starting {strategy} PDF extraction for {filename}")
             
-            # Analyze and combine results
-            combined_text = self._combine_extraction_results(results)
+            if strategy == "fast":
+                fast_result = self._extract_fast(pdf_content, filename)
+                return self._finish_extraction(fast_result["text"], fast_result["metadata"], filename, "fast_single_pass")
             
-            # Advanced text processing
-            processed_text = self._advanced_text_processing(combined_text)
+            # Extract with multiple methods
+            results = self._extract_page_range(pdf_content)
             
             # Extract comprehensive metadata
             metadata = self._extract_comprehensive_metadata(pdf_content, filename)
             
-            # Analyze content structure
-            content_analysis = self._analyze_content_structure(processed_text, metadata)
+            return self._finish_extraction(self._combine_extraction_results(results, metadata), metadata, filename)
             
-            self.logger.info(f"✅ Advanced PDF extraction completed for {filename}")
+        except Exception as e:
+            self.logger.error(f"❌ Advanced PDF extraction failed for {filename}: {e}")
+            return self._failed_result(filename, e)
+    
+    async def extract_text_from_pdf_async(self, pdf_content: PDFSource, filename: str, strategy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract text from PDF content in the extraction process pool
+        
+        Large PDFs are split into page ranges of PDF_PAGES_PER_TASK pages that
+        are extracted in parallel; the per-range results are merged back in
+        page order, so the output matches ``extract_text_from_pdf``. Pass a
+        path for large files so that workers open the file instead of
+        receiving a pickled copy of its content. Results are cached like
+        those of ``extract_text_from_pdf``.
+        """
+        try:
+            strategy = self._resolve_strategy(strategy)
+            cache_key = await asyncio.to_thread(self._cache_key, pdf_content, strategy)
+            cached = await asyncio.to_thread(self._cache_lookup, cache_key, filename)
+        except Exception as e:
+            self.logger.error(f"❌ Parallel PDF extraction failed for {filename}: {e}")
+            return self._failed_result(filename, e)
+        if cached is not None:
+            return cached
+        result = await self._extract_parallel(pdf_content, filename, strategy)
+        return await asyncio.to_thread(self._cache_store, cache_key, result)
+    
+    async def _extract_parallel(self, pdf_content: PDFSource, filename: str, strategy: str) -> Dict[str, Any]:
+        """Extract a document in the process pool without consulting the cache"""
+        loop = asyncio.get_running_loop()
+        pool = get_extraction_pool()
+        try:
+            self.logger.info(f"🚀 Starting parallel {strategy} PDF extraction for {filename}")
+            page_count = await loop.run_in_executor(pool, _count_pages, pdf_content)
+            pages_per_task = max(1, config.PDF_PAGES_PER_TASK)
             
-            return {
-                "text": processed_text,
-                "method_used": "advanced_combined",
-                "metadata": metadata,
-                "content_analysis": content_analysis,
-                "success": True
-            }
+            if page_count <= pages_per_task:
+                return await loop.run_in_executor(pool, _extract_document, pdf_content, filename, strategy)
+            
+            page_ranges = [(start, min(start + pages_per_task, page_count))
+                           for start in range(0, page_count, pages_per_task)]
+            
+            if strategy == "fast":
+                parts = await asyncio.gather(*(
+                    loop.run_in_executor(pool, _extract_fast_range, pdf_content, filename, page_range)
+                    for page_range in page_ranges
+                ))
+                fast_result = self._merge_fast_results(parts)
+                self.logger.info(f"📑 Extracted {page_count} pages of {filename} in {len(page_ranges)} parallel ranges")
+                return await loop.run_in_executor(
+                    pool, _finish_extraction, fast_result["text"], fast_result["metadata"], filename, "fast_single_pass"
+                )
+            
+            metadata_future = loop.run_in_executor(pool, _extract_metadata, pdf_content, filename)
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(pool, _extract_range, pdf_content, page_range)
+                for page_range in page_ranges
+            ))
+            results = self._merge_extraction_results(parts)
+            metadata = await metadata_future
+            
+            self.logger.info(f"📑 Extracted {page_count} pages of {filename} in {len(page_ranges)} parallel ranges")
+            return await loop.run_in_executor(pool, _combine_and_finish, results, metadata, filename)
             
         except Exception as e:
-            self.logger.error(f"❌ Advanced PDF extraction failed for {filename}: {e}")
-            return {
-                "text": "",
-                "method_used": "failed",
-                "metadata": {"filename": filename},
-                "success": False,
-                "error": str(e)
-            }
+            self.logger.error(f"❌ Parallel PDF extraction failed for {filename}: {e}")
+            return self._failed_result(filename, e)
+    
+    def iter_pages(self, pdf_content: PDFSource, filename: str, strategy: Optional[str] = None,
+                   page_range: Optional[Tuple[int, int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield cleaned text one page at a time
+        
+        Each item is ``{"page_number", "text", "metadata"}``; only the current
+        page's text is held, so memory stays bounded for very long PDFs and
+        consumers can index page 1 before later pages are parsed. With the
+        "combined" strategy each page's extractor outputs are deduplicated
+        against each other only. ``page_range`` is a (start, end) slice of
+        0-based page numbers.
+        """
+        strategy = self._resolve_strategy(strategy)
+        doc = open_fitz(pdf_content)
+        plumber = None
+        reader = None
+        readers = ExitStack()
+        try:
+            page_count = len(doc)
+            if strategy == "combined":
+                plumber = open_pdfplumber(pdf_content)
+                reader = readers.enter_context(open_pypdf2(pdf_content))
+            
+            start, end = page_range or (0, page_count)
+            for page_num in range(start, min(end, page_count)):
+                page_number = page_num + 1
+                if strategy == "fast":
+                    counts = {"text_blocks": 0, "image_blocks": 0, "total_text_length": 0}
+                    page_text = self._try_page("PyMuPDF", page_number, lambda: self._fast_page_text(doc.load_page(page_num), counts))
+                    if not page_text:
+                        plumber = plumber or open_pdfplumber(pdf_content)
+                        page_text = self._try_page("pdfplumber", page_number, lambda: self._pdfplumber_page_text(plumber.pages[page_num], page_number, [], []))
+                else:
+                    texts = [
+                        self._try_page("PyMuPDF", page_number, lambda: self._pymupdf_page_text(doc.load_page(page_num), page_number, [], [])),
+                        self._try_page("pdfplumber", page_number, lambda: self._pdfplumber_page_text(plumber.pages[page_num], page_number, [], [])),
+                        self._try_page("PyPDF2", page_number, lambda: reader.pages[page_num].extract_text()),
+                    ]
+                    page_text = self._deduplicate_text("\n\n".join(text for text in texts if text))
+                
+                text = self._advanced_text_processing(page_text or "")
+                yield {
+                    "page_number": page_number,
+                    "text": text,
+                    "metadata": {
+                        "page_number": page_number,
+                        "page_count": page_count,
+                        "characters": len(text),
+                        "has_tables": "[TABLE" in text,
+                    }
+                }
+        finally:
+            doc.close()
+            if plumber is not None:
+                plumber.close()
+            readers.close()
+    
+    async def aiter_pages(self, pdf_content: PDFSource, filename: str, strategy: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the pages of ``iter_pages``, parsed in the extraction process pool
+        
+        Page ranges of PDF_PAGES_PER_TASK pages are extracted in parallel, at
+        most PDF_STREAM_BUFFER_PAGES pages (rounded up to whole ranges) ahead
+        of the consumer, and yielded in page order as each range finishes.
+        Once the last page is yielded the pages are cached, and a cached
+        document is replayed without extracting it again.
+        """
+        strategy = self._resolve_strategy(strategy)
+        cache_key = await asyncio.to_thread(self._cache_key, pdf_content, strategy, True)
+        cached = await asyncio.to_thread(self._cache_lookup_pages, cache_key, filename)
+        if cached is not None:
+            for page in cached:
+                yield page
+            return
+        
+        collected: Optional[List[Dict[str, Any]]] = [] if cache_key is not None else None
+        async for page in self._aiter_pages_parallel(pdf_content, filename, strategy):
+            if collected is not None:
+                collected.append(page)
+            yield page
+        if collected is not None:
+            await asyncio.to_thread(
+                extraction_cache.put, cache_key, {"success": True, "method_used": f"{strategy}_pages", "pages": collected}
+            )
+    
+    async def _aiter_pages_parallel(self, pdf_content: PDFSource, filename: str, strategy: str) -> AsyncIterator[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        pool = get_extraction_pool()
+        page_count = await loop.run_in_executor(pool, _count_pages, pdf_content)
+        pages_per_task = max(1, config.PDF_PAGES_PER_TASK)
+        ranges = deque((start, min(start + pages_per_task, page_count))
+                       for start in range(0, page_count, pages_per_task))
+        ahead = max(1, -(-config.PDF_STREAM_BUFFER_PAGES // pages_per_task))
+        pending = deque()
+        try:
+            while ranges or pending:
+                while ranges and len(pending) <= ahead:
+                    pending.append(loop.run_in_executor(pool, _extract_pages, pdf_content, filename, strategy, ranges.popleft()))
+                for page in await pending.popleft():
+                    yield page
+        finally:
+            # Drop ranges that have not started if the consumer stopped early
+            for future in pending:
+                future.cancel()
+    
+    def get_document_metadata(self, pdf_content: PDFSource, filename: str, upload_method: str = "advanced_pdf_upload") -> Dict[str, Any]:
+        """Document-level metadata (page count, size, PDF info) without scanning pages"""
+        metadata = {
+            "filename": filename,
+            "file_type": ".pdf",
+            "upload_method": upload_method
+        }
+        with open_fitz(pdf_content) as doc:
+            self._add_document_metadata(metadata, doc, pdf_content)
+        return metadata
+    
+    def _try_page(self, extractor: str, page_number: int, extract) -> str:
+        try:
+            return extract() or ""
+        except Exception as e:
+            self.logger.warning(f"⚠️ {extractor} failed on page {page_number}: {e}")
+            return ""
+    
+    def _resolve_strategy(self, strategy: Optional[str]) -> str:
+        strategy = strategy or config.PDF_EXTRACTION_STRATEGY
+        if strategy not in EXTRACTION_STRATEGIES:
+            raise ValueError(f"Unknown PDF extraction strategy: {strategy}")
+        return strategy
+    
+    def _cache_key(self, pdf_content: PDFSource, strategy: str, pages: bool = False) -> Optional[str]:
+        return extraction_cache_key(pdf_content, strategy, pages) if config.EXTRACTION_CACHE_ENABLED else None
+    
+    def _cache_lookup(self, cache_key: Optional[str], filename: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result under this upload's filename, if any"""
+        if cache_key is None:
+            return None
+        result = extraction_cache.get(cache_key)
+        if result is None:
+            return None
+        result["metadata"]["filename"] = filename
+        result["cached"] = True
+        self.logger.info(f"♻️ Reusing cached {result['method_used']} extraction for {filename}")
+        return result
     
-    def _extract_with_pdfplumber(self, pdf_content: bytes) -> Dict[str, Any]:
+    def _cache_lookup_pages(self, cache_key: Optional[str], filename: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached pages of a streamed extraction, if any"""
+        if cache_key is None:
+            return None
+        result = extraction_cache.get(cache_key)
+        if result is None:
+            return None
+        self.logger.info(f"♻️ Reusing {len(result['pages'])} cached {result['method_used']} pages for {filename}")
+        return result["pages"]
+    
+    def _cache_store(self, cache_key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache a successful result and return it"""
+        if cache_key is not None and result.get("success"):
+            extraction_cache.put(cache_key, result)
+        return result
+    
+    def _extract_fast(self, pdf_content: PDFSource, filename: str, page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Single-pass extraction: one PyMuPDF pass collects text and metadata
+        
+        Only pages that come back empty or contain tables are re-read with
+        pdfplumber. Drawings and math detection are skipped.
+        """
+        metadata = {
+            "filename": filename,
+            "file_type": ".pdf",
+            "upload_method": "fast_pdf_upload"
+        }
+        page_texts = {}
+        fallback_pages = []
+        counts = {"text_blocks": 0, "image_blocks": 0, "total_text_length": 0}
+        
+        doc = open_fitz(pdf_content)
+        try:
+            self._add_document_metadata(metadata, doc, pdf_content)
+            start, end = page_range or (0, len(doc))
+            
+            for page_num in range(start, min(end, len(doc))):
+                try:
+                    page_text = self._fast_page_text(doc.load_page(page_num), counts)
+                except Exception as e:
+                    self.logger.warning(f"⚠️ PyMuPDF failed on page {page_num + 1}: {e}")
+                    page_text = None
+                if page_text is None:
+                    fallback_pages.append(page_num)
+                else:
+                    page_texts[page_num] = page_text
+        finally:
+            doc.close()
+        
+        if fallback_pages:
+            page_texts.update(self._extract_pages_with_pdfplumber(pdf_content, fallback_pages))
+        
+        metadata.update(counts)
+        metadata["pdfplumber_fallback_pages"] = len(fallback_pages)
+        
+        text = "\n\n".join(
+            f"--- Page {page_num + 1} ---\n{page_texts[page_num]}"
+            for page_num in sorted(page_texts) if page_texts[page_num]
+        )
+        return {"text": text, "metadata": metadata}
+    
+    def _fast_page_text(self, page, counts: Dict[str, int]) -> Optional[str]:
+        """Render a page from one PyMuPDF pass, updating block counts
+
+        Returns None when the page is empty or has tables and should be
+        re-read with pdfplumber.
+        """
+        page_text = ""
+        page_images = 0
+        for block in page.get_text("dict")["blocks"]:
+            if "lines" in block:
+                counts["text_blocks"] += 1
+                counts["total_text_length"] += sum(len(span["text"]) for line in block["lines"] for span in line["spans"])
+                page_text += self._format_pymupdf_block(block)
+            elif "image" in block:
+                counts["image_blocks"] += 1
+                page_images += 1
+        
+        if not page_text.strip() or self._page_has_tables(page):
+            return None
+        if page_images:
+            page_text += f"\n\n[IMAGES: {page_images} found on this page]"
+        return page_text
+    
+    def _page_has_tables(self, page) -> bool:
+        """Detect tables with PyMuPDF's table finder (if enabled and available)"""
+        if not config.PDF_FAST_DETECT_TABLES or not hasattr(page, "find_tables"):
+            return False
+        try:
+            return bool(page.find_tables().tables)
+        except Exception:
+            return False
+    
+    def _extract_pages_with_pdfplumber(self, pdf_content: PDFSource, page_nums: List[int]) -> Dict[int, str]:
+        """Extract selected pages (0-based) with pdfplumber"""
+        page_texts = {}
+        try:
+            with open_pdfplumber(pdf_content) as pdf:
+                for page_num in page_nums:
+                    try:
+                        page_texts[page_num] = self._pdfplumber_page_text(pdf.pages[page_num], page_num + 1, [], [])
+                    except Exception as e:
+                        self.logger.warning(f"⚠️ pdfplumber failed on page {page_num + 1}: {e}")
+        except Exception as e:
+            self.logger.warning(f"⚠️ pdfplumber fallback failed: {e}")
+        return page_texts
+    
+    def _merge_fast_results(self, parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge per-range fast extraction results in page order"""
+        metadata = dict(parts[0]["metadata"])
+        for key in ("text_blocks", "image_blocks", "total_text_length", "pdfplumber_fallback_pages"):
+            metadata[key] = sum(part["metadata"][key] for part in parts)
+        return {
+            "text": "\n\n".join(part["text"] for part in parts if part["text"]),
+            "metadata": metadata
+        }
+    
+    def _extract_page_range(self, pdf_content: PDFSource, page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Dict[str, Any]]:
+        """Run every extractor over a page range (0-based, end exclusive; all pages if None)"""
+        return {
+            "pdfplumber": self._extract_with_pdfplumber(pdf_content, page_range),
+            "pymupdf": self._extract_with_pymupdf(pdf_content, page_range),
+            "pypdf2": self._extract_with_pypdf2(pdf_content, page_range)
+        }
+    
+    def _merge_extraction_results(self, parts: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Merge per-range extractor results in page order"""
+        merged = {}
+        for method in ("pdfplumber", "pymupdf", "pypdf2"):
+            method_parts = [part[method] for part in parts]
+            merged[method] = {"text": "\n\n".join(p["text"] for p in method_parts if p["text"])}
+            for key in method_parts[0]:
+                if key != "text":
+                    merged[method][key] = [item for p in method_parts for item in p.get(key, [])]
+        return merged
+    
+    def _finish_extraction(self, combined_text: str, metadata: Dict[str, Any], filename: str,
+                           method_used: str = "advanced_combined") -> Dict[str, Any]:
+        """Clean the extracted text and analyze its structure"""
+        # Advanced text processing
+        processed_text = self._advanced_text_processing(combined_text)
+        
+        # Analyze content structure
+        content_analysis = self._analyze_content_structure(processed_text, metadata)
+        
+        self.logger.info(f"✅ Advanced PDF extraction completed for {filename}")
+        
+        return {
+            "text": processed_text,
+            "method_used": method_used,
+            "metadata": metadata,
+            "content_analysis": content_analysis,
+            "success": True
+        }
+    
+    def _failed_result(self, filename: str, error: Exception) -> Dict[str, Any]:
+        return {
+            "text": "",
+            "method_used": "failed",
+            "metadata": {"filename": filename},
+            "success": False,
+            "error": str(error)
+        }
+    
+    def _extract_with_pdfplumber(self, pdf_content: PDFSource, page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
         """Extract text using pdfplumber with advanced features"""
         try:
             text_parts = []
             tables_found = []
             images_found = []
             
-            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
+            with open_pdfplumber(pdf_content) as pdf:
+                start, end = page_range or (0, len(pdf.pages))
+                for page_num, page in enumerate(pdf.pages[start:end], start + 1):
                     try:
-                        # Extract text with layout preservation
-                        page_text = page.extract_text(layout=True)
-                        
-                        # Extract tables
-                        tables = page.extract_tables()
-                        if tables:
-                            tables_found.append(f"Page {page_num}: {len(tables)} tables")
-                            for i, table in enumerate(tables):
-                                table_text = self._format_table(table)
-                                page_text += f"\n\n[TABLE {i+1}]\n{table_text}\n[/TABLE]"
-                        
-                        # Check for images
-                        if page.images:
-                            images_found.append(f"Page {page_num}: {len(page.images)} images")
-                            page_text += f"\n\n[IMAGES: {len(page.images)} found on this page]"
-                        
+                        page_text = self._pdfplumber_page_text(page, page_num, tables_found, images_found)
                         if page_text:
                             text_parts.append(f"--- Page {page_num} ---\n{page_text}")
                             
@@ -109,50 +570,40 @@ class PDFScraper:
             self.logger.warning(f"⚠️ pdfplumber extraction failed: {e}")
             return {"text": "", "tables": [], "images": []}
     
-    def _extract_with_pymupdf(self, pdf_content: bytes) -> Dict[str, Any]:
+    def _pdfplumber_page_text(self, page, page_num: int, tables_found: List[str], images_found: List[str]) -> str:
+        """Extract one pdfplumber page with its tables and image notes"""
+        # Extract text with layout preservation
+        page_text = page.extract_text(layout=True)
+        
+        # Extract tables
+        tables = page.extract_tables()
+        if tables:
+            tables_found.append(f"Page {page_num}: {len(tables)} tables")
+            for i, table in enumerate(tables):
+                table_text = self._format_table(table)
+                page_text += f"\n\n[TABLE {i+1}]\n{table_text}\n[/TABLE]"
+        
+        # Check for images
+        if page.images:
+            images_found.append(f"Page {page_num}: {len(page.images)} images")
+            page_text += f"\n\n[IMAGES: {len(page.images)} found on this page]"
+        
+        return page_text
+    
+    def _extract_with_pymupdf(self, pdf_content: PDFSource, page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
         """Extract text using PyMuPDF (fitz) with advanced features"""
         try:
             text_parts = []
             equations_found = []
             drawings_found = []
             
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
+            doc = open_fitz(pdf_content)
+            start, end = page_range or (0, len(doc))
             
-            for page_num in range(len(doc)):
+            for page_num in range(start, min(end, len(doc))):
                 try:
                     page = doc.load_page(page_num)
-                    
-                    # Extract text with better formatting
-                    text_dict = page.get_text("dict")
-                    
-                    # Process text blocks with positioning
-                    page_text = ""
-                    for block in text_dict["blocks"]:
-                        if "lines" in block:
-                            for line in block["lines"]:
-                                line_text = ""
-                                for span in line["spans"]:
-                                    # Handle different font sizes (headers, body, etc.)
-                                    font_size = span["size"]
-                                    if font_size > 14:
-                                        line_text += f"# {span['text']} "
-                                    elif font_size > 12:
-                                        line_text += f"## {span['text']} "
-                                    else:
-                                        line_text += span['text'] + " "
-                                page_text += line_text + "\n"
-                    
-                    # Extract equations and mathematical content
-                    math_blocks = page.get_text("math")
-                    if math_blocks:
-                        equations_found.append(f"Page {page_num + 1}: {len(math_blocks)} equations")
-                        page_text += f"\n\n[MATH CONTENT]\n{math_blocks}\n[/MATH]"
-                    
-                    # Check for drawings/vector graphics
-                    drawings = page.get_drawings()
-                    if drawings:
-                        drawings_found.append(f"Page {page_num + 1}: {len(drawings)} drawings")
-                        page_text += f"\n\n[DRAWINGS: {len(drawings)} vector graphics found]"
+                    page_text = self._pymupdf_page_text(page, page_num + 1, equations_found, drawings_found)
                     
                     if page_text:
                         text_parts.append(f"--- Page {page_num + 1} ---\n{page_text}")
@@ -172,28 +623,74 @@ class PDFScraper:
             self.logger.warning(f"⚠️ PyMuPDF extraction failed: {e}")
             return {"text": "", "equations": [], "drawings": []}
     
-    def _extract_with_pypdf2(self, pdf_content: bytes) -> Dict[str, Any]:
+    def _pymupdf_page_text(self, page, page_number: int, equations_found: List[str], drawings_found: List[str]) -> str:
+        """Extract one PyMuPDF page with math and drawing notes"""
+        # Extract text with better formatting
+        text_dict = page.get_text("dict")
+        
+        # Process text blocks with positioning
+        page_text = "".join(
+            self._format_pymupdf_block(block) for block in text_dict["blocks"] if "lines" in block
+        )
+        
+        # Extract equations and mathematical content
+        math_blocks = page.get_text("math")
+        if math_blocks:
+            equations_found.append(f"Page {page_number}: {len(math_blocks)} equations")
+            page_text += f"\n\n[MATH CONTENT]\n{math_blocks}\n[/MATH]"
+        
+        # Check for drawings/vector graphics
+        drawings = page.get_drawings()
+        if drawings:
+            drawings_found.append(f"Page {page_number}: {len(drawings)} drawings")
+            page_text += f"\n\n[DRAWINGS: {len(drawings)} vector graphics found]"
+        
+        return page_text
+    
+    def _format_pymupdf_block(self, block: Dict[str, Any]) -> str:
+        """Render a PyMuPDF text block, marking large fonts as headers"""
+        block_text = ""
+        for line in block["lines"]:
+            line_text = ""
+            for span in line["spans"]:
+                # Handle different font sizes (headers, body, etc.)
+                font_size = span["size"]
+                if font_size > 14:
+                    line_text += f"# {span['text']} "
+                elif font_size > 12:
+                    line_text += f"## {span['text']} "
+                else:
+                    line_text += span['text'] + " "
+            block_text += line_text + "\n"
+        return block_text
+    
+    def _extract_with_pypdf2(self, pdf_content: PDFSource, page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
         """Extract text using PyPDF2 as fallback"""
         try:
             text_parts = []
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-            
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(f"--- Page {page_num} ---\n{page_text}")
-                except Exception as e:
-                    self.logger.warning(f"⚠️ PyPDF2 failed on page {page_num}: {e}")
-                    continue
+            with open_pypdf2(pdf_content) as pdf_reader:
+                start, end = page_range or (0, len(pdf_reader.pages))
+                
+                for page_num in range(start + 1, min(end, len(pdf_reader.pages)) + 1):
+                    try:
+                        page_text = pdf_reader.pages[page_num - 1].extract_text()
+                        if page_text:
+                            text_parts.append(f"--- Page {page_num} ---\n{page_text}")
+                    except Exception as e:
+                        self.logger.warning(f"⚠️ PyPDF2 failed on page {page_num}: {e}")
+                        continue
             
             return {"text": "\n\n".join(text_parts)}
         except Exception as e:
             self.logger.warning(f"⚠️ PyPDF2 extraction failed: {e}")
             return {"text": ""}
     
-    def _combine_extraction_results(self, results: Dict[str, Dict[str, Any]]) -> str:
-        """Intelligently combine results from multiple extraction methods"""
+    def _combine_extraction_results(self, results: Dict[str, Dict[str, Any]],
+                                    metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Intelligently combine results from multiple extraction methods
+        
+        Deduplication counters are added to ``metadata`` when it is given.
+        """
         texts = []
         
         # Prioritize PyMuPDF for better formatting
@@ -209,104 +706,52 @@ class PDFScraper:
             texts.append(results["pypdf2"]["text"])
         
         # Combine and deduplicate
-        combined = "\n\n".join(texts)
-        return self._deduplicate_text(combined)
+        combined, stats = deduplicate_text("\n\n".join(texts))
+        if stats.chars_in:
+            self.logger.info(
+                f"🧹 Deduplication removed {stats.chars_removed} of {stats.chars_in} characters "
+                f"({stats.paragraphs_removed} paragraphs, {stats.lines_removed} lines)"
+            )
+        if metadata is not None:
+            metadata.update(stats.as_metadata())
+        return combined
     
     def _deduplicate_text(self, text: str) -> str:
         """Remove duplicate content while preserving structure"""
-        lines = text.split('\n')
-        seen = set()
-        unique_lines = []
-        
-        for line in lines:
-            # Normalize line for comparison
-            normalized = re.sub(r'\s+', ' ', line.strip())
-            if normalized and normalized not in seen:
-                seen.add(normalized)
-                unique_lines.append(line)
-        
-        return '\n'.join(unique_lines)
+        return deduplicate_text(text)[0]
     
     def _advanced_text_processing(self, text: str) -> str:
         """Advanced text processing and cleaning"""
         if not text:
             return ""
         
-        # Preserve mathematical expressions
-        text = self._preserve_math_expressions(text)
-        
-        # Clean and normalize
+        # Clean and normalize, leaving mathematical expressions untouched
         text = self._clean_text_advanced(text)
         
-        # Restore mathematical expressions
-        text = self._restore_math_expressions(text)
-        
         # Structure the content
         text = self._structure_content(text)
         
         return text
     
-    def _preserve_math_expressions(self, text: str) -> str:
-        """Preserve mathematical expressions during processing"""
-        # Store math expressions temporarily
-        math_expressions = []
-        
-        # Find and replace math patterns
-        def replace_math(match):
-            math_expressions.append(match.group(0))
-            return f"__MATH_{len(math_expressions)-1}__"
-        
-        # Common math patterns
-        patterns = [
-            r'\$[^$]+\$',  # LaTeX inline math
-            r'\\\([^)]+\\\)',  # LaTeX display math
-            r'\\\[[^\]]+\\\]',  # LaTeX display math
-            r'[a-zA-Z_][a-zA-Z0-9_]*\s*=\s*[^=]+',  # Equations
-            r'[a-zA-Z_][a-zA-Z0-9_]*\s*[+\-*/]\s*[a-zA-Z_][a-zA-Z0-9_]*',  # Math operations
-        ]
-        
-        for pattern in patterns:
-            text = re.sub(pattern, replace_math, text)
-        
-        # Store for later restoration
-        text = f"__MATH_EXPRESSIONS__:{json.dumps(math_expressions)}__\n{text}"
-        
-        return text
-    
-    def _restore_math_expressions(self, text: str) -> str:
-        """Restore mathematical expressions after processing"""
-        # Extract stored expressions
-        if "__MATH_EXPRESSIONS__:" in text:
-            parts = text.split("__MATH_EXPRESSIONS__:", 1)
-            if len(parts) == 2:
-                try:
-                    math_data = parts[1].split("__\n", 1)
-                    if len(math_data) == 2:
-                        math_expressions = json.loads(math_data[0])
-                        text = math_data[1]
-                        
-                        # Restore expressions
-                        for i, expr in enumerate(math_expressions):
-                            text = text.replace(f"__MATH_{i}__", expr)
-                except:
-                    pass
-        
-        return text
-    
     def _clean_text_advanced(self, text: str) -> str:
-        """Advanced text cleaning while preserving structure"""
-        # Normalize whitespace but preserve structure
-        text = re.sub(r'[ \t]+', ' ', text)
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
-        
-        # Preserve page markers
-        text = re.sub(r'--- Page (\d+) ---', r'\n--- Page \1 ---\n', text)
-        
-        # Clean up common PDF artifacts
-        text = re.sub(r'[^\x00-\x7F]+', ' ', text)  # Remove non-ASCII
-        text = re.sub(r'[^\w\s\-.,;:!?()[\]{}"\']+', ' ', text)  # Keep important punctuation
-        
-        return text.strip()
+        """Advanced text cleaning while preserving structure and math expressions
+
+        A single scan over the text: math spans are copied as-is, page markers
+        are put on their own lines, runs of 3+ line breaks become a blank line
+        and runs of blanks and unsupported characters (non-ASCII, symbols
+        outside common punctuation) become a single space.
+        """
+        def replace_token(match):
+            kind = match.lastgroup
+            if kind == "math":
+                return match.group(0)
+            if kind == "page":
+                return f"\n--- Page {match.group('page_number')} ---\n"
+            if kind == "breaks":
+                return "\n\n"
+            return " "
+
+        return TEXT_TOKEN_RE.sub(replace_token, text).strip()
     
     def _structure_content(self, text: str) -> str:
         """Structure the content with proper formatting"""
@@ -319,9 +764,9 @@ class PDFScraper:
                 continue
             
             # Detect headers
-            if re.match(r'^[A-Z][A-Z\s]{3,}$', line):
+            if HEADER_RE.match(line):
                 structured_lines.append(f"\n## {line}\n")
-            elif re.match(r'^\d+\.\s+[A-Z]', line):
+            elif NUMBERED_HEADER_RE.match(line):
                 structured_lines.append(f"\n### {line}\n")
             else:
                 structured_lines.append(line)
@@ -341,7 +786,7 @@ class PDFScraper:
         
         return "\n".join(formatted_rows)
     
-    def _extract_comprehensive_metadata(self, pdf_content: bytes, filename: str) -> Dict[str, Any]:
+    def _extract_comprehensive_metadata(self, pdf_content: PDFSource, filename: str) -> Dict[str, Any]:
         """Extract comprehensive PDF metadata"""
         metadata = {
             "filename": filename,
@@ -351,17 +796,9 @@ class PDFScraper:
         
         try:
             # Try PyMuPDF for comprehensive metadata
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
+            doc = open_fitz(pdf_content)
             
-            metadata["page_count"] = len(doc)
-            metadata["file_size"] = len(pdf_content)
-            
-            # Get document metadata
-            doc_metadata = doc.metadata
-            if doc_metadata:
-                for key, value in doc_metadata.items():
-                    if value:
-                        metadata[f"pdf_{key.lower()}"] = value
+            self._add_document_metadata(metadata, doc, pdf_content)
             
             # Analyze content structure
             text_blocks = 0
@@ -389,15 +826,27 @@ class PDFScraper:
             self.logger.warning(f"⚠️ Failed to extract comprehensive metadata: {e}")
             # Fallback to PyPDF2
             try:
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-                metadata["page_count"] = len(pdf_reader.pages)
-                metadata["file_size"] = len(pdf_content)
+                with open_pypdf2(pdf_content) as pdf_reader:
+                    metadata["page_count"] = len(pdf_reader.pages)
+                metadata["file_size"] = pdf_size(pdf_content)
             except:
                 metadata["page_count"] = 0
                 metadata["file_size"] = 0
         
         return metadata
     
+    def _add_document_metadata(self, metadata: Dict[str, Any], doc, pdf_content: PDFSource):
+        """Add page count, file size and the PDF's own metadata fields"""
+        metadata["page_count"] = len(doc)
+        metadata["file_size"] = pdf_size(pdf_content)
+        
+        # Get document metadata
+        doc_metadata = doc.metadata
+        if doc_metadata:
+            for key, value in doc_metadata.items():
+                if value:
+                    metadata[f"pdf_{key.lower()}"] = value
+    
     def _analyze_content_structure(self, text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze the structure and content of the extracted text"""
         analysis = {
@@ -430,3 +879,60 @@ class PDFScraper:
 
 # Global instance
 pdf_scraper = PDFScraper()
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool used for CPU-bound PDF extraction"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        # spawn, so workers do not inherit the server's threads and locks
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=config.PDF_EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _extraction_pool
+
+
+def shutdown_extraction_pool():
+    """Stop the extraction worker processes"""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
+
+
+# Process pool entry points (module level so they can be pickled)
+
+def _count_pages(pdf_content: PDFSource) -> int:
+    with open_fitz(pdf_content) as doc:
+        return len(doc)
+
+
+def _extract_document(pdf_content: PDFSource, filename: str, strategy: str) -> Dict[str, Any]:
+    return pdf_scraper._extract_uncached(pdf_content, filename, strategy)
+
+
+def _extract_range(pdf_content: PDFSource, page_range: Tuple[int, int]) -> Dict[str, Dict[str, Any]]:
+    return pdf_scraper._extract_page_range(pdf_content, page_range)
+
+
+def _extract_fast_range(pdf_content: PDFSource, filename: str, page_range: Tuple[int, int]) -> Dict[str, Any]:
+    return pdf_scraper._extract_fast(pdf_content, filename, page_range)
+
+
+def _extract_pages(pdf_content: PDFSource, filename: str, strategy: str, page_range: Tuple[int, int]) -> List[Dict[str, Any]]:
+    return list(pdf_scraper.iter_pages(pdf_content, filename, strategy, page_range))
+
+
+def _extract_metadata(pdf_content: PDFSource, filename: str) -> Dict[str, Any]:
+    return pdf_scraper._extract_comprehensive_metadata(pdf_content, filename)
+
+
+def _combine_and_finish(results: Dict[str, Dict[str, Any]], metadata: Dict[str, Any], filename: str) -> Dict[str, Any]:
+    return pdf_scraper._finish_extraction(pdf_scraper._combine_extraction_results(results, metadata), metadata, filename)
+
+
+def _finish_extraction(text: str, metadata: Dict[str, Any], filename: str, method_used: str) -> Dict[str, Any]:
+    return pdf_scraper._finish_extraction(text, metadata, filename, method_used)
@@ -1,74 +1,894 @@
-from fastapi import APIRouter, HTTPException
-from models import Document, DocumentResponse
-from database import get_collection, get_ollama_embedding
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import nullcontext
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from pydantic import ValidationError
+from typing import AsyncIterator, Optional
+from models import BulkDocument, Document, DocumentListItem
+from database import get_collection, get_ollama_embeddings_async
 from datetime import datetime
-
+from config import config
+from utils.bm25 import bm25_index
+from utils.chunker import Chunk, chunk_pages, chunk_text, merge_chunks
+from utils.dedup import merge_signatures, minhash_signature, shingle_hashes, signature_to_hex
+from utils.duplicate_index import PREFIX_SIGNATURE_KEY, SIGNATURE_KEY, duplicate_index, prefix_index
+from utils.jobs import IngestionJob
+from utils.metadata_index import TIMESTAMP_KEY, created_at_timestamp, metadata_index
 
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
-@router.post("/", response_model=dict)
-async def add_document(document: Document):
-    if not document.title.strip() or not document.content.strip():
-        raise HTTPException(status_code=400, detail="Title and content required")
+# Per-chunk metadata keys, dropped when documents are listed at the parent level
+CHUNK_METADATA_KEYS = (
+    "parent_id", "chunk_index", "char_start", "char_end", "page_start", "page_end", SIGNATURE_KEY, PREFIX_SIGNATURE_KEY
+)
 
-    embedding = get_ollama_embedding(document.content)
-    
-    # Check if embedding generation failed
-    if not embedding or len(embedding) == 0:
-        raise HTTPException(
-            status_code=500, 
-            detail="Failed to generate embedding for the document. Please check if Ollama is running and the embedding model is available."
-        )
-    
-    doc_id = f"doc_{datetime.now().timestamp()}"
+# Fields GET /documents can return
+DOCUMENT_FIELDS = ("id", "title", "content", "metadata", "created_at")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Collection writes run in worker threads; one writer at a time keeps the BM25 and metadata indexes in step with Chroma
+_write_lock = threading.Lock()
 
+
+def _chunk_metadata(parent_id: str, parent_metadata: dict, chunk: Chunk, chunk_count: Optional[int]) -> dict:
     metadata = {
-        **document.metadata,
-        "title": document.title,
-        "created_at": datetime.now().isoformat(),
-        "document_type": "user_added"
+        **parent_metadata,
+        "parent_id": parent_id,
+        "chunk_index": chunk.index,
+        "char_start": chunk.char_start,
+        "char_end": chunk.char_end,
     }
+    if chunk_count is not None:
+        metadata["chunk_count"] = chunk_count
+    if chunk.page_start is not None:
+        metadata["page_start"] = chunk.page_start
+        metadata["page_end"] = chunk.page_end
+    return metadata
+
+
+def add_to_collection(collection, ids: list[str], embeddings: list[list[float]],
+                      documents: list[str], metadatas: list[dict]):
+    """Write records with as few collection.add calls as Chroma allows, and index their text and metadata
+
+    Blocking: call it through ``asyncio.to_thread`` from async code.
+    """
+    batch_size = config.CHROMA_ADD_BATCH_SIZE
+    for i in range(0, len(ids), batch_size):
+        with _write_lock:
+            collection.add(
+                embeddings=embeddings[i:i + batch_size],
+                documents=documents[i:i + batch_size],
+                metadatas=metadatas[i:i + batch_size],
+                ids=ids[i:i + batch_size]
+            )
+            bm25_index.add_many(ids[i:i + batch_size], documents[i:i + batch_size])
+            metadata_index.add_many(ids[i:i + batch_size], metadatas[i:i + batch_size])
+
+
+def delete_from_collection(collection, ids: Optional[list[str]] = None, where: Optional[dict] = None):
+    """Delete records by id or metadata filter, and drop them from the BM25 and metadata indexes (blocking)"""
+    with _write_lock:
+        if where is not None:
+            ids = collection.get(where=where, include=[])["ids"]
+        if ids:
+            collection.delete(ids=ids)
+            bm25_index.remove_many(ids)
+            metadata_index.remove_many(ids)
+
+
+def _update_metadatas(collection, ids: list[str], metadatas: list[dict]):
+    """Replace the metadata of stored records and re-index it (blocking)"""
+    with _write_lock:
+        collection.update(ids=ids, metadatas=metadatas)
+        metadata_index.add_many(ids, metadatas)
+
+
+def _collection_dimension(collection) -> Optional[int]:
+    """Length of the stored vectors (None while the collection is empty)"""
+    sample = collection.get(limit=1, include=["embeddings"])
+    return len(sample["embeddings"][0]) if sample["ids"] else None
+
+
+def _check_requested_records(collection, doc_ids: Optional[list[Optional[str]]],
+                             embeddings: Optional[list[Optional[list[float]]]]) -> dict[int, str]:
+    """Find caller-chosen ids that are taken and precomputed vectors of the wrong length
+
+    Returns ``{position: error}``. Chroma ignores an add under an existing
+    id while the BM25 and metadata indexes would still be overwritten, so
+    taken ids are refused rather than stored.
+    """
+    problems = {}
+    requested = [doc_id for doc_id in doc_ids or [] if doc_id]
+    if requested:
+        found = collection.get(where={"parent_id": {"$in": requested}}, include=["metadatas"])
+        taken = {metadata["parent_id"] for metadata in found["metadatas"]}
+        # Documents stored before chunking are their own parent
+        taken.update(collection.get(ids=requested, include=[])["ids"])
+        seen = set()
+        for i, doc_id in enumerate(doc_ids):
+            if doc_id in taken:
+                problems[i] = f"Document id {doc_id} already exists"
+            elif doc_id and doc_id in seen:
+                problems[i] = f"Document id {doc_id} is repeated"
+            seen.add(doc_id)
+    vectors = [(i, embedding) for i, embedding in enumerate(embeddings or []) if embedding]
+    if vectors:
+        dimension = _collection_dimension(collection) or len(vectors[0][1])
+        for i, embedding in vectors:
+            if i not in problems and len(embedding) != dimension:
+                problems[i] = f"Embedding has {len(embedding)} dimensions, expected {dimension}"
+    return problems
+
+
+def _forget_signatures(parent_id: str):
+    """Drop a deleted or replaced document from the duplicate indexes"""
+    duplicate_index.remove(parent_id)
+    prefix_index.remove(parent_id)
+
+
+def _document_signature(content: str) -> list[int]:
+    return minhash_signature(shingle_hashes(content))
+
+
+def _stored_version(collection, parent_id: str) -> int:
+    existing = collection.get(where={"parent_id": parent_id}, limit=1, include=["metadatas"])
+    return existing["metadatas"][0].get("version", 1) if existing["ids"] else 1
+
+
+def _record_duplicate(collection, parent_id: str, document: Document):
+    """Note a merged duplicate upload on every chunk of the existing document"""
+    existing = collection.get(where={"parent_id": parent_id}, include=["metadatas"])
+    if not existing["ids"]:
+        return
+    first = existing["metadatas"][0]
+    names = [name for name in first.get("duplicate_titles", "").split("; ") if name]
+    name = document.metadata.get("filename", document.title)
+    if name not in names and len(names) < 50:
+        names.append(name)
+    update = {"duplicate_count": first.get("duplicate_count", 0) + 1, "duplicate_titles": "; ".join(names)}
+    collection.update(ids=existing["ids"], metadatas=[{**metadata, **update} for metadata in existing["metadatas"]])
+
+
+async def store_documents(
+    documents: list[Document],
+    document_type: str = "user_added",
+    doc_ids: Optional[list[Optional[str]]] = None,
+    embeddings: Optional[list[Optional[list[float]]]] = None,
+    job: Optional[IngestionJob] = None,
+    duplicates: Optional[dict[int, dict]] = None,
+) -> list[str]:
+    """Chunk, embed and store documents in one batch, returning the parent document ids
+
+    ``doc_ids`` and ``embeddings`` optionally give a caller-chosen id and a
+    precomputed vector per document; a document with a vector is stored as a
+    single chunk without calling the embedding model. An id that is already
+    stored or a vector whose length differs from the stored ones is refused
+    with a 400 before anything is written. When ``job`` is given,
+    the chunk, embed and store stages are timed on it.
+
+    Near-duplicates of stored documents are found before anything is
+    embedded and handled per DUPLICATE_POLICY: "skip" and "merge" return the
+    existing document's id ("merge" also records the upload on it), and
+    "version" stores the new document and deletes the one it replaces.
+    ``duplicates``, when given, receives ``{position: {"duplicate_of",
+    "similarity", "policy"}}`` for those documents.
+    """
+    def stage(name: str, progress_after: float):
+        return job.track_stage(name, progress_after) if job else nullcontext()
+
+    policy = config.DUPLICATE_POLICY
     collection = get_collection()  # ✅ called here, after startup
+    if doc_ids or embeddings:
+        problems = await asyncio.to_thread(_check_requested_records, collection, doc_ids, embeddings)
+        if problems:
+            raise HTTPException(status_code=400, detail=problems[min(problems)])
+    timestamp = datetime.now()
+    parent_ids, registered, merged, replaced, planned = [], [], [], [], []
+    chunk_ids, chunk_texts, chunk_metadatas, chunk_embeddings = [], [], [], []
+    with stage("chunk", 0.55):
+        if policy != "off":
+            signatures = await asyncio.to_thread(lambda: [_document_signature(d.content) for d in documents])
+        else:
+            signatures = [[] for _ in documents]
+
+        for i, document in enumerate(documents):
+            doc_id = (doc_ids[i] if doc_ids else None) or (
+                f"doc_{timestamp.timestamp()}" if len(documents) == 1 else f"doc_{timestamp.timestamp()}_{i}"
+            )
+            parent_metadata = {
+                **document.metadata,
+                "title": document.title,
+                "created_at": timestamp.isoformat(),
+                TIMESTAMP_KEY: timestamp.timestamp(),
+                "document_type": document_type
+            }
+
+            match = duplicate_index.find(signatures[i])
+            if match:
+                match_id, similarity = match
+                logger.info(f"♻️ '{document.title}' is a near-duplicate of {match_id} ({similarity:.2f}), policy: {policy}")
+                if duplicates is not None:
+                    duplicates[i] = {"duplicate_of": match_id, "similarity": similarity, "policy": policy}
+                if policy != "version":
+                    parent_ids.append(match_id)
+                    if policy == "merge":
+                        merged.append((match_id, document))
+                    continue
+                parent_metadata["previous_version_id"] = match_id
+                parent_metadata["version"] = _stored_version(collection, match_id) + 1
+                replaced.append(match_id)
+
+            parent_ids.append(doc_id)
+            # Registered right away so duplicates within the batch are caught too
+            duplicate_index.add(doc_id, signatures[i])
+            registered.append(doc_id)
+            planned.append((i, doc_id, parent_metadata))
+
+        def build_chunks():
+            for i, doc_id, parent_metadata in planned:
+                document = documents[i]
+                precomputed = embeddings[i] if embeddings else None
+                if precomputed:
+                    chunks = [Chunk(text=document.content, index=0, char_start=0, char_end=len(document.content))]
+                else:
+                    chunks = chunk_text(document.content)
+                for chunk in chunks:
+                    metadata = _chunk_metadata(doc_id, parent_metadata, chunk, len(chunks))
+                    if chunk.index == 0 and signatures[i]:
+                        metadata[SIGNATURE_KEY] = signature_to_hex(signatures[i])
+                    chunk_ids.append(f"{doc_id}_chunk_{chunk.index}")
+                    chunk_texts.append(chunk.text)
+                    chunk_metadatas.append(metadata)
+                    chunk_embeddings.append(precomputed)
+
+        await asyncio.to_thread(build_chunks)
 
     try:
-        collection.add(
-            embeddings=[embedding],
-            documents=[document.content],
-            metadatas=[metadata],
-            ids=[doc_id]
-        )
-        return {"message": "Document added successfully", "id": doc_id, "title": document.title}
-    except Exception as e:
+        if registered:
+            with stage("embed", 0.9):
+                missing = [i for i, embedding in enumerate(chunk_embeddings) if not embedding]
+                fresh = await get_ollama_embeddings_async([chunk_texts[i] for i in missing])
+                for i, embedding in zip(missing, fresh):
+                    chunk_embeddings[i] = embedding
+
+            # Check if embedding generation failed
+            if not chunk_texts or any(not embedding for embedding in chunk_embeddings):
+                raise HTTPException(
+                    status_code=500, 
+                    detail="Failed to generate embedding for the document. Please check if Ollama is running and the embedding model is available."
+                )
+
+        def write():
+            add_to_collection(collection, chunk_ids, chunk_embeddings, chunk_texts, chunk_metadatas)
+            for match_id, document in merged:
+                _record_duplicate(collection, match_id, document)
+
+        with stage("store", 1.0):
+            try:
+                await asyncio.to_thread(write)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"Failed to add document to database: {str(e)}"
+                )
+    except Exception:
+        for doc_id in registered:
+            duplicate_index.remove(doc_id)
+        raise
+
+    for old_id in replaced:
+        await asyncio.to_thread(delete_from_collection, collection, where={"parent_id": old_id})
+        _forget_signatures(old_id)
+    return parent_ids
+
+
+def _chunk_ids(parent_id: str, chunks: list[Chunk]) -> list[str]:
+    """Content-addressed chunk ids, so unchanged chunk text keeps its id and stored vector"""
+    ids, seen = [], {}
+    for chunk in chunks:
+        digest = hashlib.sha256(chunk.text.encode("utf-8")).hexdigest()[:16]
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(f"{parent_id}_{digest}" if seen[digest] == 1 else f"{parent_id}_{digest}_{seen[digest]}")
+    return ids
+
+
+async def update_document(
+    document: Document,
+    document_type: str = "user_added",
+    job: Optional[IngestionJob] = None,
+) -> dict:
+    """Create or incrementally update the document stored under ``document.source_key``
+
+    Chunks are cut page by page and their ids derive from their text, so
+    only chunks whose text changed are embedded and written. Chunks that no
+    longer occur are deleted and unchanged ones keep their vectors (only
+    their metadata is refreshed). The parent id stays the same across
+    updates. Near-duplicates of other documents are handled as in
+    ``store_documents``.
+    """
+    def stage(name: str, progress_after: float):
+        return job.track_stage(name, progress_after) if job else nullcontext()
+
+    source_key = document.source_key
+    policy = config.DUPLICATE_POLICY
+    collection = get_collection()
+    timestamp = datetime.now()
+    existing = await asyncio.to_thread(collection.get, where={"source_key": source_key}, include=["metadatas"])
+    previous = existing["metadatas"][0] if existing["ids"] else {}
+    parent_id = previous.get("parent_id") or f"doc_{timestamp.timestamp()}"
+
+    signature = await asyncio.to_thread(_document_signature, document.content) if policy != "off" else []
+    match = duplicate_index.find(signature, exclude=parent_id)
+    duplicate = {}
+    if match:
+        match_id, similarity = match
+        logger.info(f"♻️ '{document.title}' is a near-duplicate of {match_id} ({similarity:.2f}), policy: {policy}")
+        duplicate = {"duplicate_of": match_id, "similarity": similarity, "policy": policy}
+        if policy != "version":
+            if policy == "merge":
+                await asyncio.to_thread(_record_duplicate, collection, match_id, document)
+            return {"id": match_id, "chunks_added": 0, "chunks_unchanged": 0, "chunks_deleted": 0, **duplicate}
+
+    created_at = previous.get("created_at", timestamp.isoformat())
+    parent_metadata = {
+        **document.metadata,
+        "title": document.title,
+        "created_at": created_at,
+        TIMESTAMP_KEY: created_at_timestamp(created_at),
+        "updated_at": timestamp.isoformat(),
+        "document_type": document_type,
+        "source_key": source_key
+    }
+    def build_chunks() -> tuple[list[Chunk], list[str], list[dict]]:
+        chunks = chunk_pages(document.content)
+        metadatas = [_chunk_metadata(parent_id, parent_metadata, chunk, len(chunks)) for chunk in chunks]
+        if chunks and signature:
+            metadatas[0][SIGNATURE_KEY] = signature_to_hex(signature)
+        return chunks, _chunk_ids(parent_id, chunks), metadatas
+
+    with stage("chunk", 0.55):
+        chunks, ids, metadatas = await asyncio.to_thread(build_chunks)
+    if not chunks:
+        raise HTTPException(status_code=400, detail="Document contains no text")
+
+    existing_ids = set(existing["ids"])
+    new = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_ids]
+    kept = [i for i, chunk_id in enumerate(ids) if chunk_id in existing_ids]
+    stale = list(existing_ids - set(ids))
+
+    with stage("embed", 0.9):
+        embeddings = await get_ollama_embeddings_async([chunks[i].text for i in new])
+    if any(not embedding for embedding in embeddings):
         raise HTTPException(
             status_code=500, 
-            detail=f"Failed to add document to database: {str(e)}"
+            detail="Failed to generate embedding for the document. Please check if Ollama is running and the embedding model is available."
+        )
+
+    def write():
+        # New chunks go in before stale ones are removed, so the document never disappears
+        add_to_collection(
+            collection,
+            [ids[i] for i in new],
+            embeddings,
+            [chunks[i].text for i in new],
+            [metadatas[i] for i in new]
         )
+        if kept:
+            _update_metadatas(collection, [ids[i] for i in kept], [metadatas[i] for i in kept])
+        if stale:
+            delete_from_collection(collection, ids=stale)
+
+    with stage("store", 1.0):
+        try:
+            await asyncio.to_thread(write)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Failed to add document to database: {str(e)}"
+            )
+
+    # The rewritten chunks no longer carry a prefix signature
+    prefix_index.remove(parent_id)
+    duplicate_index.add(parent_id, signature)
+    if match:
+        await asyncio.to_thread(delete_from_collection, collection, where={"parent_id": match[0]})
+        _forget_signatures(match[0])
+    logger.info(f"🔁 Updated '{source_key}': {len(new)} chunks embedded, {len(kept)} unchanged, {len(stale)} deleted")
+    return {"id": parent_id, "chunks_added": len(new), "chunks_unchanged": len(kept), "chunks_deleted": len(stale), **duplicate}
+
 
-@router.get("/", response_model=list[DocumentResponse])
-async def get_documents():
+async def store_document_pages(
+    title: str,
+    metadata: dict,
+    pages: AsyncIterator[dict],
+    document_type: str = "user_added",
+    job: Optional[IngestionJob] = None,
+    page_count: Optional[int] = None,
+) -> str:
+    """Chunk, embed and store a document while its pages are still being parsed
+
+    ``pages`` yields ``{"page_number", "text"}`` items (see
+    ``PDFScraper.aiter_pages``). Every PDF_STREAM_PAGES_PER_BATCH pages are
+    chunked, embedded and written, so the first chunks are searchable long
+    before the last page is parsed. Chunks already written are removed if
+    the document fails part way. Returns the parent document id.
+
+    The duplicate check needs the whole text, so it runs once every page is
+    parsed: under the "skip" and "merge" policies a near-duplicate is not
+    kept and the existing document's id is returned. When the first window
+    of pages already resembles the first window of a stored document, the
+    windows are held back (as text) instead of embedded until that check, so
+    a re-uploaded PDF is never embedded just to be deleted again.
+    """
+    def stage(name: str, progress_after: float):
+        return job.track_stage(name, progress_after) if job else nullcontext()
+
+    timestamp = datetime.now()
+    parent_id = f"doc_{timestamp.timestamp()}"
+    parent_metadata = {
+        **metadata,
+        "title": title,
+        "created_at": timestamp.isoformat(),
+        TIMESTAMP_KEY: timestamp.timestamp(),
+        "document_type": document_type
+    }
+    policy = config.DUPLICATE_POLICY
     collection = get_collection()
-    result = collection.get(include=["metadatas", "documents"])
+    window: list[str] = []
+    offset = 0
+    chunk_index = 0
+    pages_seen = 0
+    signature: list[int] = []
+    prefix_signature: Optional[list[int]] = None
+    suspect = None  # Stored document whose first window matches this one's
+    held: list[str] = []  # Windows not embedded until the duplicate check
+    first_chunk_metadata = None
+
+    async def flush():
+        nonlocal signature, prefix_signature, suspect
+        if not window:
+            return
+        text = "".join(window)
+        window.clear()
+        if policy != "off":
+            window_signature = await asyncio.to_thread(_document_signature, text)
+            signature = merge_signatures(signature, window_signature)
+            if prefix_signature is None:
+                prefix_signature = window_signature
+                suspect = prefix_index.find(prefix_signature)
+                if suspect:
+                    logger.info(f"⏸️ '{title}' starts like {suspect[0]} ({suspect[1]:.2f}), holding back embedding")
+        if suspect:
+            held.append(text)
+            return
+        await write(text)
+
+    async def write(text: str):
+        nonlocal offset, chunk_index, first_chunk_metadata
+        chunks = await asyncio.to_thread(chunk_text, text)
+        for chunk in chunks:
+            chunk.index = chunk_index
+            chunk.char_start += offset
+            chunk.char_end += offset
+            chunk_index += 1
+        offset += len(text)
+        if not chunks:
+            return
+
+        progress = min(0.95, pages_seen / page_count) if page_count else 0.5
+        with stage("embed", progress):
+            embeddings = await get_ollama_embeddings_async([chunk.text for chunk in chunks])
+        if any(not embedding for embedding in embeddings):
+            raise HTTPException(
+                status_code=500, 
+                detail="Failed to generate embedding for the document. Please check if Ollama is running and the embedding model is available."
+            )
+        metadatas = [_chunk_metadata(parent_id, parent_metadata, chunk, None) for chunk in chunks]
+        if first_chunk_metadata is None:
+            first_chunk_metadata = metadatas[0]
+        with stage("store", progress):
+            await asyncio.to_thread(
+                add_to_collection,
+                collection,
+                [f"{parent_id}_chunk_{chunk.index}" for chunk in chunks],
+                embeddings,
+                [chunk.text for chunk in chunks],
+                metadatas
+            )
+
+    try:
+        iterator = pages.__aiter__()
+        while True:
+            with stage("extract", min(0.95, pages_seen / page_count) if page_count else 0.5):
+                try:
+                    page = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+            pages_seen += 1
+            if page["text"].strip():
+                window.append(f"--- Page {page['page_number']} ---\n{page['text']}\n\n")
+            if len(window) >= config.PDF_STREAM_PAGES_PER_BATCH:
+                await flush()
+        await flush()
+
+        match = duplicate_index.find(signature)
+        if match and policy != "version":
+            match_id, similarity = match
+            logger.info(f"♻️ '{title}' is a near-duplicate of {match_id} ({similarity:.2f}), policy: {policy}")
+            if held:
+                logger.info(f"⏭️ Skipped embedding {len(held)} held windows of '{title}'")
+            await asyncio.to_thread(delete_from_collection, collection, where={"parent_id": parent_id})
+            if policy == "merge":
+                await asyncio.to_thread(
+                    _record_duplicate, collection, match_id, Document(title=title, content="", metadata=metadata)
+                )
+            return match_id
+        while held:
+            await write(held.pop(0))
+    except Exception:
+        await asyncio.to_thread(delete_from_collection, collection, where={"parent_id": parent_id})
+        raise
+
+    if chunk_index == 0:
+        raise HTTPException(status_code=400, detail="File appears to be empty or contains no readable text")
+
+    if match:
+        match_id, similarity = match
+        logger.info(f"♻️ '{title}' is a near-duplicate of {match_id} ({similarity:.2f}), policy: {policy}")
+        await asyncio.to_thread(delete_from_collection, collection, where={"parent_id": match_id})
+        _forget_signatures(match_id)
+    if signature:
+        first_chunk_metadata[SIGNATURE_KEY] = signature_to_hex(signature)
+        first_chunk_metadata[PREFIX_SIGNATURE_KEY] = signature_to_hex(prefix_signature)
+        await asyncio.to_thread(_update_metadatas, collection, [f"{parent_id}_chunk_0"], [first_chunk_metadata])
+        duplicate_index.add(parent_id, signature)
+        prefix_index.add(parent_id, prefix_signature)
+    return parent_id
+
+
+async def store_document_batch(documents: list[Document], positions: list[int], errors: list[dict],
+                               document_type: str, label: str = "line",
+                               duplicates: Optional[list[dict]] = None) -> int:
+    """Store one batch of a streamed import, returning how many documents were stored
+
+    Documents with a ``source_key`` update their stored copy one at a time;
+    the rest are stored together (``BulkDocument`` ids and embeddings are
+    honoured). Failures are appended to ``errors`` under ``label`` with the
+    documents' ``positions`` in the stream instead of being raised.
+    Near-duplicates that were skipped or merged rather than stored are not
+    counted; ``duplicates``, when given, receives one entry per such document.
+    Taken ids and mis-sized embeddings fail only their own document.
+    """
+    stored = 0
+    plain = [(document, position) for document, position in zip(documents, positions) if not document.source_key]
+    if plain:
+        problems = await asyncio.to_thread(
+            _check_requested_records,
+            get_collection(),
+            [getattr(document, "id", None) for document, _ in plain],
+            [getattr(document, "embedding", None) for document, _ in plain]
+        )
+        for i in sorted(problems):
+            errors.append({label: plain[i][1], "error": problems[i]})
+        plain = [item for i, item in enumerate(plain) if i not in problems]
+    for document, position in zip(documents, positions):
+        if document.source_key:
+            try:
+                result = await update_document(document, document_type=document_type)
+            except HTTPException as e:
+                errors.append({label: position, "error": e.detail})
+                continue
+            if result.get("policy", "version") != "version":
+                if duplicates is not None:
+                    duplicates.append({label: position, "duplicate_of": result["duplicate_of"],
+                                       "similarity": result["similarity"], "policy": result["policy"]})
+            else:
+                stored += 1
+    if plain:
+        found = {}
+        try:
+            await store_documents(
+                [document for document, _ in plain],
+                document_type=document_type,
+                doc_ids=[getattr(document, "id", None) for document, _ in plain],
+                embeddings=[getattr(document, "embedding", None) for document, _ in plain],
+                duplicates=found,
+            )
+        except HTTPException as e:
+            errors.append({f"{label}s": f"{plain[0][1]}-{plain[-1][1]}", "error": e.detail})
+            return stored
+        skipped = {i: match for i, match in found.items() if match["policy"] != "version"}
+        stored += len(plain) - len(skipped)
+        if duplicates is not None:
+            duplicates.extend({label: plain[i][1], **match} for i, match in sorted(skipped.items()))
+    return stored
+
+
+def build_parent_documents(ids: list[str], metadatas: list[dict], contents: Optional[list[str]] = None) -> list[dict]:
+    """Group stored chunks by parent document and rebuild each parent's content
+
+    Without ``contents`` only metadata is rebuilt and ``content`` is left out.
+    """
+    parents = {}
+    for i, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+        # Documents stored before chunking are their own parent
+        parent_id = metadata.get("parent_id", doc_id)
+        parents.setdefault(parent_id, []).append((metadata, contents[i] if contents is not None else None))
+
     documents = []
-    for i, doc_id in enumerate(result["ids"]):
-        metadata = result["metadatas"][i]
-        documents.append(DocumentResponse(
-            id=doc_id,
-            title=metadata.get("title", "Untitled"),
-            content=result["documents"][i],
-            metadata=metadata,
-            created_at=metadata.get("created_at", "")
-        ))
+    for parent_id, chunks in parents.items():
+        chunks.sort(key=lambda item: item[0].get("chunk_index", 0))
+        metadata = {k: v for k, v in chunks[0][0].items() if k not in CHUNK_METADATA_KEYS}
+        metadata["chunk_count"] = len(chunks)
+        page_ends = [m["page_end"] for m, _ in chunks if "page_end" in m]
+        if page_ends:
+            metadata["page_count"] = metadata.get("page_count", max(page_ends))
+        document = {
+            "id": parent_id,
+            "title": metadata.get("title", "Untitled"),
+            "metadata": metadata,
+            "created_at": metadata.get("created_at", "")
+        }
+        if contents is not None:
+            document["content"] = merge_chunks([
+                (m.get("char_start", 0), m.get("char_end", len(text)), text) for m, text in chunks
+            ]) if len(chunks) > 1 else chunks[0][1]
+        documents.append(document)
     return documents
 
+
+def _page_parents(collection, offset: int, limit: int) -> tuple[list[tuple[str, dict]], Optional[int]]:
+    """Find up to ``limit`` parents from chunk ``offset`` on, by their first chunk
+
+    Returns ``(parent id, first chunk metadata)`` pairs in storage order and
+    the offset of the next parent's first chunk, which is where the next
+    page starts (None when no parent is left).
+    """
+    parents = []
+    batch_size = config.DOCUMENTS_SCAN_BATCH_SIZE
+    while True:
+        batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        for i, (doc_id, metadata) in enumerate(zip(batch["ids"], batch["metadatas"])):
+            # Documents stored before chunking have no chunk_index and are their own first chunk
+            if metadata.get("chunk_index", 0) == 0:
+                if len(parents) >= limit:
+                    return parents, offset + i
+                parents.append((metadata.get("parent_id", doc_id), metadata))
+        if len(batch["ids"]) < batch_size:
+            return parents, None
+        offset += batch_size
+
+
+def _load_parents(collection, parents: list[tuple[str, dict]], fields: set) -> list[dict]:
+    """Build the listed fields of each parent, reading chunks only when needed"""
+    if not fields & {"content", "metadata"}:
+        return [
+            {"id": parent_id, "title": metadata.get("title", "Untitled"), "created_at": metadata.get("created_at", "")}
+            for parent_id, metadata in parents
+        ]
+    include = ["metadatas", "documents"] if "content" in fields else ["metadatas"]
+    chunked = [parent_id for parent_id, metadata in parents if "parent_id" in metadata]
+    unchunked = [parent_id for parent_id, metadata in parents if "parent_id" not in metadata]
+    ids, metadatas, contents = [], [], []
+    if chunked:
+        result = collection.get(where={"parent_id": {"$in": chunked}}, include=include)
+        ids += result["ids"]
+        metadatas += result["metadatas"]
+        contents += result["documents"] or []
+    if unchunked:
+        result = collection.get(ids=unchunked, include=include)
+        ids += result["ids"]
+        metadatas += result["metadatas"]
+        contents += result["documents"] or []
+    documents = {
+        document["id"]: document
+        for document in build_parent_documents(ids, metadatas, contents if "content" in fields else None)
+    }
+    return [documents[parent_id] for parent_id, _ in parents if parent_id in documents]
+
+
+@router.post("/", response_model=dict)
+async def add_document(document: Document):
+    if not document.title.strip() or not document.content.strip():
+        raise HTTPException(status_code=400, detail="Title and content required")
+
+    if document.source_key:
+        result = await update_document(document)
+        return {"message": "Document updated successfully", "title": document.title, **result}
+
+    duplicates = {}
+    doc_id = (await store_documents([document], duplicates=duplicates))[0]
+    if 0 in duplicates and duplicates[0]["policy"] != "version":
+        return {"message": "Near-duplicate of an existing document", "id": doc_id, "title": document.title, **duplicates[0]}
+    return {"message": "Document added successfully", "id": doc_id, "title": document.title}
+
+@router.post("/bulk", response_model=dict)
+async def add_documents_bulk(request: Request):
+    """Ingest an NDJSON stream of documents
+
+    Each line is a ``BulkDocument``. The body is parsed as it arrives and
+    records are embedded and written ``BULK_INGEST_BATCH_SIZE`` at a time;
+    records carrying an ``embedding`` skip the embedding model, and records
+    with a ``source_key`` incrementally update their document. Invalid lines,
+    lines over BULK_MAX_LINE_BYTES and failed batches are reported without
+    aborting the rest of the stream; near-duplicates that were skipped or
+    merged are counted under ``duplicates`` rather than ``added``.
+    """
+    added = 0
+    errors = []
+    duplicates = []
+    batch: list[BulkDocument] = []
+    batch_lines: list[int] = []
+
+    async def flush():
+        nonlocal added
+        if not batch:
+            return
+        added += await store_document_batch(batch, batch_lines, errors, document_type="bulk_import",
+                                            duplicates=duplicates)
+        batch.clear()
+        batch_lines.clear()
+
+    line_number = 0
+    records = 0
+    max_line = config.BULK_MAX_LINE_BYTES
+
+    async def handle_line(line: bytes):
+        nonlocal records
+        if not line.strip():
+            return
+        records += 1
+        try:
+            record = BulkDocument.model_validate_json(line)
+        except ValidationError as e:
+            errors.append({"line": line_number, "error": str(e)})
+            return
+        if not record.title.strip() or not record.content.strip():
+            errors.append({"line": line_number, "error": "Title and content required"})
+            return
+        batch.append(record)
+        batch_lines.append(line_number)
+        if len(batch) >= config.BULK_INGEST_BATCH_SIZE:
+            await flush()
+
+    async def end_line():
+        nonlocal line_number, records, oversized
+        line_number += 1
+        if oversized:
+            records += 1
+            errors.append({"line": line_number, "error": f"Line exceeds BULK_MAX_LINE_BYTES ({max_line} bytes)"})
+            oversized = False
+        else:
+            await handle_line(bytes(pending))
+        pending.clear()
+
+    # Only newly received bytes are searched for newlines; an oversized line is skipped, not buffered
+    pending = bytearray()
+    oversized = False
+    async for data in request.stream():
+        start = 0
+        while True:
+            newline = data.find(b"\n", start)
+            piece = data[start:] if newline < 0 else data[start:newline]
+            if not oversized:
+                if len(pending) + len(piece) > max_line:
+                    oversized = True
+                    pending.clear()
+                else:
+                    pending += piece
+            if newline < 0:
+                break
+            await end_line()
+            start = newline + 1
+    if pending or oversized:
+        await end_line()
+    await flush()
+
+    return {
+        "message": "Bulk ingestion completed",
+        "records": records,
+        "added": added,
+        "duplicates": len(duplicates),
+        "failed": records - added - len(duplicates),
+        "errors": errors[:100],
+        "duplicate_records": duplicates[:100]
+    }
+
+@router.get("/", response_model=None, responses={
+    200: {
+        "model": list[DocumentListItem],
+        "description": "A page of documents with the selected fields, or one JSON object per line with format=ndjson",
+        "content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}}},
+        "headers": {"X-Next-Cursor": {
+            "description": "Cursor of the next page; absent on the last page (JSON only)",
+            "schema": {"type": "string"}
+        }}
+    }
+})
+async def get_documents(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    output: Optional[str] = Query(None, alias="format")
+):
+    """List stored documents a page at a time
+
+    Pages hold ``limit`` documents (default DOCUMENTS_PAGE_SIZE, so a
+    request without paging parameters gets only the first page) and the
+    ``X-Next-Cursor`` response header is the ``cursor`` of the next page; it
+    is sent exactly when more documents follow. ``fields`` is a comma-separated subset of DOCUMENT_FIELDS (the
+    id is always returned); leaving out ``content`` and ``metadata`` lists
+    documents without reading their chunks. With ``format=ndjson`` or an
+    ``Accept: application/x-ndjson`` header, every document from ``cursor``
+    on (or ``limit`` of them) is streamed one JSON object per line.
+    Cursors are chunk offsets, so writes while paging may skip or repeat a
+    document.
+    """
+    selected = set(DOCUMENT_FIELDS)
+    if fields:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - set(DOCUMENT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        selected.add("id")
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        offset = -1
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+
+    if output not in (None, "json", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {output}")
+    ndjson = output == "ndjson" or (output is None and NDJSON_MEDIA_TYPE in request.headers.get("accept", ""))
+    collection = get_collection()
+
+    def page(offset: int, limit: int) -> tuple[list[dict], Optional[int]]:
+        parents, next_offset = _page_parents(collection, offset, limit)
+        documents = _load_parents(collection, parents, selected)
+        return [{field: document[field] for field in DOCUMENT_FIELDS if field in selected} for document in documents], next_offset
+
+    if ndjson:
+        async def generate_lines():
+            remaining = limit
+            next_offset = offset
+            while next_offset is not None and (remaining is None or remaining > 0):
+                page_size = config.DOCUMENTS_MAX_PAGE_SIZE if remaining is None else min(remaining, config.DOCUMENTS_MAX_PAGE_SIZE)
+                documents, next_offset = await asyncio.to_thread(page, next_offset, page_size)
+                if remaining is not None:
+                    remaining -= len(documents)
+                if documents:
+                    yield "".join(json.dumps(document) + "\n" for document in documents)
+
+        return StreamingResponse(generate_lines(), media_type=NDJSON_MEDIA_TYPE)
+
+    documents, next_offset = await asyncio.to_thread(
+        page, offset, min(limit or config.DOCUMENTS_PAGE_SIZE, config.DOCUMENTS_MAX_PAGE_SIZE)
+    )
+    headers = {"X-Next-Cursor": str(next_offset)} if next_offset is not None else None
+    return JSONResponse(documents, headers=headers)
+
 @router.delete("/{document_id}")
 async def delete_document(document_id: str):
     collection = get_collection()
-    existing = collection.get(ids=[document_id])
+    existing = await asyncio.to_thread(collection.get, where={"parent_id": document_id}, include=[])
+    if not existing["ids"]:
+        # Documents stored before chunking have no parent_id
+        existing = await asyncio.to_thread(collection.get, ids=[document_id], include=[])
     if not existing["ids"]:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    collection.delete(ids=[document_id])
-    return {"message": "Document deleted successfully", "id": document_id}
+    await asyncio.to_thread(delete_from_collection, collection, ids=existing["ids"])
+    _forget_signatures(document_id)
+    return {"message": "Document deleted successfully", "id": document_id, "chunks_deleted": len(existing["ids"])}
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from models import HealthResponse
-from database import get_collection, get_ollama_embedding
+from database import get_collection, get_ollama_embedding_async
 from datetime import datetime
 
 router = APIRouter()
@@ -11,8 +11,8 @@ async def health_check():
         collection = get_collection()
         doc_count = collection.count() if collection else 0
         
-        # Test Ollama embedding
-        test_embedding = get_ollama_embedding("test")
+        # Test Ollama embedding (bypass the cache so Ollama is really called)
+        test_embedding = await get_ollama_embedding_async("test", use_cache=False)
         ollama_working = len(test_embedding) > 0
         
         return HealthResponse(
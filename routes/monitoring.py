@@ -9,6 +9,10 @@ import json
 
 from utils.monitoring import get_application_health, monitor
 from utils.ollama_monitor import get_ollama_metrics, get_ollama_realtime, start_ollama_monitoring
+from utils.embedding_cache import embedding_cache
+from utils.query_cache import query_embedding_cache
+from utils.extraction_cache import extraction_cache
+from utils.reranker import reranker
 from database import get_collection
 from config import config
 
@@ -248,6 +252,80 @@ async def get_endpoint_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving endpoint stats: {str(e)}")
 
+@router.get("/cache/embeddings")
+async def get_embedding_cache_stats():
+    """Get persistent embedding cache statistics"""
+    try:
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "enabled": config.EMBEDDING_CACHE_ENABLED,
+            "embedding_cache": embedding_cache.get_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving embedding cache stats: {str(e)}")
+
+@router.post("/cache/embeddings/clear")
+async def clear_embedding_cache():
+    """Remove all cached embeddings"""
+    try:
+        embedding_cache.clear()
+        return {"message": "Embedding cache cleared successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error clearing embedding cache: {str(e)}")
+
+@router.get("/cache/extractions")
+async def get_extraction_cache_stats():
+    """Get persistent PDF extraction cache statistics"""
+    try:
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "enabled": config.EXTRACTION_CACHE_ENABLED,
+            "extraction_cache": extraction_cache.get_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving extraction cache stats: {str(e)}")
+
+@router.post("/cache/extractions/clear")
+async def clear_extraction_cache():
+    """Remove all cached extraction results"""
+    try:
+        extraction_cache.clear()
+        return {"message": "Extraction cache cleared successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error clearing extraction cache: {str(e)}")
+
+@router.get("/cache/rerank")
+async def get_rerank_cache_stats():
+    """Get cross-encoder reranker and pair score cache statistics"""
+    try:
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "enabled": config.RERANK_ENABLED,
+            "reranker": reranker.get_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving rerank cache stats: {str(e)}")
+
+@router.post("/cache/rerank/clear")
+async def clear_rerank_cache():
+    """Remove all cached pair scores"""
+    try:
+        reranker.clear()
+        return {"message": "Rerank cache cleared successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error clearing rerank cache: {str(e)}")
+
+@router.get("/cache/queries")
+async def get_query_cache_stats():
+    """Get in-memory query embedding cache statistics"""
+    try:
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "query_cache": query_embedding_cache.get_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving query cache stats: {str(e)}")
+
 @router.get("/ollama/status")
 async def get_ollama_status():
     """Get Ollama service status and metrics"""
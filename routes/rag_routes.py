@@ -1,13 +1,49 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from models import Query, RAGResponse
+from models import Query, RAGResponse, SearchResult
 from datetime import datetime
 from routes.search import search_documents
 from llm import generate_answer, generate_answer_streaming
+from database import get_collection
+from config import config
+from utils.chunker import estimate_tokens
+from utils.mmr import mmr_select
 import json
+import logging
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def select_context(search_results: list[SearchResult]) -> list[str]:
+    """Passages for the prompt: a diverse MMR pick within the context token budget
+
+    Relevance is each result's similarity (its cross-encoder score, already
+    in [0, 1], when reranked) and redundancy is the cosine
+    similarity of the stored chunk embeddings, so no query embedding is
+    needed (lexical searches work too). Without MMR the results are used in
+    rank order.
+    """
+    contents = [result.content for result in search_results]
+    if not config.MMR_ENABLED or len(search_results) <= 1:
+        return contents
+    fetched = get_collection().get(ids=[result.id for result in search_results], include=["embeddings"])
+    vectors = dict(zip(fetched["ids"], fetched["embeddings"]))
+    if len(vectors) < len(search_results):
+        return contents
+    budget = config.CONTEXT_TOKEN_BUDGET
+    picked = mmr_select(
+        [_relevance(result) for result in search_results],
+        [vectors[result.id] for result in search_results],
+        costs=[min(estimate_tokens(content), budget) for content in contents],  # Oversized passages get truncated when packed
+        budget=budget
+    )
+    logger.info(f"🎯 MMR picked {len(picked)} of {len(search_results)} passages")
+    return [contents[i] for i in picked] or contents
+
+def _relevance(result: SearchResult) -> float:
+    """MMR relevance in [0, 1], on the same scale as the cosine redundancy term"""
+    return result.similarity if result.rerank_score is None else result.rerank_score
 
 @router.post("/", response_model=RAGResponse)
 async def perform_rag(query: Query):
@@ -20,15 +56,12 @@ async def perform_rag(query: Query):
 
     search_results = await search_documents(query)
 
-    # Only use docs above threshold
+    # search_documents already applied the threshold as the query's mode defines it
     if search_results:
-        context_docs = [result.content for result in search_results if result.similarity >= query.threshold]
-        if context_docs:
-            generated_answer, model_used = generate_answer(query.question, context_docs)
-        else:
-            generated_answer, model_used = "No relevant documents found."
+        context_docs = select_context(search_results)
+        generated_answer, model_used = await generate_answer(query.question, context_docs)
     else:
-        generated_answer,model_used = "No relevant documents found."
+        generated_answer, model_used = "No relevant documents found.", "none"
 
     return RAGResponse(
         query=query.question,
@@ -56,7 +89,7 @@ async def perform_rag_streaming(query: Query):
             yield f"data: {json.dumps({'type': 'search_results', 'count': len(search_results)})}\n\n"
             
             if search_results:
-                context_docs = [result.content for result in search_results if result.similarity >= query.threshold]
+                context_docs = select_context(search_results)
                 if context_docs:
                     yield f"data: {json.dumps({'type': 'context_found', 'documents': len(context_docs)})}\n\n"
                     
@@ -1,36 +1,329 @@
+import asyncio
+import json
+import logging
+import math
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
 from fastapi import APIRouter, HTTPException
 from models import Query, SearchResult
-from database import get_ollama_embedding, get_collection  # use ollama embedding
+from database import get_ollama_embeddings_async, get_collection  # use ollama embedding
+from utils.bm25 import bm25_index, reciprocal_rank_fusion
+from utils.metadata_index import metadata_index, translate_where
+from utils.query_cache import query_embedding_cache
+from utils.reranker import reranker
+from config import config
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+
+@dataclass
+class Filters:
+    """A query's push-down filters and an upper bound on the chunks they match"""
+    where: Optional[dict] = None
+    where_document: Optional[dict] = None
+    matches: Optional[int] = None  # Unset when the query is not filtered
+
+    @property
+    def active(self) -> bool:
+        return self.where is not None or self.where_document is not None
+
+    @property
+    def key(self) -> tuple:
+        """Identity of the filters, shared by queries that can be answered together"""
+        return json.dumps(self.where, sort_keys=True), json.dumps(self.where_document, sort_keys=True)
+
+@dataclass
+class SearchPlan:
+    """How one query runs: its retriever, filters and result depths"""
+    query: Query
+    mode: str
+    rerank: bool
+    filters: Filters
+    top_k: int
+    fetch_k: int  # Results retrieved before reranking cuts them to top_k
+
+    @property
+    def empty(self) -> bool:
+        """The filters match no chunk"""
+        return self.filters.active and not self.filters.matches
+
+    @property
+    def needs_embedding(self) -> bool:
+        return self.mode != "lexical" and not self.empty
+
+    @property
+    def candidates(self) -> int:
+        """Nearest neighbours the vector side of the query needs"""
+        return max(self.fetch_k, config.HYBRID_CANDIDATES) if self.mode == "hybrid" else self.fetch_k
 
 @router.post("/", response_model=list[SearchResult])
 async def search_documents(query: Query):
+    """Find the chunks most relevant to a question
+
+    ``mode`` picks the retriever: "vector" (cosine similarity of Ollama
+    embeddings), "lexical" (BM25 over the in-process inverted index, no
+    embedding call) or "hybrid" (both, fused with reciprocal rank fusion).
+    ``threshold`` applies to cosine similarity: in hybrid mode a chunk that
+    matches the query terms is kept below it, and lexical mode ignores it.
+    With ``rerank`` RERANK_CANDIDATES results are fetched and a local
+    cross-encoder picks the final ``top_k``.
+
+    ``where`` and ``where_document`` are Chroma filters applied inside every
+    retriever, so only matching chunks are scanned and scored. Scopes the
+    metadata index bounds to FILTER_EXACT_SEARCH_MAX chunks or fewer are
+    scored exactly, and an empty scope returns without embedding the query.
+    The bound is loose for date ranges, unindexed keys and ``where_document``;
+    if Chroma then has fewer matches than requested neighbours, the query is
+    retried against the true match count.
+    """
+    plan = _plan(query)
+    if plan.empty:
+        return []
+    collection = get_collection()  # ✅ call the function to get collection
+
+    query_embedding, nearest = None, None
+    if plan.needs_embedding:
+        query_embedding = (await _query_embeddings([query.question]))[0]
+        nearest = (await asyncio.to_thread(_nearest_many, collection, [query_embedding], plan.candidates, plan.filters))[0]
+    return await _run(collection, plan, query_embedding, nearest)
+
+@router.post("/batch", response_model=list[list[SearchResult]])
+async def search_documents_batch(queries: list[Query]):
+    """Run many searches in one request, returning each query's results in order
+
+    Queries behave as on ``POST /search``. All questions that need a vector
+    are embedded in one batched call, and queries sharing the same filters
+    are answered by a single multi-vector ``collection.query`` (or one exact
+    scan of a small scope).
+    """
+    if len(queries) > config.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {config.SEARCH_BATCH_MAX_QUERIES} queries per batch")
+    plans = []
+    for i, query in enumerate(queries):
+        try:
+            plans.append(_plan(query))
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Query {i}: {e.detail}")
+    collection = get_collection()
+
+    embedded = [i for i, plan in enumerate(plans) if plan.needs_embedding]
+    embeddings = dict(zip(embedded, await _query_embeddings([queries[i].question for i in embedded])))
+
+    groups: dict[tuple, list[int]] = {}
+    for i in embedded:
+        groups.setdefault(plans[i].filters.key, []).append(i)
+    nearest = {}
+    for members in groups.values():
+        k = max(plans[i].candidates for i in members)
+        neighbours = await asyncio.to_thread(
+            _nearest_many, collection, [embeddings[i] for i in members], k, plans[members[0]].filters
+        )
+        for i, found in zip(members, neighbours):
+            nearest[i] = found[:plans[i].candidates]
+    logger.info(f"🔎 Batch search: {len(queries)} queries, {len(embedded)} embedded, {len(groups)} vector lookups")
+
+    return [
+        [] if plan.empty else await _run(collection, plan, embeddings.get(i), nearest.get(i))
+        for i, plan in enumerate(plans)
+    ]
+
+def _plan(query: Query) -> SearchPlan:
+    """Validate a query and work out how to run it"""
     if not query.question.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
+    mode = query.mode or config.SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown search mode: {mode}")
+    rerank = config.RERANK_ENABLED if query.rerank is None else query.rerank
+    if rerank and not reranker.available:
+        if query.rerank:
+            raise HTTPException(status_code=400, detail="Reranking needs the sentence-transformers package")
+        logger.warning("⚠️ RERANK_ENABLED is set but sentence-transformers is not installed; results are not reranked")
+        rerank = False
 
-    # Use Ollama embedding instead of SentenceTransformer
-    query_embedding = get_ollama_embedding(query.question)
+    try:
+        filters = Filters(where=translate_where(query.where), where_document=query.where_document or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid where filter: {e}")
+    if filters.active:
+        filters.matches = metadata_index.estimate(filters.where)
 
-    collection = get_collection()  # ✅ call the function to get collection
+    top_k = min(query.top_k, 20)
+    fetch_k = max(top_k, config.RERANK_CANDIDATES) if rerank else top_k
+    return SearchPlan(query=query, mode=mode, rerank=rerank, filters=filters, top_k=top_k, fetch_k=fetch_k)
 
+async def _run(collection, plan: SearchPlan, query_embedding: Optional[list[float]],
+               nearest: Optional[list[tuple]]) -> list[SearchResult]:
+    """Rank a planned query's results from its nearest neighbours (None in lexical mode)"""
+    query = plan.query
+    # BM25 scoring and the filtered-id lookup are CPU and Chroma work, kept off the event loop
+    if plan.mode == "lexical":
+        search_results = await asyncio.to_thread(_lexical_search, collection, query.question, plan.fetch_k, plan.filters)
+    elif plan.mode == "vector":
+        search_results = _vector_search(nearest, query.threshold)
+    else:
+        search_results = await asyncio.to_thread(_hybrid_search, collection, query.question, query_embedding, nearest,
+                                                 plan.fetch_k, query.threshold, plan.filters)
+
+    if plan.rerank and len(search_results) > 1:
+        search_results = await _rerank(query.question, search_results)
+    return search_results[:plan.top_k]
+
+def _lexical_search(collection, question: str, k: int, filters: Filters) -> list[SearchResult]:
+    hits = bm25_index.search(question, k, allowed=_allowed_ids(collection, filters))
+    if not hits:
+        return []
+    records = _get_records(collection, [doc_id for doc_id, _ in hits], include=["metadatas", "documents"])
+    best = hits[0][1]
+    return [
+        _search_result(doc_id, records[doc_id], similarity=score / best, score=score)
+        for doc_id, score in hits if doc_id in records
+    ]
+
+def _vector_search(nearest: list[tuple], threshold: float) -> list[SearchResult]:
+    return [
+        _search_result(doc_id, record, similarity)
+        for doc_id, record, similarity in nearest
+        if similarity >= threshold
+    ]
+
+def _hybrid_search(collection, question: str, query_embedding: list[float], nearest: list[tuple], k: int,
+                   threshold: float, filters: Filters) -> list[SearchResult]:
+    """Fuse the vector and BM25 rankings of a deeper candidate pool"""
+    candidates = max(k, config.HYBRID_CANDIDATES)
+    records = {doc_id: record for doc_id, record, _ in nearest}
+    similarities = {doc_id: similarity for doc_id, _, similarity in nearest}
+    lexical_ids = [doc_id for doc_id, _ in bm25_index.search(question, candidates, allowed=_allowed_ids(collection, filters))]
+
+    # Lexical-only hits still need their text and a cosine similarity
+    missing = [doc_id for doc_id in lexical_ids if doc_id not in records]
+    if missing:
+        fetched = collection.get(ids=missing, include=["metadatas", "documents", "embeddings"])
+        for i, doc_id in enumerate(fetched["ids"]):
+            records[doc_id] = (fetched["documents"][i], fetched["metadatas"][i])
+            similarities[doc_id] = max(0, _cosine_similarity(query_embedding, fetched["embeddings"][i]))
+
+    lexical = set(lexical_ids)
+    search_results = []
+    for doc_id, score in reciprocal_rank_fusion([[doc_id for doc_id, _, _ in nearest], lexical_ids]):
+        if doc_id not in records or (doc_id not in lexical and similarities[doc_id] < threshold):
+            continue
+        search_results.append(_search_result(doc_id, records[doc_id], similarities[doc_id], score=score))
+        if len(search_results) >= k:
+            break
+    return search_results
+
+def _nearest_many(collection, query_embeddings: list[list[float]], k: int, filters: Filters) -> list[list[tuple]]:
+    """The k chunks closest to each query embedding as (id, (document, metadata), cosine similarity), best first"""
+    if filters.active and filters.matches <= config.FILTER_EXACT_SEARCH_MAX:
+        # A small scope is cheaper to score exactly than to walk the HNSW graph around it
+        return _exact_nearest(collection, query_embeddings, k, filters)
+    try:
+        return _query_nearest(collection, query_embeddings, min(k, filters.matches) if filters.active else k, filters)
+    except Exception as e:
+        if not filters.active:
+            raise
+        # The index estimate is only an upper bound (ranges, unindexed keys, where_document), and
+        # Chroma's filtered HNSW query fails when asked for more neighbours than actually match
+        matches = len(_allowed_ids(collection, filters))
+        logger.warning(f"⚠️ Filtered query for {k} neighbours failed ({e}); {matches} chunks match, retrying")
+        if not matches:
+            return [[] for _ in query_embeddings]
+        if matches <= config.FILTER_EXACT_SEARCH_MAX:
+            return _exact_nearest(collection, query_embeddings, k, filters)
+        return _query_nearest(collection, query_embeddings, min(k, matches), filters)
+
+def _query_nearest(collection, query_embeddings: list[list[float]], n_results: int, filters: Filters) -> list[list[tuple]]:
     results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=min(query.top_k, 20),
+        query_embeddings=query_embeddings,
+        n_results=n_results,
+        where=filters.where,
+        where_document=filters.where_document,
         include=["metadatas", "documents", "distances"]
     )
+    return [
+        [
+            (doc_id, (results["documents"][q][i], results["metadatas"][q][i]), max(0, 1 - results["distances"][q][i]))  # cosine similarity
+            for i, doc_id in enumerate(ids)
+        ]
+        for q, ids in enumerate(results["ids"])
+    ]
 
-    search_results = []
-    for i, doc_id in enumerate(results["ids"][0]):
-        similarity = max(0, 1 - results["distances"][0][i])  # cosine similarity
-        if similarity >= query.threshold:
-            metadata = results["metadatas"][0][i]
-            search_results.append(SearchResult(
-                id=doc_id,
-                title=metadata.get("title", "Untitled"),
-                content=results["documents"][0][i],
-                similarity=round(similarity, 4),
-                metadata=metadata
-            ))
+def _exact_nearest(collection, query_embeddings: list[list[float]], k: int, filters: Filters) -> list[list[tuple]]:
+    """Score every chunk in a filtered scope against the query embeddings"""
+    scanned = collection.get(
+        where=filters.where,
+        where_document=filters.where_document,
+        include=["metadatas", "documents", "embeddings"]
+    )
+    if not scanned["ids"]:
+        return [[] for _ in query_embeddings]
+    vectors = np.asarray(scanned["embeddings"], dtype=np.float32)
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    norms = np.outer(np.linalg.norm(queries, axis=1), np.linalg.norm(vectors, axis=1))
+    similarities = queries @ vectors.T / np.where(norms == 0, 1, norms)
+    return [
+        [
+            (scanned["ids"][i], (scanned["documents"][i], scanned["metadatas"][i]), max(0.0, float(row[i])))
+            for i in np.argsort(-row)[:k]
+        ]
+        for row in similarities
+    ]
 
-    return search_results
+def _allowed_ids(collection, filters: Filters) -> Optional[list[str]]:
+    """Ids of the chunks a filtered query may return (None when unfiltered)"""
+    if not filters.active:
+        return None
+    return collection.get(where=filters.where, where_document=filters.where_document, include=[])["ids"]
+
+async def _rerank(question: str, search_results: list[SearchResult]) -> list[SearchResult]:
+    """Order results by cross-encoder score; on failure keep the retriever's order"""
+    try:
+        scores = await asyncio.to_thread(reranker.score, question, [result.content for result in search_results])
+    except Exception as e:
+        logger.warning(f"⚠️ Reranking failed, keeping retrieval order: {e}")
+        return search_results
+    order = sorted(range(len(search_results)), key=lambda i: scores[i], reverse=True)  # Unrounded: confident matches saturate near 1
+    for result, score in zip(search_results, scores):
+        result.rerank_score = round(score, 6)
+    return [search_results[i] for i in order]
+
+async def _query_embeddings(questions: list[str]) -> list[list[float]]:
+    # Use Ollama embedding instead of SentenceTransformer; recurring questions hit the in-memory cache
+    model = config.OLLAMA_EMBEDDING_MODEL
+    embeddings = {question: query_embedding_cache.get(model, question) for question in questions}
+    missing = [question for question, embedding in embeddings.items() if embedding is None]
+    if missing:
+        fresh = await get_ollama_embeddings_async(missing, model)
+        if len(fresh) != len(missing) or any(not embedding for embedding in fresh):
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to generate embedding for the query. Please check if Ollama is running and the embedding model is available."
+            )
+        for question, embedding in zip(missing, fresh):
+            query_embedding_cache.put(model, question, embedding)
+            embeddings[question] = embedding
+    return [embeddings[question] for question in questions]
+
+def _get_records(collection, ids: list[str], include: list[str]) -> dict:
+    """Fetch chunks by id as {id: (document, metadata)}"""
+    fetched = collection.get(ids=ids, include=include)
+    return {doc_id: (fetched["documents"][i], fetched["metadatas"][i]) for i, doc_id in enumerate(fetched["ids"])}
+
+def _cosine_similarity(a: list[float], b: list[float]) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+def _search_result(doc_id: str, record: tuple, similarity: float, score: float = None) -> SearchResult:
+    document, metadata = record
+    return SearchResult(
+        id=doc_id,
+        title=metadata.get("title", "Untitled"),
+        content=document,
+        similarity=round(similarity, 4),
+        metadata=metadata,
+        score=round(score, 6) if score is not None else None
+    )
@@ -1,45 +1,186 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from pathlib import Path
 from models import Document
-from routes.documents import add_document
-from pdf_scraper import pdf_scraper
+from routes.documents import store_document_batch, store_document_pages, store_documents, update_document
+from pdf_scraper import EXTRACTION_STRATEGIES, pdf_scraper
+from typing import Optional
+from utils.jobs import IngestionJob, QueueFullError, ingestion_queue
+from utils.json_records import JSONRecordError, JSONRecordReader, RecordFields
+from config import config
+import asyncio
 import logging
+import tempfile
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/")
-async def upload_document(file: UploadFile = File(...)):
+@router.post("/", status_code=202)
+async def upload_document(file: UploadFile = File(...), strategy: Optional[str] = None,
+                          source_key: Optional[str] = None, update: bool = False):
+    """Queue an uploaded file for ingestion
+
+    With ``update=true`` (keyed by filename) or an explicit ``source_key``,
+    the document previously uploaded under that key is updated in place and
+    only its changed chunks are re-embedded.
+    """
     allowed_types = {".txt", ".md", ".json", ".pdf"}
     file_suffix = Path(file.filename).suffix.lower()
 
     if file_suffix not in allowed_types:
         raise HTTPException(status_code=400, detail=f"File type {file_suffix} not supported")
+    if strategy is not None and strategy not in EXTRACTION_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown PDF extraction strategy: {strategy}")
+
+    path = await spool_upload(file, file_suffix)
+    try:
+        filename = file.filename
+        key = source_key or (filename if update else None)
+        job = ingestion_queue.submit(filename, lambda job: process_upload(job, path, filename, file_suffix, strategy, key),
+                                     cleanup=lambda: path.unlink(missing_ok=True))
+    except QueueFullError as e:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        logger.error(f"❌ Upload failed for {file.filename}: {e}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    logger.info(f"📥 Upload queued as job {job.id}: {file.filename}")
+    return {
+        "message": "Upload accepted for processing",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/upload/jobs/{job.id}"
+    }
+
+@router.post("/records", status_code=202)
+async def upload_records(file: UploadFile = File(...), content_field: str = "content",
+                         title_field: Optional[str] = "title", metadata_fields: Optional[str] = None,
+                         key_field: Optional[str] = None):
+    """Queue a JSON array or JSON Lines file for ingestion as one document per record
+
+    Fields are dotted paths into each record. ``metadata_fields`` is a
+    comma-separated list (default: every other top-level field) and
+    ``key_field`` gives each record a ``source_key``, so re-uploading an
+    export updates the stored documents in place. The file is parsed
+    incrementally and stored ``BULK_INGEST_BATCH_SIZE`` records at a time,
+    up to ``RECORDS_UPLOAD_MAX_BYTES``.
+    """
+    file_suffix = Path(file.filename).suffix.lower()
+    if file_suffix not in {".json", ".jsonl", ".ndjson"}:
+        raise HTTPException(status_code=400, detail=f"File type {file_suffix} not supported for record uploads")
+    fields = RecordFields(
+        content=content_field,
+        title=title_field or None,
+        metadata=[name.strip() for name in metadata_fields.split(",") if name.strip()] if metadata_fields is not None else None,
+        key=key_field or None
+    )
+
+    path = await spool_upload(file, file_suffix, config.RECORDS_UPLOAD_MAX_BYTES)
+    try:
+        filename = file.filename
+        job = ingestion_queue.submit(filename, lambda job: process_records(job, path, filename, file_suffix, fields),
+                                     cleanup=lambda: path.unlink(missing_ok=True))
+    except QueueFullError as e:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        logger.error(f"❌ Record upload failed for {file.filename}: {e}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    logger.info(f"📥 Record upload queued as job {job.id}: {file.filename}")
+    return {
+        "message": "Upload accepted for processing",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/upload/jobs/{job.id}"
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_upload_job(job_id: str):
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+async def spool_upload(file: UploadFile, suffix: str, max_bytes: int = config.UPLOAD_MAX_BYTES) -> Path:
+    """Copy an upload to a temporary file in chunks, rejecting it past ``max_bytes``"""
+    too_large = HTTPException(status_code=413, detail=f"File exceeds the upload limit of {max_bytes} bytes")
+    if (getattr(file, "size", None) or 0) > max_bytes:
+        raise too_large
 
+    out = tempfile.NamedTemporaryFile(prefix="rag_upload_", suffix=suffix, dir=config.UPLOAD_TMP_DIR, delete=False)
+    path = Path(out.name)
+    size = 0
     try:
-        content = await file.read()
-        
+        with out:
+            while chunk := await file.read(config.UPLOAD_READ_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise too_large
+                out.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+async def process_upload(job: IngestionJob, path: Path, filename: str, file_suffix: str,
+                         strategy: Optional[str] = None, source_key: Optional[str] = None) -> dict:
+    """Extract, chunk, embed and store one uploaded file (runs on an ingestion worker)
+
+    The spooled upload at ``path`` is deleted when the job finishes.
+    """
+    try:
+        return await _ingest_upload(job, path, filename, file_suffix, strategy, source_key)
+    finally:
+        path.unlink(missing_ok=True)
+
+async def _ingest_upload(job: IngestionJob, path: Path, filename: str, file_suffix: str,
+                         strategy: Optional[str] = None, source_key: Optional[str] = None) -> dict:
+    # Keyed updates need the whole text to diff chunks, so they never stream
+    if file_suffix == ".pdf" and not source_key:
+        # Long PDFs are indexed page by page while they are being parsed
+        try:
+            pdf_metadata = await asyncio.to_thread(pdf_scraper.get_document_metadata, path, filename, "streaming_pdf_upload")
+        except Exception:
+            pdf_metadata = None  # Let the regular path report the extraction error
+        if pdf_metadata and pdf_metadata.get("page_count", 0) >= config.PDF_STREAMING_MIN_PAGES:
+            logger.info(f"📄 Streaming PDF file page by page: {filename} ({pdf_metadata['page_count']} pages)")
+            title = pdf_metadata.get("pdf_title", Path(filename).stem)
+            doc_id = await store_document_pages(
+                title,
+                pdf_metadata,
+                pdf_scraper.aiter_pages(path, filename, strategy),
+                job=job,
+                page_count=pdf_metadata["page_count"]
+            )
+            logger.info(f"✅ Document uploaded successfully: {filename}")
+            return {"id": doc_id, "title": title, "metadata": pdf_metadata}
+
+    with job.track_stage("extract", 0.4):
         # Handle PDF files
         if file_suffix == ".pdf":
-            logger.info(f"📄 Processing PDF file: {file.filename}")
-            pdf_result = pdf_scraper.extract_text_from_pdf(content, file.filename)
-            
+            logger.info(f"📄 Processing PDF file: {filename}")
+            pdf_result = await pdf_scraper.extract_text_from_pdf_async(path, filename, strategy)
+
             if not pdf_result["success"]:
                 raise HTTPException(
                     status_code=500, 
                     detail=f"Failed to extract text from PDF: {pdf_result.get('error', 'Unknown error')}"
                 )
-            
+
             text_content = pdf_result["text"]
             metadata = pdf_result["metadata"]
-            
+
             # Use PDF title if available, otherwise use filename
-            title = metadata.get("pdf_title", Path(file.filename).stem)
-            
+            title = metadata.get("pdf_title", Path(filename).stem)
+
             logger.info(f"✅ PDF processed successfully. Pages: {metadata.get('page_count', 0)}, Method: {pdf_result['method_used']}")
-            
+
         else:
             # Handle text files
+            content = await asyncio.to_thread(path.read_bytes)
             try:
                 text_content = content.decode("utf-8")
             except UnicodeDecodeError:
@@ -48,30 +189,104 @@ async def upload_document(file: UploadFile = File(...)):
                     text_content = content.decode("latin-1")
                 except:
                     raise HTTPException(status_code=400, detail="Unable to decode file content")
-            
+
             metadata = {
-                "filename": file.filename,
+                "filename": filename,
                 "file_type": file_suffix,
                 "upload_method": "file_upload"
             }
-            title = Path(file.filename).stem
-
-        # Validate content
-        if not text_content.strip():
-            raise HTTPException(status_code=400, detail="File appears to be empty or contains no readable text")
-
-        document = Document(
-            title=title,
-            content=text_content,
-            metadata=metadata
-        )
-        
-        result = await add_document(document)
-        logger.info(f"✅ Document uploaded successfully: {file.filename}")
-        return result
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Upload failed for {file.filename}: {e}")
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+            title = Path(filename).stem
+
+    # Validate content
+    if not text_content.strip():
+        raise HTTPException(status_code=400, detail="File appears to be empty or contains no readable text")
+
+    document = Document(
+        title=title,
+        content=text_content,
+        metadata=metadata,
+        source_key=source_key
+    )
+
+    if source_key:
+        result = await update_document(document, job=job)
+        logger.info(f"✅ Document updated successfully: {filename}")
+        return {"title": document.title, "metadata": metadata, **result}
+
+    duplicates = {}
+    doc_id = (await store_documents([document], job=job, duplicates=duplicates))[0]
+    logger.info(f"✅ Document uploaded successfully: {filename}")
+    return {"id": doc_id, "title": document.title, "metadata": metadata, **duplicates.get(0, {})}
+
+async def process_records(job: IngestionJob, path: Path, filename: str, file_suffix: str,
+                          fields: RecordFields) -> dict:
+    """Store each record of a spooled JSON array or JSON Lines file as a document
+
+    Records are parsed in a worker thread one batch at a time, so memory is
+    bounded by the batch size whatever the file size. Invalid records are
+    reported and skipped; a malformed array stops the job, keeping the
+    batches already stored. The spooled upload is deleted when the job finishes.
+    """
+    try:
+        reader = JSONRecordReader(path)
+        records = iter(reader)
+        total_bytes = max(1, path.stat().st_size)
+        stem = Path(filename).stem
+        base_metadata = {"filename": filename, "file_type": file_suffix, "upload_method": "structured_upload"}
+        errors = []
+        record_count = 0
+        stored = 0
+        duplicates = []
+        parse_error: Optional[JSONRecordError] = None
+
+        def next_batch():
+            nonlocal record_count, parse_error
+            batch, positions = [], []
+            try:
+                for number, record, error in records:
+                    record_count = number
+                    if error is None:
+                        try:
+                            mapped = fields.map(record)
+                        except ValueError as e:
+                            error = str(e)
+                    if error is not None:
+                        errors.append({"record": number, "error": error})
+                        continue
+                    batch.append(Document(
+                        title=mapped["title"] or f"{stem} #{number}",
+                        content=mapped["content"],
+                        metadata={**base_metadata, **mapped["metadata"], "record_number": number},
+                        source_key=mapped["source_key"]
+                    ))
+                    positions.append(number)
+                    if len(batch) >= config.BULK_INGEST_BATCH_SIZE:
+                        break
+            except JSONRecordError as e:
+                parse_error = e  # Store the records read so far, then stop
+            return batch, positions
+
+        logger.info(f"🧾 Ingesting {reader.format} records from {filename}")
+        while parse_error is None:
+            with job.track_stage("parse", job.progress):
+                batch, positions = await asyncio.to_thread(next_batch)
+            if not batch:
+                break
+            with job.track_stage("store", min(0.99, reader.bytes_read / total_bytes)):
+                stored += await store_document_batch(batch, positions, errors, document_type="structured_upload",
+                                                     label="record", duplicates=duplicates)
+        if parse_error is not None:
+            raise HTTPException(status_code=400, detail=f"{parse_error} ({stored} records stored before the error)")
+
+        logger.info(f"✅ Stored {stored} of {record_count} records from {filename}")
+        return {
+            "format": reader.format,
+            "records": record_count,
+            "stored": stored,
+            "duplicates": len(duplicates),
+            "failed": record_count - stored - len(duplicates),
+            "errors": errors[:100],
+            "duplicate_records": duplicates[:100]
+        }
+    finally:
+        path.unlink(missing_ok=True)
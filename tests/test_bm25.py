@@ -0,0 +1,54 @@
+import pytest
+
+from utils.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_indexes_codes_whole_and_by_part():
+    assert tokenize("Error ERR-1042 in E_CONN.5") == ["error", "err-1042", "err", "1042", "in", "e_conn.5", "e", "conn", "5"]
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_rrf_keeps_ids_found_by_one_ranking():
+    fused = dict(reciprocal_rank_fusion([["a"], ["b"]], k=10))
+    assert fused == {"a": pytest.approx(1 / 11), "b": pytest.approx(1 / 11)}
+
+
+@pytest.fixture
+def index():
+    index = BM25Index(k1=1.5, b=0.75)
+    index.add_many(
+        ["c1", "c2", "c3"],
+        ["the printer shows ERR-1042 on startup", "printers and scanners", "the scanner jams on startup"]
+    )
+    return index
+
+
+def test_search_ranks_exact_terms_first(index):
+    assert [doc_id for doc_id, _ in index.search("err-1042", top_k=3)] == ["c1"]
+    results = index.search("scanner startup", top_k=3)
+    assert results[0][0] == "c3"
+    assert results[0][1] > results[1][1] > 0
+    assert index.search("nothing matches", top_k=3) == []
+
+
+def test_rare_terms_weigh_more(index):
+    scores = dict(index.search("the printer", top_k=3))
+    assert scores["c1"] > scores["c3"]
+
+
+def test_allowed_limits_the_scope(index):
+    assert [doc_id for doc_id, _ in index.search("startup", top_k=3, allowed=["c3"])] == ["c3"]
+    assert index.search("startup", top_k=3, allowed=["missing"]) == []
+
+
+def test_add_replaces_and_remove_forgets(index):
+    index.add_many(["c1"], ["completely different text"])
+    assert index.search("printer", top_k=3) == []
+    index.remove_many(["c1", "c2", "c3"])
+    assert index.get_stats() == {"chunks": 0, "terms": 0, "average_chunk_terms": 0, "k1": 1.5, "b": 0.75}
+    assert index.total_length == 0
@@ -0,0 +1,82 @@
+import pytest
+
+from utils.chunker import chunk_pages, chunk_text, estimate_tokens, merge_chunks
+
+TEXT = " ".join(f"Sentence number {i} talks about topic {i % 7}." for i in range(200))
+PAGES = "".join(
+    f"--- Page {page} ---\n" + " ".join(f"Page {page} sentence {i} is here." for i in range(40)) + "\n\n"
+    for page in range(1, 5)
+)
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text("") == []
+    assert chunk_text(" \n\n ") == []
+
+
+def test_unknown_unit_is_rejected():
+    with pytest.raises(ValueError):
+        chunk_text(TEXT, unit="words")
+
+
+@pytest.mark.parametrize("unit, measure", [("chars", len), ("tokens", estimate_tokens)])
+def test_chunks_are_source_slices_within_budget(unit, measure):
+    chunks = chunk_text(TEXT, chunk_size=200, chunk_overlap=40, unit=unit)
+    assert len(chunks) > 1
+    for index, chunk in enumerate(chunks):
+        assert chunk.index == index
+        assert chunk.text == TEXT[chunk.char_start:chunk.char_end]
+        assert measure(chunk.text) <= 200
+
+
+def test_chunks_cover_the_text_and_merge_back():
+    chunks = chunk_text(TEXT, chunk_size=300, chunk_overlap=60, unit="chars")
+    assert chunks[0].char_start == 0
+    assert chunks[-1].char_end == len(TEXT)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.char_start < chunk.char_start <= previous.char_end
+    assert merge_chunks([(c.char_start, c.char_end, c.text) for c in chunks]) == TEXT
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunks = chunk_text(TEXT, chunk_size=300, chunk_overlap=60, unit="chars")
+    assert any(chunk.char_start < previous.char_end for previous, chunk in zip(chunks, chunks[1:]))
+    no_overlap = chunk_text(TEXT, chunk_size=300, chunk_overlap=0, unit="chars")
+    assert all(chunk.char_start == previous.char_end for previous, chunk in zip(no_overlap, no_overlap[1:]))
+
+
+def test_chunks_break_at_sentence_ends():
+    for chunk in chunk_text(TEXT, chunk_size=300, chunk_overlap=0, unit="chars")[:-1]:
+        assert chunk.text.rstrip().endswith(".")
+
+
+def test_long_words_are_split_hard():
+    text = "x" * 1000
+    chunks = chunk_text(text, chunk_size=300, chunk_overlap=0, unit="chars")
+    assert [len(chunk.text) for chunk in chunks] == [300, 300, 300, 100]
+
+
+def test_chunks_carry_page_numbers():
+    chunks = chunk_text(PAGES, chunk_size=400, chunk_overlap=0, unit="chars")
+    assert chunks[0].page_start == 1
+    assert chunks[-1].page_end == 4
+    assert all(chunk.page_start <= chunk.page_end for chunk in chunks)
+
+
+def test_chunk_pages_never_spans_pages():
+    chunks = chunk_pages(PAGES, chunk_size=1000, chunk_overlap=0, unit="chars")
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    assert all(chunk.page_start == chunk.page_end for chunk in chunks)
+    assert merge_chunks([(c.char_start, c.char_end, c.text) for c in chunks]) == PAGES
+
+
+def test_chunk_pages_keeps_other_pages_unchanged_after_an_edit():
+    edited = PAGES.replace("Page 2 sentence 5 is here.", "Page 2 sentence 5 was rewritten.")
+    before = {chunk.text for chunk in chunk_pages(PAGES, chunk_size=300, chunk_overlap=0, unit="chars")}
+    after = chunk_pages(edited, chunk_size=300, chunk_overlap=0, unit="chars")
+    changed = [chunk for chunk in after if chunk.text not in before]
+    assert changed and all(chunk.page_start == 2 for chunk in changed)
+
+
+def test_chunk_pages_without_markers_matches_chunk_text():
+    assert chunk_pages(TEXT, 300, 60, "chars") == chunk_text(TEXT, 300, 60, "chars")
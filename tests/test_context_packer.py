@@ -0,0 +1,42 @@
+from utils.chunker import estimate_tokens
+from utils.context_packer import pack_context, truncate_to_tokens
+
+
+def passage(words):
+    return " ".join(f"w{i:03d}" for i in range(words))  # 5 characters per word with its space
+
+
+def test_whole_passages_fit_in_rank_order():
+    packed = pack_context(["first passage", "second passage"], budget=100)
+    assert packed.passages == ["first passage", "second passage"]
+    assert packed.text == "first passage\n\nsecond passage"
+    assert packed.tokens == estimate_tokens("first passage") + estimate_tokens("\n\n") + estimate_tokens("second passage")
+    assert not packed.truncated
+
+
+def test_the_first_passage_that_does_not_fit_is_truncated_and_ends_packing():
+    packed = pack_context([passage(40), passage(200), "short"], budget=100, min_passage_tokens=10)
+    assert len(packed.passages) == 2
+    assert packed.passages[1] == truncate_to_tokens(passage(200), 100 - 50 - 1)
+    assert packed.truncated
+    assert packed.tokens <= 100
+    assert packed.available == 3
+
+
+def test_too_little_room_drops_the_rest():
+    packed = pack_context([passage(70), passage(200), "short"], budget=100, min_passage_tokens=30)
+    assert packed.passages == [passage(70)]
+    assert not packed.truncated
+
+
+def test_empty_and_repeated_passages_are_skipped():
+    packed = pack_context(["  ", "same", "same ", "other"], budget=100)
+    assert packed.passages == ["same", "other"]
+
+
+def test_truncation_cuts_at_whitespace():
+    text = passage(100)
+    cut = truncate_to_tokens(text, 20)
+    assert estimate_tokens(cut) <= 20
+    assert text.startswith(cut) and text[len(cut)] == " "
+    assert truncate_to_tokens("short", 20) == "short"
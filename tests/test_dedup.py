@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from utils import dedup
+from utils.dedup import (
+    HashSet64, MINHASH_MASKS, deduplicate_text, merge_signatures, minhash_signature, shingle_hashes,
+    signature_from_hex, signature_similarity, signature_to_hex,
+)
+
+WORDS = [f"word{i}" for i in range(500)]
+
+
+def reference_signature(shingles, masks=MINHASH_MASKS):
+    return [min(value ^ mask for value in shingles) for mask in masks]
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingle_hashes("The quick, brown FOX jumps") == shingle_hashes("the quick brown fox jumps")
+    assert shingle_hashes("") == set()
+    assert len(shingle_hashes("too short", size=5)) == 1
+
+
+@pytest.mark.parametrize("count", [1, 10, 1000])
+def test_minhash_matches_the_scalar_definition(count):
+    shingles = {random.Random(count).getrandbits(64) for _ in range(count)}
+    assert minhash_signature(shingles) == reference_signature(shingles)
+
+
+def test_minhash_is_the_same_across_blocks(monkeypatch):
+    shingles = shingle_hashes(" ".join(WORDS))
+    expected = minhash_signature(shingles)
+    monkeypatch.setattr(dedup, "MINHASH_BLOCK", 7)
+    assert minhash_signature(shingles) == expected == reference_signature(shingles)
+
+
+def test_minhash_of_nothing_is_empty():
+    assert minhash_signature(set()) == []
+
+
+def test_signature_similarity_estimates_jaccard():
+    a = shingle_hashes(" ".join(WORDS))
+    b = shingle_hashes(" ".join(WORDS[:450] + [f"other{i}" for i in range(50)]))
+    assert signature_similarity(minhash_signature(a), minhash_signature(a)) == 1.0
+    estimate = signature_similarity(minhash_signature(a), minhash_signature(b))
+    assert abs(estimate - len(a & b) / len(a | b)) < 0.2
+    assert signature_similarity([], []) == 0.0
+
+
+def test_merged_signature_is_the_signature_of_the_union():
+    a = shingle_hashes(" ".join(WORDS[:200]))
+    b = shingle_hashes(" ".join(WORDS[150:]))
+    assert merge_signatures(minhash_signature(a), minhash_signature(b)) == minhash_signature(a | b)
+    assert merge_signatures([], minhash_signature(b)) == minhash_signature(b)
+
+
+def test_signature_hex_round_trip():
+    signature = minhash_signature(shingle_hashes(" ".join(WORDS)))
+    assert signature_from_hex(signature_to_hex(signature)) == signature
+
+
+def test_hash_set_finds_pending_and_merged_values():
+    values = HashSet64(max_items=1000)
+    values.add([1, 2, 3])
+    assert values.contains([1, 4, 3]) == [True, False, True]
+    values.add(range(10, 400))  # Past an eighth of max_items, so merged into a sorted run
+    assert not values.pending
+    assert values.contains([1, 399, 400]) == [True, True, False]
+    assert len(values) == 393
+
+
+def test_hash_set_forgets_the_oldest_run_past_its_bound():
+    values = HashSet64(max_items=64)
+    for start in range(0, 160, 16):
+        values.add(range(start, start + 16))
+    assert len(values) <= 64
+    assert values.contains([0, 159]) == [False, True]
+
+
+def test_deduplicate_text_drops_repeated_lines_and_paragraphs():
+    paragraph = " ".join(WORDS[:40])
+    text = f"Header\n{paragraph}\n\nHeader\nSomething new here\n\n{paragraph}\n\nHeader"
+    result, stats = deduplicate_text(text)
+    assert result == f"Header\n{paragraph}\nSomething new here"
+    assert stats.paragraphs_in == 4
+    assert stats.paragraphs_removed == 1
+    assert stats.lines_removed == 3
+    assert stats.as_metadata()["dedup_chars_removed"] == len(text) - len(result)
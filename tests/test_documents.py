@@ -0,0 +1,171 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("ollama")
+
+from config import config
+from models import Document
+from routes import documents
+from utils.bm25 import BM25Index
+from utils.duplicate_index import DuplicateIndex, PREFIX_SIGNATURE_KEY
+from utils.metadata_index import MetadataIndex
+
+
+def matches(metadata, where):
+    for key, condition in where.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class Collection:
+    """In-memory stand-in for the parts of a Chroma collection documents.py uses, in insertion order"""
+
+    def __init__(self):
+        self.records = {}
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for record in zip(ids, embeddings, documents, metadatas):
+            self.records.setdefault(record[0], record[1:])
+
+    def update(self, ids, metadatas):
+        for doc_id, metadata in zip(ids, metadatas):
+            embedding, document, _ = self.records[doc_id]
+            self.records[doc_id] = (embedding, document, metadata)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.records.pop(doc_id, None)
+
+    def get(self, ids=None, where=None, include=(), limit=None, offset=0):
+        found = [
+            (doc_id, record) for doc_id, record in self.records.items()
+            if (ids is None or doc_id in ids) and (where is None or matches(record[2], where))
+        ]
+        found = found[offset:offset + limit if limit is not None else None]
+        return {
+            "ids": [doc_id for doc_id, _ in found],
+            "embeddings": [record[0] for _, record in found],
+            "documents": [record[1] for _, record in found],
+            "metadatas": [record[2] for _, record in found],
+        }
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = Collection()
+    embedded = []
+
+    async def embed(texts):
+        embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(documents, "get_collection", lambda: collection)
+    monkeypatch.setattr(documents, "get_ollama_embeddings_async", embed)
+    for name, index in [("bm25_index", BM25Index()), ("metadata_index", MetadataIndex()),
+                        ("duplicate_index", DuplicateIndex()), ("prefix_index", DuplicateIndex(key=PREFIX_SIGNATURE_KEY))]:
+        monkeypatch.setattr(documents, name, index)
+    collection.embedded = embedded
+    return collection
+
+
+def store(collection, parents, chunks_per_parent):
+    """Store parents whose chunks are written in order, plus one legacy unchunked document"""
+    for p in range(parents):
+        for c in range(chunks_per_parent):
+            collection.add([f"p{p}_{c}"], [[0.0]], [f"text {p} {c} "], [{
+                "parent_id": f"p{p}", "chunk_index": c, "title": f"Doc {p}", "created_at": f"2024-01-0{p % 9 + 1}",
+                "char_start": c * 9, "char_end": (c + 1) * 9,
+            }])
+    collection.add(["legacy"], [[0.0]], ["old text"], [{"title": "Legacy"}])
+
+
+def list_documents(**params):
+    request = SimpleNamespace(headers={})
+    params = {"limit": None, "cursor": None, "fields": None, "output": None, **params}
+    response = asyncio.run(documents.get_documents(request, **params))
+    return json.loads(response.body), response.headers.get("x-next-cursor")
+
+
+def test_cursor_pages_visit_every_document_once(collection, monkeypatch):
+    monkeypatch.setattr(config, "DOCUMENTS_SCAN_BATCH_SIZE", 4)  # Pages straddle scan batches
+    store(collection, parents=7, chunks_per_parent=3)
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = list_documents(limit=3, cursor=cursor, fields="title")
+        seen += [document["id"] for document in page]
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == [f"p{p}" for p in range(7)] + ["legacy"]
+    assert pages == 3
+    assert page[-1] == {"id": "legacy", "title": "Legacy"}
+
+
+def test_a_full_last_page_has_no_cursor(collection):
+    store(collection, parents=2, chunks_per_parent=2)
+    page, cursor = list_documents(limit=3)
+    assert len(page) == 3 and cursor is None
+
+
+def test_listed_documents_are_rebuilt_from_their_chunks(collection):
+    store(collection, parents=2, chunks_per_parent=3)
+    page, _ = list_documents(limit=1, cursor="3")
+    assert page == [{
+        "id": "p1", "title": "Doc 1", "content": "text 1 0 text 1 1 text 1 2 ", "created_at": "2024-01-02",
+        "metadata": {"title": "Doc 1", "created_at": "2024-01-02", "chunk_count": 3},
+    }]
+
+
+@pytest.mark.parametrize("params", [{"cursor": "-1"}, {"cursor": "abc"}, {"limit": 0}, {"fields": "id,secret"}])
+def test_bad_paging_parameters_are_rejected(collection, params):
+    with pytest.raises(documents.HTTPException) as error:
+        list_documents(**params)
+    assert error.value.status_code == 400
+
+
+PAGES = "".join(
+    f"--- Page {page} ---\n" + " ".join(f"Page {page} sentence {i} says something." for i in range(120)) + "\n\n"
+    for page in range(1, 4)
+)
+
+
+def update(content):
+    return asyncio.run(documents.update_document(Document(title="Manual", content=content, source_key="manual.pdf")))
+
+
+def test_update_embeds_only_changed_chunks(collection, monkeypatch):
+    monkeypatch.setattr(config, "DUPLICATE_POLICY", "off")
+    first = update(PAGES)
+    assert first["chunks_unchanged"] == first["chunks_deleted"] == 0
+    stored = set(collection.records)
+    assert len(stored) == first["chunks_added"] > 3
+
+    collection.embedded.clear()
+    second = update(PAGES.replace("Page 2 sentence 4 says", "Page 2 sentence 4 now says"))
+    assert second["id"] == first["id"]
+    assert second["chunks_added"] == second["chunks_deleted"] == 1
+    assert second["chunks_unchanged"] == first["chunks_added"] - 1
+    assert collection.embedded == [collection.records[doc_id][1] for doc_id in set(collection.records) - stored]
+    assert all("now says" in text for text in collection.embedded)
+    assert len(collection.records) == first["chunks_added"]
+
+    collection.embedded.clear()
+    third = update(PAGES.replace("Page 2 sentence 4 says", "Page 2 sentence 4 now says"))
+    assert (third["chunks_added"], third["chunks_deleted"]) == (0, 0)
+    assert collection.embedded == []
+
+
+def test_chunk_ids_follow_text_and_repeat_counts():
+    chunks = [SimpleNamespace(text=text) for text in ["a", "b", "a"]]
+    ids = documents._chunk_ids("doc", chunks)
+    assert ids[0] != ids[1] and ids[2] == ids[0] + "_2"
+    assert documents._chunk_ids("doc", chunks[:1]) == ids[:1]
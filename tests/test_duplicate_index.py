@@ -0,0 +1,56 @@
+from utils.dedup import minhash_signature, shingle_hashes, signature_to_hex
+from utils.duplicate_index import PREFIX_SIGNATURE_KEY, DuplicateIndex
+
+WORDS = [f"word{i}" for i in range(300)]
+
+
+def signature(words):
+    return minhash_signature(shingle_hashes(" ".join(words)))
+
+
+class Collection:
+    def __init__(self, metadatas):
+        self.metadatas = metadatas
+
+    def get(self, where, include):
+        ids = [f"chunk{i}" for i in range(len(self.metadatas))]
+        return {"ids": ids, "metadatas": self.metadatas}
+
+
+def test_finds_near_duplicates_only():
+    index = DuplicateIndex(threshold=0.8)
+    index.add("a", signature(WORDS))
+    index.add("b", signature([f"other{i}" for i in range(300)]))
+    doc_id, similarity = index.find(signature(WORDS[:295] + ["changed"]))
+    assert doc_id == "a" and similarity >= 0.8
+    assert index.find(signature(WORDS[:150])) is None
+    assert index.find([]) is None
+
+
+def test_exclude_and_remove():
+    index = DuplicateIndex(threshold=0.8)
+    index.add("a", signature(WORDS))
+    assert index.find(signature(WORDS), exclude="a") is None
+    index.remove("a")
+    assert index.find(signature(WORDS)) is None
+    assert index.get_stats()["buckets"] == 0
+
+
+def test_adding_again_replaces_the_signature():
+    index = DuplicateIndex(threshold=0.8)
+    index.add("a", signature(WORDS))
+    index.add("a", signature([f"other{i}" for i in range(300)]))
+    assert index.find(signature(WORDS)) is None
+    assert index.get_stats()["documents"] == 1
+
+
+def test_rebuild_reads_its_own_metadata_key():
+    full, prefix = signature(WORDS), signature(WORDS[:100])
+    collection = Collection([
+        {"parent_id": "a", "content_minhash": signature_to_hex(full), PREFIX_SIGNATURE_KEY: signature_to_hex(prefix)},
+        {"parent_id": "b", "content_minhash": signature_to_hex(signature(["x"] * 3))},
+    ])
+    prefix_index = DuplicateIndex(key=PREFIX_SIGNATURE_KEY)
+    assert prefix_index.rebuild(collection) == 1
+    assert prefix_index.find(prefix)[0] == "a"
+    assert DuplicateIndex().rebuild(collection) == 2
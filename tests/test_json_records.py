@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from utils.json_records import JSONRecordError, JSONRecordReader, RecordFields
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data.encode("utf-8") if isinstance(data, str) else data)
+    return path
+
+
+def test_detects_the_format(tmp_path):
+    assert JSONRecordReader(write(tmp_path, "a.json", '﻿ \n [{"a": 1}]')).format == "array"
+    assert JSONRecordReader(write(tmp_path, "b.jsonl", '{"a": 1}\n')).format == "lines"
+    assert JSONRecordReader(write(tmp_path, "c.jsonl", "")).format == "lines"
+
+
+def test_lines_report_bad_lines_and_continue(tmp_path):
+    path = write(tmp_path, "a.jsonl", '{"a": 1}\n\nnot json\n{"b": 2}')
+    records = list(JSONRecordReader(path))
+    assert [(number, record) for number, record, _ in records] == [(1, {"a": 1}), (2, None), (3, {"b": 2})]
+    assert records[1][2].startswith("Invalid JSON")
+
+
+def test_oversized_lines_are_skipped_without_reading_them_whole(tmp_path):
+    long_line = json.dumps({"text": "x" * 500})
+    path = write(tmp_path, "a.jsonl", f'{{"a": 1}}\n{long_line}\n{{"b": 2}}\n{long_line}')
+    reader = JSONRecordReader(path, read_bytes=16, max_record_bytes=100)
+    assert list(reader) == [
+        (1, {"a": 1}, None),
+        (2, None, "Record exceeds 100 bytes"),
+        (3, {"b": 2}, None),
+        (4, None, "Record exceeds 100 bytes"),
+    ]
+    assert reader.bytes_read == path.stat().st_size
+
+
+def test_a_line_at_the_limit_is_read(tmp_path):
+    line = json.dumps({"text": "y" * 20})
+    path = write(tmp_path, "a.jsonl", line + "\n")
+    assert list(JSONRecordReader(path, max_record_bytes=len(line))) == [(1, {"text": "y" * 20}, None)]
+
+
+def test_array_records_span_read_blocks(tmp_path):
+    records = [{"id": i, "text": "é" * i, "nested": {"n": [i, 1.5]}} for i in range(30)] + [12345, "tail"]
+    path = write(tmp_path, "a.json", json.dumps(records, ensure_ascii=False))
+    reader = JSONRecordReader(path, read_bytes=7)
+    assert [record for _, record, _ in reader] == records
+    assert reader.bytes_read == path.stat().st_size
+
+
+def test_empty_array(tmp_path):
+    assert list(JSONRecordReader(write(tmp_path, "a.json", " [ ] "))) == []
+
+
+@pytest.mark.parametrize("data", ['[{"a": 1} {"b": 2}]', '[{"a": 1},', '[{"a": }]'])
+def test_malformed_arrays_raise(tmp_path, data):
+    with pytest.raises(JSONRecordError):
+        list(JSONRecordReader(write(tmp_path, "a.json", data), read_bytes=4))
+
+
+def test_oversized_array_elements_raise(tmp_path):
+    path = write(tmp_path, "a.json", json.dumps([{"a": 1}, {"text": "x" * 500}]))
+    reader = iter(JSONRecordReader(path, read_bytes=16, max_record_bytes=100))
+    assert next(reader) == (1, {"a": 1}, None)
+    with pytest.raises(JSONRecordError):
+        next(reader)
+
+
+def test_record_fields_map_dotted_paths():
+    fields = RecordFields(content="body.text", title="meta.title", metadata=["meta.tags", "lang"], key="id")
+    record = {"id": 7, "body": {"text": ["one", "two"]}, "meta": {"title": " T ", "tags": ["a"]}, "lang": "en"}
+    assert fields.map(record) == {
+        "content": "one\n\ntwo",
+        "title": "T",
+        "metadata": {"meta.tags": '["a"]', "lang": "en"},
+        "source_key": "7",
+    }
+
+
+def test_record_fields_default_metadata_is_every_other_field():
+    mapped = RecordFields().map({"content": "text", "title": "t", "year": 2024, "extra": None})
+    assert mapped["metadata"] == {"year": 2024}
+    assert mapped["source_key"] is None
+
+
+@pytest.mark.parametrize("record", [["not", "an", "object"], {"content": "  "}, {"title": "no content"}])
+def test_record_fields_reject_records_without_content(record):
+    with pytest.raises(ValueError):
+        RecordFields().map(record)
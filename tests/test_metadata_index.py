@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from utils.metadata_index import TIMESTAMP_KEY, MetadataIndex, translate_where
+
+
+def test_translate_where_moves_date_ranges_onto_timestamps():
+    start = datetime(2024, 1, 1).timestamp()
+    assert translate_where({"created_at": {"$gte": "2024-01-01"}}) == {TIMESTAMP_KEY: {"$gte": start}}
+    assert translate_where({"$and": [{"file_type": ".pdf"}, {"created_at": {"$lt": "2024-01-01"}}]}) == {
+        "$and": [{"file_type": ".pdf"}, {TIMESTAMP_KEY: {"$lt": start}}]
+    }
+
+
+def test_translate_where_leaves_other_conditions():
+    assert translate_where(None) is None
+    assert translate_where({}) is None
+    assert translate_where({"created_at": "2024-01-01T00:00:00"}) == {"created_at": "2024-01-01T00:00:00"}
+    assert translate_where({"created_at": {"$eq": "x"}}) == {"created_at": {"$eq": "x"}}
+
+
+@pytest.mark.parametrize("where", [["file_type"], {"$or": {"a": 1}}, {"created_at": {"$gt": "yesterday"}}])
+def test_translate_where_rejects_malformed_filters(where):
+    with pytest.raises(ValueError):
+        translate_where(where)
+
+
+@pytest.fixture
+def index():
+    index = MetadataIndex(keys=("file_type", "parent_id"))
+    index.add_many(
+        [f"c{i}" for i in range(6)],
+        [{"file_type": ".pdf", "parent_id": "a"}] * 3 + [{"file_type": ".md", "parent_id": "b"}] * 2 + [{}]
+    )
+    return index
+
+
+def test_estimates_are_exact_for_indexed_equality(index):
+    assert index.estimate(None) == 6
+    assert index.estimate({"file_type": ".pdf"}) == 3
+    assert index.estimate({"file_type": {"$eq": ".md"}}) == 2
+    assert index.estimate({"file_type": {"$in": [".pdf", ".md"]}}) == 5
+    assert index.estimate({"parent_id": "missing"}) == 0
+
+
+def test_estimates_bound_other_filters(index):
+    assert index.estimate({"file_type": {"$ne": ".pdf"}}) == 3
+    assert index.estimate({"file_type": {"$nin": [".pdf", ".md"]}}) == 1
+    assert index.estimate({"title": "anything"}) == 6
+    assert index.estimate({"$and": [{"file_type": ".pdf"}, {"parent_id": "b"}]}) == 2  # Smallest clause
+    assert index.estimate({"$or": [{"file_type": ".pdf"}, {"parent_id": "b"}]}) == 5
+
+
+def test_remove_and_replace_update_counts(index):
+    index.add_many(["c0"], [{"file_type": ".md", "parent_id": "b"}])
+    index.remove_many(["c1", "missing"])
+    assert index.estimate({"file_type": ".pdf"}) == 1
+    assert index.estimate({"parent_id": "b"}) == 3
+    assert index.get_stats() == {"chunks": 5, "keys": {"file_type": 2, "parent_id": 2}}
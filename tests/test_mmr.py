@@ -0,0 +1,25 @@
+from utils.mmr import mmr_select
+
+
+def test_relevance_only_keeps_rank_order():
+    assert mmr_select([0.9, 0.5, 0.7], [[1, 0], [1, 0], [1, 0]], top_k=3, lambda_=1.0) == [0, 2, 1]
+
+
+def test_redundant_candidates_are_picked_last():
+    embeddings = [[1, 0], [1, 0.01], [0, 1]]
+    assert mmr_select([0.9, 0.85, 0.6], embeddings, top_k=3, lambda_=0.5) == [0, 2, 1]
+
+
+def test_top_k_and_empty_input():
+    assert mmr_select([0.9, 0.8, 0.7], [[1, 0], [0, 1], [1, 1]], top_k=2) == [0, 1]
+    assert mmr_select([], [], top_k=3) == []
+    assert mmr_select([0.9], [[1, 0]], top_k=0) == []
+
+
+def test_costs_must_fit_the_budget():
+    picked = mmr_select([0.9, 0.8, 0.7], [[1, 0], [0, 1], [1, 1]], top_k=3, lambda_=1.0, costs=[60, 50, 30], budget=100)
+    assert picked == [0, 2]
+
+
+def test_zero_vectors_are_not_redundant():
+    assert mmr_select([0.9, 0.8], [[0, 0], [0, 0]], top_k=2, lambda_=0.5) == [0, 1]
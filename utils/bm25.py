@@ -0,0 +1,154 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger("BM25-Index")
+
+# Words, numbers and joined codes such as "ERR-1042", "E_CONN.5" or "0x8007"
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+PART_SPLIT_RE = re.compile(r"[-_./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms; joined codes are indexed whole and by their parts"""
+    terms = []
+    for token in TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        if len(token) > 1 and PART_SPLIT_RE.search(token):
+            terms.extend(part for part in PART_SPLIT_RE.split(token) if part)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = config.HYBRID_RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: each list adds 1 / (k + rank) to an id's score"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring over the stored chunks
+
+    Postings map each term to ``{doc: term frequency}`` over internal integer
+    ids. The index is rebuilt from the collection at startup and kept in
+    step with every add and delete.
+    """
+
+    def __init__(self, k1: float = config.BM25_K1, b: float = config.BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_ids: Dict[int, str] = {}
+        self.internal_ids: Dict[str, int] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self.total_length = 0
+        self._next_id = 0
+
+    def add_many(self, ids: List[str], texts: List[str]):
+        """Index chunks, replacing any already indexed under the same id"""
+        tokenized = [tokenize(text or "") for text in texts]
+        with self.lock:
+            for doc_id, terms in zip(ids, tokenized):
+                self._remove(doc_id)
+                internal = self._next_id
+                self._next_id += 1
+                counts: Dict[str, int] = {}
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+                for term, count in counts.items():
+                    self.postings.setdefault(term, {})[internal] = count
+                self.doc_ids[internal] = doc_id
+                self.internal_ids[doc_id] = internal
+                self.doc_lengths[internal] = len(terms)
+                self.doc_terms[internal] = tuple(counts)
+                self.total_length += len(terms)
+
+    def remove_many(self, ids: Iterable[str]):
+        with self.lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        internal = self.internal_ids.pop(doc_id, None)
+        if internal is None:
+            return
+        for term in self.doc_terms.pop(internal):
+            postings = self.postings[term]
+            del postings[internal]
+            if not postings:
+                del self.postings[term]
+        del self.doc_ids[internal]
+        self.total_length -= self.doc_lengths.pop(internal)
+
+    def search(self, query: str, top_k: int, allowed: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to top_k (chunk id, BM25 score) pairs, best first
+
+        With ``allowed`` only those chunk ids are scored.
+        """
+        terms = set(tokenize(query))
+        with self.lock:
+            count = len(self.doc_ids)
+            if not terms or not count:
+                return []
+            scope = None
+            if allowed is not None:
+                scope = {self.internal_ids[doc_id] for doc_id in allowed if doc_id in self.internal_ids}
+                if not scope:
+                    return []
+            average_length = self.total_length / count or 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for internal, frequency in postings.items():
+                    if scope is not None and internal not in scope:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[internal] / average_length)
+                    scores[internal] = scores.get(internal, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [(self.doc_ids[internal], score) for internal, score in best]
+
+    def rebuild(self, collection, batch_size: int = 5000) -> int:
+        """Re-index every chunk stored in the collection"""
+        with self.lock:
+            self.postings.clear()
+            self.doc_ids.clear()
+            self.internal_ids.clear()
+            self.doc_lengths.clear()
+            self.doc_terms.clear()
+            self.total_length = 0
+        offset = 0
+        while True:
+            result = collection.get(include=["documents"], limit=batch_size, offset=offset)
+            if not result["ids"]:
+                break
+            self.add_many(result["ids"], result["documents"])
+            offset += len(result["ids"])
+        logger.info(f"🔤 BM25 index loaded {offset} chunks, {len(self.postings)} terms")
+        return offset
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            count = len(self.doc_ids)
+            return {
+                "chunks": count,
+                "terms": len(self.postings),
+                "average_chunk_terms": round(self.total_length / count, 1) if count else 0,
+                "k1": self.k1,
+                "b": self.b,
+            }
+
+
+# Global BM25 index instance
+bm25_index = BM25Index()
@@ -0,0 +1,211 @@
+import bisect
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from config import config
+
+# Page markers written by pdf_scraper, e.g. "--- Page 12 ---"
+PAGE_MARKER_RE = re.compile(r"--- Page (\d+) ---")
+
+# A segment ends after sentence punctuation, a blank line, or right before a page marker
+SEGMENT_END_RE = re.compile(r"[.!?][\"')\]]*\s+|\n[ \t]*\n\s*|\n(?=--- Page \d+ ---)")
+
+
+@dataclass
+class Chunk:
+    """A slice of a document; ``text == source[char_start:char_end]``"""
+    text: str
+    index: int
+    char_start: int
+    char_end: int
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English BPE vocabularies)"""
+    return math.ceil(len(text) / 4)
+
+
+def _measure(unit: str) -> Callable[[str], int]:
+    if unit == "tokens":
+        return estimate_tokens
+    if unit == "chars":
+        return len
+    raise ValueError(f"Unknown chunk unit: {unit}")
+
+
+def _split_segments(text: str) -> List[Tuple[int, int]]:
+    """Split text into contiguous (start, end) sentence/paragraph segments"""
+    segments = []
+    start = 0
+    for match in SEGMENT_END_RE.finditer(text):
+        if match.end() > start:
+            segments.append((start, match.end()))
+            start = match.end()
+    if start < len(text):
+        segments.append((start, len(text)))
+    return segments
+
+
+def _split_long_segment(text: str, start: int, end: int, budget: int,
+                        measure: Callable[[str], int]) -> List[Tuple[int, int]]:
+    """Split a segment that exceeds the budget at whitespace (or hard, if there is none)"""
+    pieces = []
+    while end - start > 0 and measure(text[start:end]) > budget:
+        # Largest prefix within budget, found by binary search on length
+        low, high = 1, end - start
+        while low < high:
+            mid = (low + high + 1) // 2
+            if measure(text[start:start + mid]) <= budget:
+                low = mid
+            else:
+                high = mid - 1
+        cut = start + low
+        space = text.rfind(" ", start + 1, cut)
+        if space > start and space - start > low // 2:
+            cut = space + 1
+        pieces.append((start, cut))
+        start = cut
+    if start < end:
+        pieces.append((start, end))
+    return pieces
+
+
+def _page_locator(text: str) -> Callable[[int], Optional[int]]:
+    """Map a character offset to the page number of the closest preceding page marker"""
+    offsets, pages = [], []
+    for match in PAGE_MARKER_RE.finditer(text):
+        offsets.append(match.start())
+        pages.append(int(match.group(1)))
+
+    def locate(position: int) -> Optional[int]:
+        i = bisect.bisect_right(offsets, position) - 1
+        if i >= 0:
+            return pages[i]
+        return pages[0] if pages else None
+
+    return locate
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = config.CHUNK_SIZE,
+    chunk_overlap: int = config.CHUNK_OVERLAP,
+    unit: str = config.CHUNK_UNIT,
+) -> List[Chunk]:
+    """Split text into overlapping chunks of at most ``chunk_size`` units
+
+    Chunks break at sentence, paragraph and page boundaries where possible and
+    repeat up to ``chunk_overlap`` units of trailing segments from the previous
+    chunk. ``unit`` is "tokens" (estimated) or "chars".
+    """
+    if not text.strip():
+        return []
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    chunk_overlap = max(0, min(chunk_overlap, chunk_size // 2))
+    measure = _measure(unit)
+
+    segments = []
+    for start, end in _split_segments(text):
+        segments.extend(_split_long_segment(text, start, end, chunk_size, measure))
+    sizes = [measure(text[start:end]) for start, end in segments]
+
+    # Greedily pack segments; each span is (first segment, last segment + 1)
+    spans = []
+    first = 0
+    while first < len(segments):
+        last, total = first, 0
+        while last < len(segments) and (total + sizes[last] <= chunk_size or last == first):
+            total += sizes[last]
+            last += 1
+        spans.append((first, last))
+        if last >= len(segments):
+            break
+        # Step back over trailing segments that fit in the overlap, always making progress
+        next_first, carried = last, 0
+        while next_first - 1 > first and carried + sizes[next_first - 1] <= chunk_overlap:
+            next_first -= 1
+            carried += sizes[next_first]
+        first = next_first
+
+    # Whitespace-only spans are folded into a neighbouring chunk so chunk offsets stay contiguous
+    bounds = []
+    carry = None
+    for first, last in spans:
+        char_start, char_end = segments[first][0], segments[last - 1][1]
+        if not text[char_start:char_end].strip():
+            if bounds:
+                bounds[-1] = (bounds[-1][0], max(bounds[-1][1], char_end))
+            elif carry is None:
+                carry = char_start
+            continue
+        bounds.append((char_start if carry is None else carry, char_end))
+        carry = None
+
+    locate_page = _page_locator(text)
+    return [
+        Chunk(
+            text=text[char_start:char_end],
+            index=index,
+            char_start=char_start,
+            char_end=char_end,
+            page_start=locate_page(char_start),
+            page_end=locate_page(char_end - 1),
+        )
+        for index, (char_start, char_end) in enumerate(bounds)
+    ]
+
+
+def chunk_pages(
+    text: str,
+    chunk_size: int = config.CHUNK_SIZE,
+    chunk_overlap: int = config.CHUNK_OVERLAP,
+    unit: str = config.CHUNK_UNIT,
+) -> List[Chunk]:
+    """Chunk each page (from one page marker to the next) on its own
+
+    Chunks never span pages, so an edit on one page leaves the chunks of
+    every other page unchanged. Text without page markers is chunked as a
+    whole, like ``chunk_text``.
+    """
+    starts = [match.start() for match in PAGE_MARKER_RE.finditer(text)]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+    chunks = []
+    carry = None  # Start of leading whitespace no chunk covers yet
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        page_chunks = chunk_text(text[start:end], chunk_size, chunk_overlap, unit)
+        if not page_chunks:
+            # Whitespace between pages joins a neighbouring chunk, as in chunk_text
+            if chunks:
+                chunks[-1].text = text[chunks[-1].char_start:end]
+                chunks[-1].char_end = end
+            elif carry is None:
+                carry = start
+            continue
+        for chunk in page_chunks:
+            chunk.index = len(chunks)
+            chunk.char_start += start
+            chunk.char_end += start
+            chunks.append(chunk)
+        if carry is not None:
+            page_chunks[0].text = text[carry:page_chunks[0].char_end]
+            page_chunks[0].char_start = carry
+            carry = None
+    return chunks
+
+
+def merge_chunks(chunks: List[Tuple[int, int, str]]) -> str:
+    """Rebuild the source text from (char_start, char_end, text) chunks, dropping overlaps"""
+    text = ""
+    position = 0
+    for char_start, char_end, chunk in sorted(chunks):
+        if char_end <= position:
+            continue
+        text += chunk[max(0, position - char_start):]
+        position = char_end
+    return text
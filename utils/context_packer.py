@@ -0,0 +1,121 @@
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from config import config
+from utils.chunker import estimate_tokens
+
+
+@dataclass
+class PackedContext:
+    """Passages selected for a prompt and their estimated size"""
+    passages: List[str] = field(default_factory=list)
+    tokens: int = 0
+    available: int = 0
+    truncated: bool = False
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.passages)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Longest prefix of text within the token budget, cut at whitespace when possible"""
+    if estimate_tokens(text) <= budget:
+        return text
+    cut = budget * 4  # Inverse of estimate_tokens
+    space = text.rfind(" ", 0, cut)
+    if space > cut // 2:
+        cut = space
+    return text[:cut].rstrip()
+
+
+def pack_context(passages: List[str], budget: int = config.CONTEXT_TOKEN_BUDGET,
+                 min_passage_tokens: int = config.CONTEXT_MIN_PASSAGE_TOKENS) -> PackedContext:
+    """Fill a token budget with passages, most relevant first
+
+    ``passages`` must be ordered by decreasing relevance. Whole passages are
+    taken while they fit; the first one that does not is truncated to the
+    remaining budget (unless less than ``min_passage_tokens`` is left) and
+    packing stops there, so a lower-ranked passage never displaces part of
+    a higher-ranked one. Empty and repeated passages are skipped.
+    """
+    packed = PackedContext(available=len(passages))
+    separator_tokens = estimate_tokens("\n\n")
+    seen = set()
+    for passage in passages:
+        passage = passage.strip()
+        if not passage or passage in seen:
+            continue
+        seen.add(passage)
+        cost = estimate_tokens(passage) + (separator_tokens if packed.passages else 0)
+        remaining = budget - packed.tokens
+        if cost <= remaining:
+            packed.passages.append(passage)
+            packed.tokens += cost
+            continue
+        remaining -= separator_tokens if packed.passages else 0
+        if remaining >= min_passage_tokens:
+            passage = truncate_to_tokens(passage, remaining)
+            packed.passages.append(passage)
+            packed.tokens += estimate_tokens(passage) + (separator_tokens if len(packed.passages) > 1 else 0)
+            packed.truncated = True
+        break
+    return packed
+
+
+class PromptTokenCalibration:
+    """How far Ollama's prompt token counts run above ``estimate_tokens``
+
+    The ratio is at least 1 + OLLAMA_NUM_CTX_MARGIN_RATIO. It rises to the
+    largest ratio seen in ``prompt_eval_count`` and decays back slowly,
+    since code, numbers and non-English text take more tokens per
+    character. Counts below the estimate (a cached prompt prefix is not
+    re-evaluated) only let it decay.
+    """
+
+    def __init__(self, floor: float = 1 + config.OLLAMA_NUM_CTX_MARGIN_RATIO, decay: float = 0.98):
+        self.floor = floor
+        self.decay = decay
+        self.observed = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def ratio(self) -> float:
+        return max(self.floor, self.observed)
+
+    def observe(self, prompt: str, prompt_eval_count: Optional[int]):
+        estimate = estimate_tokens(prompt)
+        if not prompt_eval_count or not estimate:
+            return
+        with self.lock:
+            self.observed = max(prompt_eval_count / estimate, self.observed * self.decay)
+
+    def tokens(self, text: str) -> int:
+        """Token count of text to plan the context window with"""
+        return math.ceil(estimate_tokens(text) * self.ratio)
+
+
+def num_ctx_for(prompt: str, num_predict: int = config.MAX_RESPONSE_TOKENS) -> int:
+    """Context window for a prompt plus its response
+
+    The prompt is sized with the calibrated ratio of ``prompt_tokens`` plus
+    OLLAMA_NUM_CTX_MARGIN. The result is rounded up to a multiple of
+    OLLAMA_NUM_CTX_STEP and clamped to [OLLAMA_NUM_CTX_MIN,
+    OLLAMA_NUM_CTX_MAX]: Ollama reloads the model when num_ctx changes, so
+    similar prompts should share a value.
+    """
+    needed = prompt_tokens.tokens(prompt) + num_predict + config.OLLAMA_NUM_CTX_MARGIN
+    step = config.OLLAMA_NUM_CTX_STEP
+    return max(config.OLLAMA_NUM_CTX_MIN, min(config.OLLAMA_NUM_CTX_MAX, math.ceil(needed / step) * step))
+
+
+def prompt_estimate_limit(num_predict: int = config.MAX_RESPONSE_TOKENS) -> int:
+    """Largest ``estimate_tokens`` a prompt can have and still fit OLLAMA_NUM_CTX_MAX"""
+    room = config.OLLAMA_NUM_CTX_MAX - num_predict - config.OLLAMA_NUM_CTX_MARGIN
+    return max(0, math.floor(room / prompt_tokens.ratio))
+
+
+# Global prompt token calibration
+prompt_tokens = PromptTokenCalibration()
@@ -0,0 +1,198 @@
+import hashlib
+import random
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from config import config
+
+# Paragraphs are separated by blank (or whitespace-only) lines
+PARAGRAPH_SPLIT_RE = re.compile(r"\n[ \t]*\n")
+WORD_RE = re.compile(r"\w+")
+
+# Paragraphs with fewer shingles are only deduplicated line by line
+MIN_SHINGLES = 3
+
+
+def hash64(text: str) -> int:
+    """Stable 64-bit hash of a string (BLAKE2b)"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def normalize_line(line: str) -> str:
+    """Normalize a line for comparison (whitespace runs collapse to one space)"""
+    return " ".join(line.split())
+
+
+def shingle_hashes(text: str, size: int = config.DEDUP_SHINGLE_SIZE) -> Set[int]:
+    """64-bit hashes of the case-folded word ``size``-grams of text"""
+    words = WORD_RE.findall(text.casefold())
+    if len(words) <= size:
+        return {hash64(" ".join(words))} if words else set()
+    return {hash64(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def _minhash_masks(num_perm: int) -> List[int]:
+    """Fixed pseudo-random 64-bit masks; XOR with a mask permutes the hash space"""
+    rng = random.Random(0x5EED)
+    return [rng.getrandbits(64) for _ in range(num_perm)]
+
+
+MINHASH_MASKS = _minhash_masks(config.MINHASH_PERMUTATIONS)
+
+# Shingles XORed with every mask at once; bounds the (masks x shingles) array to a few MB
+MINHASH_BLOCK = 8192
+
+
+def minhash_signature(shingles: Iterable[int], masks: List[int] = MINHASH_MASKS) -> List[int]:
+    """MinHash signature of a set of 64-bit shingle hashes (empty for an empty set)"""
+    values = np.fromiter(shingles, dtype=np.uint64)
+    if not len(values):
+        return []
+    mask_column = np.asarray(masks, dtype=np.uint64)[:, None]
+    signature = np.full(len(masks), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(values), MINHASH_BLOCK):
+        np.minimum(signature, (values[None, start:start + MINHASH_BLOCK] ^ mask_column).min(axis=1), out=signature)
+    return signature.tolist()
+
+
+def merge_signatures(a: List[int], b: List[int]) -> List[int]:
+    """Signature of the union of two shingle sets"""
+    if not a or not b:
+        return a or b
+    return [min(x, y) for x, y in zip(a, b)]
+
+
+def signature_similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def signature_to_hex(signature: List[int]) -> str:
+    """Compact string form of a signature, for document metadata"""
+    return "".join(f"{value:016x}" for value in signature)
+
+
+def signature_from_hex(value: str) -> List[int]:
+    return [int(value[i:i + 16], 16) for i in range(0, len(value), 16)]
+
+
+class HashSet64:
+    """Compact, bounded set of 64-bit hashes
+
+    Hashes are kept in sorted NumPy uint64 runs (8 bytes each instead of a
+    Python int in a set). New hashes wait in a small set and are merged into
+    the active run once it grows by an eighth. A run is frozen at a quarter
+    of ``max_items``, and past ``max_items`` the oldest frozen run is
+    forgotten.
+    """
+
+    def __init__(self, max_items: int = config.DEDUP_MAX_HASHES):
+        self.max_items = max_items
+        self.frozen: List[np.ndarray] = []  # Oldest first
+        self.active = np.empty(0, dtype=np.uint64)
+        self.pending: Set[int] = set()
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self.frozen) + len(self.active) + len(self.pending)
+
+    def contains(self, values: List[int]) -> List[bool]:
+        """Whether each value is already in the set"""
+        if not values:
+            return []
+        found = np.fromiter((value in self.pending for value in values), dtype=bool, count=len(values))
+        array = np.asarray(values, dtype=np.uint64)
+        for run in self.frozen + [self.active]:
+            if len(run):
+                positions = np.minimum(np.searchsorted(run, array), len(run) - 1)
+                found |= run[positions] == array
+        return found.tolist()
+
+    def add(self, values: Iterable[int]):
+        self.pending.update(values)
+        if len(self.pending) < max(min(4096, self.max_items // 8), len(self.active) // 8):
+            return
+        self.active = np.union1d(self.active, np.fromiter(self.pending, dtype=np.uint64, count=len(self.pending)))
+        self.pending.clear()
+        if len(self.active) >= self.max_items // 4:
+            self.frozen.append(self.active)
+            self.active = np.empty(0, dtype=np.uint64)
+            while len(self) > self.max_items and self.frozen:
+                self.frozen.pop(0)
+
+
+@dataclass
+class DedupStats:
+    """What deduplication removed from a text"""
+    lines_in: int = 0
+    lines_removed: int = 0
+    paragraphs_in: int = 0
+    paragraphs_removed: int = 0
+    chars_in: int = 0
+    chars_out: int = 0
+
+    @property
+    def chars_removed(self) -> int:
+        return self.chars_in - self.chars_out
+
+    def as_metadata(self) -> Dict[str, int]:
+        """Flat counters suitable for document metadata"""
+        return {
+            "dedup_chars_removed": self.chars_removed,
+            "dedup_lines_removed": self.lines_removed,
+            "dedup_paragraphs_removed": self.paragraphs_removed,
+        }
+
+
+def deduplicate_text(
+    text: str,
+    threshold: float = config.DEDUP_NEAR_DUPLICATE_THRESHOLD,
+    shingle_size: int = config.DEDUP_SHINGLE_SIZE,
+) -> Tuple[str, DedupStats]:
+    """Remove repeated lines and near-duplicate paragraphs, keeping first occurrences
+
+    A paragraph is dropped when at least ``threshold`` of its word shingles
+    already appeared in kept text, which catches the slightly different
+    renderings of the same page by different extractors. Remaining lines
+    are dropped when their normalized form was already kept. Only 64-bit
+    hashes are remembered, in two ``HashSet64`` bounded by DEDUP_MAX_HASHES.
+    Returns the kept non-empty lines joined by newlines and the removal
+    counters.
+    """
+    stats = DedupStats(chars_in=len(text))
+    seen_lines = HashSet64()
+    seen_shingles = HashSet64()
+    kept = []
+
+    for paragraph in PARAGRAPH_SPLIT_RE.split(text):
+        lines = [line for line in paragraph.split("\n") if line.strip()]
+        if not lines:
+            continue
+        stats.paragraphs_in += 1
+        stats.lines_in += len(lines)
+
+        shingles = list(shingle_hashes(paragraph, shingle_size))
+        if len(shingles) >= MIN_SHINGLES and sum(seen_shingles.contains(shingles)) >= threshold * len(shingles):
+            stats.paragraphs_removed += 1
+            stats.lines_removed += len(lines)
+            continue
+        seen_shingles.add(shingles)
+
+        line_hashes = [hash64(normalize_line(line)) for line in lines]
+        seen = seen_lines.contains(line_hashes)
+        added: Set[int] = set()
+        for line, line_hash, already_seen in zip(lines, line_hashes, seen):
+            if already_seen or line_hash in added:
+                stats.lines_removed += 1
+                continue
+            added.add(line_hash)
+            kept.append(line)
+        seen_lines.add(added)
+
+    result = "\n".join(kept)
+    stats.chars_out = len(result)
+    return result, stats
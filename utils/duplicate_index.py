@@ -0,0 +1,106 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import config
+from utils.dedup import signature_from_hex, signature_similarity
+
+logger = logging.getLogger("Duplicate-Index")
+
+# Metadata key holding a parent document's MinHash signature (on its first chunk)
+SIGNATURE_KEY = "content_minhash"
+
+# Signature of a streamed document's first PDF_STREAM_PAGES_PER_BATCH pages, also on its first chunk
+PREFIX_SIGNATURE_KEY = "content_minhash_prefix"
+
+
+class DuplicateIndex:
+    """In-memory MinHash LSH index of stored parent documents
+
+    Signatures are split into ``bands`` bands; documents sharing any band
+    are candidates, and a candidate is a near-duplicate when its estimated
+    Jaccard similarity reaches ``threshold``. The index is rebuilt from the
+    signatures stored under ``key`` in the collection at startup.
+    """
+
+    def __init__(self, threshold: float = config.DUPLICATE_THRESHOLD,
+                 bands: int = config.MINHASH_LSH_BANDS, key: str = SIGNATURE_KEY):
+        self.key = key
+        self.threshold = threshold
+        self.bands = bands
+        self.signatures: Dict[str, List[int]] = {}
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self.lock = threading.Lock()
+
+    def _band_keys(self, signature: List[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+        rows = max(1, len(signature) // self.bands)
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, doc_id: str, signature: List[int]):
+        if not signature:
+            return
+        with self.lock:
+            self._remove(doc_id)
+            self.signatures[doc_id] = signature
+            for key in self._band_keys(signature):
+                self.buckets.setdefault(key, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        with self.lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        signature = self.signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find(self, signature: List[int], exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Return (doc_id, similarity) of the most similar near-duplicate other than ``exclude``, if any"""
+        if not signature:
+            return None
+        with self.lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates |= self.buckets.get(key, set())
+            candidates.discard(exclude)
+            best = None
+            for doc_id in candidates:
+                similarity = signature_similarity(signature, self.signatures[doc_id])
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (doc_id, similarity)
+            return best
+
+    def rebuild(self, collection) -> int:
+        """Reload signatures from the first chunk of every stored document"""
+        result = collection.get(where={"chunk_index": 0}, include=["metadatas"])
+        with self.lock:
+            self.signatures.clear()
+            self.buckets.clear()
+        loaded = 0
+        for doc_id, metadata in zip(result["ids"], result["metadatas"]):
+            value = (metadata or {}).get(self.key)
+            if value:
+                self.add(metadata.get("parent_id", doc_id), signature_from_hex(value))
+                loaded += 1
+        logger.info(f"🔎 Duplicate index loaded {loaded} {self.key} signatures")
+        return loaded
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "documents": len(self.signatures),
+                "buckets": len(self.buckets),
+                "threshold": self.threshold,
+                "bands": self.bands,
+            }
+
+
+# Global duplicate index instances
+duplicate_index = DuplicateIndex()
+prefix_index = DuplicateIndex(key=PREFIX_SIGNATURE_KEY)
@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger("Embedding-Cache")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (whitespace runs collapse to one space)"""
+    return " ".join(text.split())
+
+
+def text_digest(text: str) -> bytes:
+    """SHA-256 of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by (model, sha256 of normalized text)
+
+    Vectors are stored as packed float32 blobs in SQLite. When the stored
+    vectors exceed ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = config.EMBEDDING_CACHE_PATH,
+                 max_bytes: int = config.EMBEDDING_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    vector BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+            conn.commit()
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings for texts; misses are returned as None"""
+        if not texts:
+            return []
+        digests = [text_digest(text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        try:
+            with self.lock:
+                conn = self.conn
+                unique = list(set(digests))
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(unique), 500):
+                    part = unique[i:i + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows = conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *part],
+                    ).fetchall()
+                    for text_hash, vector in rows:
+                        found[text_hash] = array("f", vector).tolist()
+                if found:
+                    now = time.time()
+                    conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                        [(now, model, text_hash) for text_hash in found],
+                    )
+                    conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Embedding cache lookup failed: {e}")
+
+        results = [found.get(digest) for digest in digests]
+        hits = sum(1 for result in results if result is not None)
+        with self.lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]):
+        """Store embeddings; empty embeddings are skipped"""
+        now = time.time()
+        rows = {}
+        for text, embedding in zip(texts, embeddings):
+            if embedding:
+                digest = text_digest(text)
+                vector = array("f", embedding).tobytes()
+                rows[digest] = (model, digest, vector, len(vector), now)
+        if not rows:
+            return
+        try:
+            with self.lock:
+                conn = self.conn
+                # Bytes held by entries about to be overwritten
+                replaced = 0
+                digests = list(rows)
+                for i in range(0, len(digests), 500):
+                    part = digests[i:i + 500]
+                    placeholders = ",".join("?" * len(part))
+                    replaced += conn.execute(
+                        f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *part],
+                    ).fetchone()[0]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                    list(rows.values()),
+                )
+                conn.commit()
+                self.writes += len(rows)
+                self._total_bytes += sum(row[3] for row in rows.values()) - replaced
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Embedding cache write failed: {e}")
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        self.put_many(model, [text], [embedding])
+
+    def _evict(self):
+        """Drop least recently used entries until 90% of the size cap (lock held)"""
+        target = int(self.max_bytes * 0.9)
+        conn = self.conn
+        while self._total_bytes > target:
+            rows = conn.execute(
+                "SELECT model, text_hash, size FROM embeddings ORDER BY last_access LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            victims = []
+            for model, text_hash, size in rows:
+                victims.append((model, text_hash))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+            self.evictions += len(victims)
+        conn.commit()
+        logger.info(f"🧹 Embedding cache evicted entries, now {self._total_bytes} bytes")
+
+    def clear(self):
+        """Remove all cached embeddings"""
+        with self.lock:
+            self.conn.execute("DELETE FROM embeddings")
+            self.conn.commit()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters and size"""
+        with self.lock:
+            try:
+                entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            except sqlite3.Error:
+                entries = None
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,142 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import config
+
+logger = logging.getLogger("Extraction-Cache")
+
+
+class ExtractionCache:
+    """Persistent cache of PDF extraction results keyed by file digest and extractor options
+
+    Results are stored as zlib-compressed JSON in SQLite. When the stored
+    results exceed ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = config.EXTRACTION_CACHE_PATH,
+                 max_bytes: int = config.EXTRACTION_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extractions (
+                    key TEXT PRIMARY KEY,
+                    result BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_access ON extractions (last_access)")
+            conn.commit()
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result or None"""
+        try:
+            with self.lock:
+                row = self.conn.execute("SELECT result FROM extractions WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.conn.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key))
+                self.conn.commit()
+                self.hits += 1
+            return json.loads(zlib.decompress(row[0]))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning(f"⚠️ Extraction cache lookup failed: {e}")
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result, evicting least recently used entries beyond max_bytes"""
+        blob = zlib.compress(json.dumps(result).encode("utf-8"))
+        if len(blob) > self.max_bytes:
+            return
+        try:
+            with self.lock:
+                conn = self.conn
+                replaced = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions WHERE key = ?", (key,)).fetchone()[0]
+                conn.execute(
+                    "INSERT OR REPLACE INTO extractions (key, result, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time()),
+                )
+                conn.commit()
+                self.writes += 1
+                self._total_bytes += len(blob) - replaced
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Extraction cache write failed: {e}")
+
+    def _evict(self):
+        """Drop least recently used entries until 90% of the size cap (lock held)"""
+        target = int(self.max_bytes * 0.9)
+        conn = self.conn
+        while self._total_bytes > target:
+            rows = conn.execute("SELECT key, size FROM extractions ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            conn.executemany("DELETE FROM extractions WHERE key = ?", victims)
+            self.evictions += len(victims)
+        conn.commit()
+        logger.info(f"🧹 Extraction cache evicted entries, now {self._total_bytes} bytes")
+
+    def clear(self):
+        """Remove all cached results"""
+        with self.lock:
+            self.conn.execute("DELETE FROM extractions")
+            self.conn.commit()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters and size"""
+        with self.lock:
+            try:
+                entries = self.conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+            except sqlite3.Error:
+                entries = None
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+# Global extraction cache instance
+extraction_cache = ExtractionCache()
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger("Ingestion-Jobs")
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue has no room for another job"""
+
+
+@dataclass
+class IngestionJob:
+    """State of one background ingestion job"""
+    id: str
+    filename: str
+    status: str = "queued"  # queued, running, completed, failed
+    stage: Optional[str] = None
+    progress: float = 0.0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    stage_timings: Dict[str, float] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @contextmanager
+    def track_stage(self, name: str, progress_after: float):
+        """Record the duration of a stage and advance progress when it finishes"""
+        self.stage = name
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.stage_timings[name] = round(self.stage_timings.get(name, 0.0) + time.time() - start_time, 4)
+        self.progress = progress_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "stage_timings": self.stage_timings,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+JobHandler = Callable[[IngestionJob], Awaitable[Dict[str, Any]]]
+JobCleanup = Callable[[], None]
+
+
+class IngestionQueue:
+    """Bounded queue of ingestion jobs processed by a fixed pool of workers
+
+    The queue size caps how many jobs can wait, and the worker count caps how
+    many run at once, so bursts of uploads cannot starve query traffic.
+    """
+
+    def __init__(self, max_queue_size: int = config.INGEST_QUEUE_SIZE,
+                 workers: int = config.INGEST_WORKERS,
+                 max_history: int = config.INGEST_JOB_HISTORY):
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self.max_history = max_history
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: "Optional[asyncio.Queue[Tuple[IngestionJob, JobHandler, Optional[JobCleanup]]]]" = None
+        self._tasks = []
+
+    async def start(self):
+        """Start the worker tasks on the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Ingestion queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Cancel the workers and fail the jobs still waiting, running their cleanup"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        abandoned = 0
+        while self._queue is not None and not self._queue.empty():
+            job, _, cleanup = self._queue.get_nowait()
+            job.status = "failed"
+            job.error = "Abandoned during shutdown"
+            job.finished_at = datetime.utcnow()
+            abandoned += 1
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception as e:
+                    logger.warning(f"⚠️ Cleanup of abandoned job {job.id} failed: {e}")
+        self._queue = None
+        logger.info(f"Ingestion queue stopped ({abandoned} queued jobs abandoned)")
+
+    def submit(self, filename: str, handler: JobHandler, cleanup: Optional[JobCleanup] = None) -> IngestionJob:
+        """Queue a job, raising QueueFullError when the queue is at capacity
+
+        ``cleanup`` releases what the job holds (such as its spooled upload)
+        if the job is abandoned at shutdown before it starts; once running,
+        the handler is responsible for that.
+        """
+        if self._queue is None:
+            raise RuntimeError("Ingestion queue is not running")
+        job = IngestionJob(id=uuid.uuid4().hex, filename=filename)
+        try:
+            self._queue.put_nowait((job, handler, cleanup))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Ingestion queue is full ({self.max_queue_size} jobs waiting)")
+        self.jobs[job.id] = job
+        self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "jobs_by_status": counts,
+        }
+
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond max_history"""
+        excess = len(self.jobs) - self.max_history
+        for job_id in list(self.jobs):
+            if excess <= 0:
+                break
+            if self.jobs[job_id].status in ("completed", "failed"):
+                del self.jobs[job_id]
+                excess -= 1
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job, handler, _ = await self._queue.get()
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            try:
+                job.result = await handler(job)
+                job.status = "completed"
+                job.progress = 1.0
+                logger.info(f"✅ Ingestion job {job.id} completed for {job.filename}")
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Cancelled during shutdown"
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = getattr(e, "detail", None) or str(e)
+                logger.error(f"❌ Ingestion job {job.id} failed for {job.filename}: {job.error}")
+            finally:
+                job.stage = None
+                job.finished_at = datetime.utcnow()
+                self._queue.task_done()
+
+
+# Global ingestion queue instance
+ingestion_queue = IngestionQueue()
@@ -0,0 +1,202 @@
+import codecs
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from config import config
+
+WHITESPACE = " \t\r\n"
+
+
+class JSONRecordError(ValueError):
+    """Raised when a JSON array cannot be parsed any further"""
+
+
+def get_field(record: Any, path: str) -> Any:
+    """Value at a dotted path ("article.body") of a record, or None"""
+    value = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def metadata_value(value: Any) -> Optional[Union[str, int, float, bool]]:
+    """Chroma metadata only holds scalars: nested values are stored as JSON strings"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def text_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return "\n\n".join(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+@dataclass
+class RecordFields:
+    """Which record fields become a document's content, title, metadata and source key
+
+    Fields are dotted paths. With ``metadata`` unset every top-level field
+    not used for the content, title or key becomes metadata.
+    """
+    content: str = "content"
+    title: Optional[str] = "title"
+    metadata: Optional[List[str]] = None
+    key: Optional[str] = None
+
+    def map(self, record: Any) -> Dict[str, Any]:
+        """Return {"content", "title", "metadata", "source_key"} for a record
+
+        Raises ValueError when the record is not an object or has no content.
+        """
+        if not isinstance(record, dict):
+            raise ValueError(f"Record is a JSON {type(record).__name__}, not an object")
+        content = text_value(get_field(record, self.content))
+        if not content.strip():
+            raise ValueError(f"Field '{self.content}' is missing or empty")
+
+        if self.metadata is None:
+            mapped = {path.split(".")[0] for path in (self.content, self.title, self.key) if path}
+            names = [name for name in record if name not in mapped]
+        else:
+            names = self.metadata
+        metadata = {}
+        for name in names:
+            value = metadata_value(get_field(record, name))
+            if value is not None:
+                metadata[name] = value
+
+        title = text_value(get_field(record, self.title)).strip() if self.title else ""
+        key = get_field(record, self.key) if self.key else None
+        return {
+            "content": content,
+            "title": title,
+            "metadata": metadata,
+            "source_key": str(key) if key not in (None, "") else None,
+        }
+
+
+class JSONRecordReader:
+    """Incrementally read the records of a JSON Lines file or a top-level JSON array
+
+    Iterating yields ``(record_number, record, error)`` with 1-based record
+    numbers; ``error`` is set (and ``record`` None) for a JSON Lines line
+    that does not parse or is longer than ``max_record_bytes`` (the rest of
+    an oversized line is skipped without being held). A malformed array cannot be resynchronised, so it
+    raises JSONRecordError, as does an array element longer than
+    ``max_record_bytes``. Only the current record and one read buffer are
+    held in memory; ``bytes_read`` tracks progress through the file.
+    """
+
+    def __init__(self, path: Union[str, Path], read_bytes: int = config.RECORDS_READ_CHUNK_BYTES,
+                 max_record_bytes: int = config.RECORDS_MAX_RECORD_BYTES):
+        self.path = Path(path)
+        self.read_bytes = read_bytes
+        self.max_record_bytes = max_record_bytes
+        self.bytes_read = 0
+        self.format = self._detect_format()
+
+    def _detect_format(self) -> str:
+        """Arrays start with "[" (after whitespace or a BOM); anything else is read as JSON Lines"""
+        with open(self.path, "rb") as f:
+            while block := f.read(4096):
+                stripped = block.lstrip(b" \t\r\n\xef\xbb\xbf")
+                if stripped:
+                    return "array" if stripped[:1] == b"[" else "lines"
+        return "lines"
+
+    def __iter__(self) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        return self._iter_array() if self.format == "array" else self._iter_lines()
+
+    def _iter_lines(self) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        number = 0
+        with open(self.path, "rb") as f:
+            while line := f.readline(self.max_record_bytes + 1):
+                self.bytes_read += len(line)
+                if len(line) > self.max_record_bytes and not line.endswith(b"\n"):
+                    number += 1
+                    while rest := f.readline(self.read_bytes):
+                        self.bytes_read += len(rest)
+                        if rest.endswith(b"\n"):
+                            break
+                    yield number, None, f"Record exceeds {self.max_record_bytes} bytes"
+                    continue
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    yield number, json.loads(line), None
+                except ValueError as e:
+                    yield number, None, f"Invalid JSON: {e}"
+
+    def _iter_array(self) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        buffer = ""
+        pos = 0
+        eof = False
+        number = 0
+        started = False
+
+        with open(self.path, "rb") as f:
+            def fill() -> bool:
+                """Append the next block to the buffer, dropping what was consumed"""
+                nonlocal buffer, pos, eof
+                if eof:
+                    return False
+                block = f.read(self.read_bytes)
+                self.bytes_read += len(block)
+                eof = not block
+                buffer = buffer[pos:] + text_decoder.decode(block, final=eof)
+                pos = 0
+                return not eof
+
+            def next_char() -> Optional[str]:
+                """Skip whitespace and return the next character without consuming it"""
+                nonlocal pos
+                while True:
+                    while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                        pos += 1
+                    if pos < len(buffer):
+                        return buffer[pos]
+                    if not fill():
+                        return None
+
+            if next_char() != "[":
+                raise JSONRecordError("Expected a JSON array")
+            pos += 1
+            while True:
+                char = next_char()
+                if char is None:
+                    raise JSONRecordError(f"Unexpected end of file after record {number}")
+                if char == "]":
+                    return
+                if started:
+                    if char != ",":
+                        raise JSONRecordError(f"Expected ',' or ']' after record {number}")
+                    pos += 1
+                    next_char()
+                while True:
+                    try:
+                        record, end = decoder.raw_decode(buffer, pos)
+                    except ValueError as e:
+                        # The record may continue in the next block
+                        if len(buffer) - pos <= self.max_record_bytes and fill():
+                            continue
+                        raise JSONRecordError(f"Invalid JSON in record {number + 1}: {e}")
+                    # A number or string that ends the buffer may be cut short
+                    if end == len(buffer) and fill():
+                        continue
+                    break
+                pos = end
+                started = True
+                number += 1
+                yield number, record, None
@@ -0,0 +1,166 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger("Metadata-Index")
+
+# Numeric twin of the ISO created_at string; Chroma only compares numbers with $gt/$gte/$lt/$lte
+TIMESTAMP_KEY = "created_at_ts"
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+def created_at_timestamp(created_at: str) -> float:
+    return datetime.fromisoformat(created_at).timestamp()
+
+
+def translate_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Rewrite created_at date ranges in a Chroma where filter onto TIMESTAMP_KEY
+
+    ``{"created_at": {"$gte": "2024-01-01"}}`` becomes
+    ``{"created_at_ts": {"$gte": 1704067200.0}}`` (local time, as stored).
+    Raises ValueError for a malformed filter or date.
+    """
+    if not where:
+        return None
+    if not isinstance(where, dict):
+        raise ValueError("where must be an object")
+    translated = {}
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            if not isinstance(condition, list):
+                raise ValueError(f"{key} takes a list of filters")
+            translated[key] = [translate_where(clause) for clause in condition]
+        elif key == "created_at" and isinstance(condition, dict) and set(condition) <= set(RANGE_OPERATORS):
+            translated[TIMESTAMP_KEY] = {op: created_at_timestamp(str(value)) for op, value in condition.items()}
+        else:
+            translated[key] = condition
+    return translated
+
+
+class MetadataIndex:
+    """Chunk counts per value of the METADATA_INDEX_KEYS metadata fields
+
+    Gives cheap upper bounds on how many chunks a where filter can match,
+    so search can skip empty scopes, score small ones exactly and cap the
+    neighbours it asks Chroma for (exactly only for indexed equality, so
+    search retries a filtered query that still asks for too many). Like
+    the BM25 index it is rebuilt at startup and kept in step with every
+    add and delete.
+    """
+
+    def __init__(self, keys: Tuple[str, ...] = config.METADATA_INDEX_KEYS):
+        self.keys = keys
+        self.lock = threading.Lock()
+        self.counts: Dict[str, Dict[Any, int]] = {key: {} for key in keys}
+        self.doc_values: Dict[str, Tuple[Tuple[str, Any], ...]] = {}
+
+    def add_many(self, ids: List[str], metadatas: List[dict]):
+        """Index chunks, replacing any already indexed under the same id"""
+        with self.lock:
+            for doc_id, metadata in zip(ids, metadatas):
+                self._remove(doc_id)
+                values = tuple((key, metadata[key]) for key in self.keys if key in (metadata or {}))
+                for key, value in values:
+                    self.counts[key][value] = self.counts[key].get(value, 0) + 1
+                self.doc_values[doc_id] = values
+
+    def remove_many(self, ids: Iterable[str]):
+        with self.lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        for key, value in self.doc_values.pop(doc_id, ()):
+            remaining = self.counts[key][value] - 1
+            if remaining:
+                self.counts[key][value] = remaining
+            else:
+                del self.counts[key][value]
+
+    def estimate(self, where: Optional[Dict[str, Any]]) -> int:
+        """Upper bound on the chunks matching a where filter (exact for indexed equality)"""
+        with self.lock:
+            return self._estimate(where)
+
+    def _estimate(self, where: Optional[Dict[str, Any]]) -> int:
+        total = len(self.doc_values)
+        if not where:
+            return total
+        bounds = []
+        for key, condition in where.items():
+            if key == "$and":
+                bounds.append(min((self._estimate(clause) for clause in condition), default=total))
+            elif key == "$or":
+                bounds.append(min(total, sum(self._estimate(clause) for clause in condition)))
+            elif key in self.counts:
+                bounds.append(self._estimate_condition(self.counts[key], condition, total))
+            else:
+                bounds.append(total)
+        return min(bounds)
+
+    @staticmethod
+    def _estimate_condition(counts: Dict[Any, int], condition: Any, total: int) -> int:
+        if not isinstance(condition, dict):
+            return counts.get(condition, 0)
+        bounds = []
+        for op, value in condition.items():
+            if op == "$eq":
+                bounds.append(counts.get(value, 0))
+            elif op == "$in":
+                bounds.append(sum(counts.get(item, 0) for item in value))
+            elif op == "$ne":
+                bounds.append(total - counts.get(value, 0))
+            elif op == "$nin":
+                bounds.append(total - sum(counts.get(item, 0) for item in value))
+            else:
+                bounds.append(total)
+        return min(bounds, default=total)
+
+    def rebuild(self, collection, batch_size: int = 5000) -> int:
+        """Re-index every chunk stored in the collection
+
+        Chunks stored before TIMESTAMP_KEY existed get it from their
+        created_at on the way.
+        """
+        with self.lock:
+            self.counts = {key: {} for key in self.keys}
+            self.doc_values.clear()
+        offset = 0
+        stamped = 0
+        while True:
+            result = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if not result["ids"]:
+                break
+            self.add_many(result["ids"], result["metadatas"])
+            missing = [
+                (doc_id, metadata) for doc_id, metadata in zip(result["ids"], result["metadatas"])
+                if TIMESTAMP_KEY not in metadata and "created_at" in metadata
+            ]
+            if missing:
+                ids, metadatas = [], []
+                for doc_id, metadata in missing:
+                    try:
+                        metadatas.append({**metadata, TIMESTAMP_KEY: created_at_timestamp(metadata["created_at"])})
+                        ids.append(doc_id)
+                    except (TypeError, ValueError):
+                        continue
+                if ids:
+                    collection.update(ids=ids, metadatas=metadatas)
+                    stamped += len(ids)
+            offset += len(result["ids"])
+        logger.info(f"🏷️ Metadata index loaded {offset} chunks" + (f", stamped {stamped} with {TIMESTAMP_KEY}" if stamped else ""))
+        return offset
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "chunks": len(self.doc_values),
+                "keys": {key: len(values) for key, values in self.counts.items()},
+            }
+
+
+# Global metadata index instance
+metadata_index = MetadataIndex()
@@ -3,7 +3,7 @@ import logging
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
-from typing import Callable
+from typing import Callable, Dict, Optional
 import json
 from .monitoring import log_request_details, log_error_details
 
@@ -107,6 +107,38 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         
         return response
 
+class UploadSizeLimitMiddleware(BaseHTTPMiddleware):
+    """Reject uploads whose declared Content-Length is over the limit before the body is read"""
+    
+    # Allowance for multipart boundaries and part headers around the file
+    MULTIPART_OVERHEAD = 64 * 1024
+    
+    def __init__(self, app: ASGIApp, max_bytes: int, path_prefix: str = "/upload",
+                 path_limits: Optional[Dict[str, int]] = None):
+        super().__init__(app)
+        self.max_bytes = max_bytes
+        self.path_prefix = path_prefix
+        # Limits for more specific path prefixes, e.g. {"/upload/records": ...}
+        self.path_limits = path_limits or {}
+        
+    def _limit_for(self, path: str) -> int:
+        prefixes = [prefix for prefix in self.path_limits if path.startswith(prefix)]
+        return self.path_limits[max(prefixes, key=len)] if prefixes else self.max_bytes
+        
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.method == "POST" and request.url.path.startswith(self.path_prefix):
+            max_bytes = self._limit_for(request.url.path)
+            content_length = request.headers.get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes + self.MULTIPART_OVERHEAD:
+                logger.warning(f"Upload rejected: Content-Length {content_length} exceeds {max_bytes} bytes")
+                return Response(
+                    content=json.dumps({"detail": f"File exceeds the upload limit of {max_bytes} bytes"}),
+                    status_code=413,
+                    media_type="application/json"
+                )
+        
+        return await call_next(request)
+
 class RateLimitingMiddleware(BaseHTTPMiddleware):
     """Basic rate limiting middleware"""
     
@@ -0,0 +1,48 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config import config
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    embeddings: Sequence[Sequence[float]],
+    top_k: int = config.MMR_TOP_K,
+    lambda_: float = config.MMR_LAMBDA,
+    costs: Optional[Sequence[int]] = None,
+    budget: Optional[int] = None,
+) -> List[int]:
+    """Pick a relevant but non-redundant subset by maximal marginal relevance
+
+    Each step takes the candidate maximising
+    ``lambda_ * relevance - (1 - lambda_) * max cosine similarity to the picks so far``.
+    With ``costs`` and ``budget`` a candidate is only picked while its cost
+    still fits the remaining budget. Returns candidate indexes in pick order.
+    """
+    count = len(relevance)
+    if count == 0 or top_k <= 0:
+        return []
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    similarity = vectors @ vectors.T
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    costs = np.asarray(costs if costs is not None else np.zeros(count), dtype=np.int64)
+    remaining = budget if budget is not None else np.iinfo(np.int64).max
+    redundancy = np.zeros(count, dtype=np.float32)  # Max similarity to the picks (dissimilar counts as 0)
+    available = np.ones(count, dtype=bool)
+    picked = []
+
+    while len(picked) < top_k:
+        available &= costs <= remaining
+        if not available.any():
+            break
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        remaining -= costs[best]
+        redundancy = np.maximum(redundancy, similarity[best])
+    return picked
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import random
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import ollama
+
+from config import config
+
+logger = logging.getLogger("Ollama-Client")
+
+
+class AsyncOllamaClient:
+    """Async Ollama client sharing one keep-alive connection pool
+
+    Every call gets its own timeout and is retried with exponential backoff and
+    jitter on connection errors, timeouts and 5xx responses.
+    """
+
+    def __init__(
+        self,
+        host: str = config.OLLAMA_HOST,
+        max_connections: int = config.OLLAMA_MAX_CONNECTIONS,
+        max_retries: int = config.OLLAMA_MAX_RETRIES,
+        retry_backoff: float = config.OLLAMA_RETRY_BACKOFF,
+    ):
+        self.host = host
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._client: Optional[ollama.AsyncClient] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self.embed_supported = True  # Cleared when the server has no batch /api/embed endpoint
+
+    @property
+    def client(self) -> ollama.AsyncClient:
+        """Create the underlying client lazily so it binds to the running event loop"""
+        if self._client is None:
+            self._client = ollama.AsyncClient(host=self.host, timeout=self._timeout(), limits=self._limits())
+        return self._client
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Plain httpx client for endpoints the ollama package lacks, with the same timeout and limits"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(base_url=self.host, timeout=self._timeout(), limits=self._limits())
+        return self._http
+
+    def _timeout(self) -> httpx.Timeout:
+        # Per-call deadlines are enforced with asyncio.wait_for
+        return httpx.Timeout(None, connect=5.0)
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client._client.aclose()
+            self._client = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+            return True
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code >= 500
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return False
+
+    async def _backoff(self, attempt: int):
+        delay = self.retry_backoff * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def _call(self, operation: str, make_call, timeout: Optional[float]):
+        """Run ``make_call()`` with a timeout, retrying transient failures"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.wait_for(make_call(), timeout)
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                logger.warning(f"⚠️ Ollama {operation} failed (attempt {attempt + 1}), retrying: {e!r}")
+                await self._backoff(attempt)
+
+    async def embeddings(self, text: str, model: str, timeout: Optional[float] = None) -> List[float]:
+        """Get the embedding for one text"""
+        response = await self._call(
+            "embeddings",
+            lambda: self.client.embeddings(model=model, prompt=text),
+            timeout or config.OLLAMA_EMBED_TIMEOUT,
+        )
+        return response.get("embedding", []) if response else []
+
+    async def embed(self, texts: List[str], model: str, timeout: Optional[float] = None) -> List[List[float]]:
+        """Get the embeddings for several texts in one /api/embed request (Ollama 0.3+)
+
+        The ollama package in use predates ``embed``, so the request goes
+        through ``http``, a separate pooled httpx client. A 404 means the
+        server only has the single-text endpoint: ``embed_supported`` is
+        cleared and the error raised, so callers fall back to ``embeddings``.
+        """
+        async def request():
+            response = await self.http.post("/api/embed", json={"model": model, "input": texts})
+            if response.status_code == 404 and "model" not in response.text:
+                self.embed_supported = False
+            response.raise_for_status()
+            return response.json()
+
+        response = await self._call(
+            "embed",
+            request,
+            timeout or config.OLLAMA_EMBED_TIMEOUT * max(1, len(texts)),
+        )
+        return response.get("embeddings", []) if response else []
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Generate a full (non-streaming) response"""
+        return await self._call(
+            "generate",
+            lambda: self.client.generate(model=model, prompt=prompt, options=options),
+            timeout or config.OLLAMA_GENERATE_TIMEOUT,
+        )
+
+    async def generate_stream(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream generation chunks
+
+        ``timeout`` bounds the wait for each chunk. Failures before the first
+        chunk are retried; once output has been yielded errors are raised.
+        """
+        timeout = timeout or config.OLLAMA_GENERATE_TIMEOUT
+        for attempt in range(self.max_retries + 1):
+            try:
+                stream = await self.client.generate(model=model, prompt=prompt, options=options, stream=True)
+                iterator = stream.__aiter__()
+                first_chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                logger.warning(f"⚠️ Ollama stream failed (attempt {attempt + 1}), retrying: {e!r}")
+                await self._backoff(attempt)
+                continue
+
+            yield first_chunk
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+                yield chunk
+
+    async def list_models(self, timeout: float = 5) -> List[str]:
+        """List the names of locally available models"""
+        response = await self._call("list", lambda: self.client.list(), timeout)
+        return [m["name"] for m in response.get("models", [])]
+
+    async def pull(self, model: str, timeout: float = 300) -> Dict[str, Any]:
+        """Pull a model"""
+        return await asyncio.wait_for(self.client.pull(model), timeout)
+
+
+# Global async client instance
+ollama_client = AsyncOllamaClient()
@@ -0,0 +1,101 @@
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for cache keys (whitespace collapsed)
+
+    Case is kept: the embedding model is case-sensitive, so "ABC-12" and
+    "abc-12" get different vectors.
+    """
+    return " ".join(question.split())
+
+
+class QueryEmbeddingCache:
+    """In-process LRU/TTL cache for query embeddings, bounded in bytes
+
+    Embeddings are kept as float32 arrays; the size of each entry is the
+    memory held by its key and vector.
+    """
+
+    def __init__(self, max_bytes: int = config.QUERY_CACHE_MAX_BYTES,
+                 ttl_seconds: float = config.QUERY_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[array, float, int]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, model: str, question: str) -> Optional[List[float]]:
+        """Return the cached embedding or None"""
+        key = (model, normalize_question(question))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            vector, expires_at, size = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.size_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return vector.tolist()
+
+    def put(self, model: str, question: str, embedding: List[float]):
+        """Cache an embedding, evicting least recently used entries to stay under max_bytes"""
+        if not embedding:
+            return
+        key = (model, normalize_question(question))
+        vector = array("f", embedding)
+        size = sys.getsizeof(vector) + sys.getsizeof(key[1])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[2]
+            self.entries[key] = (vector, time.monotonic() + self.ttl_seconds, size)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters and size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
+
+
+# Global query embedding cache instance
+query_embedding_cache = QueryEmbeddingCache()
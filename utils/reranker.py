@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+# Optional dependency: pip install sentence-transformers
+try:
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CrossEncoder = None
+    CROSS_ENCODER_AVAILABLE = False
+
+logger = logging.getLogger("Reranker")
+
+
+def pair_key(model: str, query: str, passage: str) -> bytes:
+    """Cache key of a (model, whitespace-normalized query, passage) triple"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (model, " ".join(query.split()), passage):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def sigmoid(x: float) -> float:
+    """Logistic function, without overflowing on large negative inputs"""
+    if x >= 0:
+        return 1 / (1 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1 + z)
+
+
+def outputs_probabilities(model) -> bool:
+    """Whether a CrossEncoder's ``predict`` already maps its outputs into [0, 1]
+
+    sentence-transformers applies the model's configured activation
+    (``activation_fn``, or ``default_activation_function`` before v4):
+    Sigmoid or Softmax give probabilities, while Identity (as on the
+    ms-marco models) leaves raw logits.
+    """
+    activation = getattr(model, "activation_fn", None) or getattr(model, "default_activation_function", None)
+    return type(activation).__name__ in ("Sigmoid", "Softmax")
+
+
+class CrossEncoderReranker:
+    """Scores query-passage pairs with a local cross-encoder on CPU
+
+    The model is loaded on first use. All uncached pairs of a call are
+    scored in a single ``predict`` call (one forward pass while they fit in
+    ``batch_size``), and scores are kept in an LRU cache
+    of ``cache_entries`` pairs keyed by a hash of model, query and passage.
+    Scores are always in [0, 1]: models that output logits go through a
+    sigmoid, models whose activation already yields probabilities do not.
+    """
+
+    def __init__(self, model_name: str = config.RERANK_MODEL,
+                 batch_size: int = config.RERANK_BATCH_SIZE,
+                 max_length: int = config.RERANK_MAX_LENGTH,
+                 cache_entries: int = config.RERANK_CACHE_ENTRIES):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_entries = cache_entries
+        self.cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.model_lock = threading.Lock()
+        self._model = None
+        self.probabilities = False
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    @property
+    def available(self) -> bool:
+        return CROSS_ENCODER_AVAILABLE
+
+    @property
+    def model(self):
+        if self._model is None:
+            if not CROSS_ENCODER_AVAILABLE:
+                raise RuntimeError("Reranking needs the sentence-transformers package")
+            with self.model_lock:
+                if self._model is None:
+                    logger.info(f"🔧 Loading cross-encoder {self.model_name}")
+                    model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                    self.probabilities = outputs_probabilities(model)
+                    self._model = model
+        return self._model
+
+    def score(self, query: str, passages: List[str]) -> List[float]:
+        """Relevance of each passage for the query in [0, 1] (higher is better)"""
+        keys = [pair_key(self.model_name, query, passage) for passage in passages]
+        scores: List[Optional[float]] = []
+        with self.lock:
+            for key in keys:
+                value = self.cache.get(key)
+                if value is not None:
+                    self.cache.move_to_end(key)
+                scores.append(value)
+        missing = [i for i, value in enumerate(scores) if value is None]
+        if missing:
+            model = self.model
+            fresh = model.predict(
+                [(query, passages[i]) for i in missing],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            with self.lock:
+                self.batches += 1
+                for i, value in zip(missing, fresh):
+                    scores[i] = float(value) if self.probabilities else sigmoid(float(value))
+                    self.cache[keys[i]] = scores[i]
+                    self.cache.move_to_end(keys[i])
+                while len(self.cache) > self.cache_entries:
+                    self.cache.popitem(last=False)
+        with self.lock:
+            self.hits += len(passages) - len(missing)
+            self.misses += len(missing)
+        return scores
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "available": self.available,
+                "model": self.model_name,
+                "loaded": self._model is not None,
+                "activation": "model" if self.probabilities else "sigmoid",
+                "entries": len(self.cache),
+                "max_entries": self.cache_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "batches": self.batches,
+            }
+
+
+# Global reranker instance
+reranker = CrossEncoderReranker()